@@ -0,0 +1,444 @@
+import os
+import os.path
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+
+
+BENCH_RESULTS_VERSION = 1
+
+ALL_BENCHMARKS = ['full_bake', 'incremental_bake', 'serve', 'assets']
+
+# Measurements are considered regressions if they're slower than the
+# baseline by more than this ratio.
+DEFAULT_THRESHOLD = 0.1
+
+# Measurements smaller than this (in seconds) are too noisy to compare.
+MIN_COMPARED_TIME = 0.05
+
+
+class BenchmarkRunner(object):
+    """ Runs PieCrust benchmarks against a website, and returns results
+        that can be saved as JSON.
+
+        Bakes and asset processing results include the merged
+        `ExecutionStats` timers and counters of the run, while serving
+        results include the latency of each request.
+    """
+    def __init__(self, site_dir, *, repeat=3, edit_count=10,
+                 serve_count=20, workers=None):
+        self.site_dir = site_dir
+        self.repeat = max(1, repeat)
+        self.edit_count = edit_count
+        self.serve_count = serve_count
+        self.workers = workers
+        self.out_dir = os.path.join(site_dir, '_counter')
+        self._baked_uris = []
+
+    def run(self, names=None):
+        names = names or ALL_BENCHMARKS
+        for n in names:
+            if n not in ALL_BENCHMARKS:
+                raise Exception("No such benchmark: %s" % n)
+
+        results = {}
+        for n in ALL_BENCHMARKS:
+            if n not in names:
+                continue
+            print("Running benchmark: %s" % n)
+            func = getattr(self, 'run%s' % _to_camel_case(n))
+            results.update(func())
+        return results
+
+    def runFullBake(self):
+        return {'full_bake': self._runRepeated(
+                lambda: self._bake(force=True))}
+
+    def runIncrementalBake(self):
+        if not os.path.isdir(self.out_dir):
+            self._bake(force=True)
+
+        def _run():
+            self._editPosts()
+            return self._bake(force=False)
+
+        return {'incremental_bake': self._runRepeated(_run)}
+
+    def runServe(self):
+        from werkzeug.test import Client
+        from werkzeug.wrappers import BaseResponse
+        from piecrust.serving.server import WsgiServer
+
+        uris = self._getServedUris()
+        best_cold = None
+        best_warm = None
+        for _ in range(self.repeat):
+            # Start from an empty cache, and a brand new server.
+            self._clearCache()
+            server = WsgiServer(self._getAppFactory())
+            client = Client(server, BaseResponse)
+            cold = _run_requests(client, uris)
+            warm = _run_requests(client, uris)
+            if best_cold is None or cold['time'] < best_cold['time']:
+                best_cold = cold
+            if best_warm is None or warm['time'] < best_warm['time']:
+                best_warm = warm
+        return {'serve_cold': best_cold, 'serve_warm': best_warm}
+
+    def runAssets(self):
+        from piecrust.processing.pipeline import ProcessorPipeline
+
+        def _run():
+            app = self._getApp()
+            start = time.perf_counter()
+            pipeline = ProcessorPipeline(app, self.out_dir, force=True)
+            record = pipeline.run()
+            return _make_result(time.perf_counter() - start,
+                                record.stats['_Total'])
+
+        return {'assets': self._runRepeated(_run)}
+
+    def _runRepeated(self, func):
+        # Keep the fastest run, which is the least disturbed by whatever
+        # else is going on on the machine.
+        best = None
+        all_times = []
+        for _ in range(self.repeat):
+            res = func()
+            all_times.append(res['time'])
+            if best is None or res['time'] < best['time']:
+                best = res
+        best['times'] = all_times
+        return best
+
+    def _bake(self, force):
+        from piecrust.baking.baker import Baker
+
+        app = self._getApp()
+        start = time.perf_counter()
+        baker = Baker(app, self.out_dir, force=force)
+        record = baker.bake()
+        res = _make_result(time.perf_counter() - start,
+                           record.stats['_Total'])
+
+        self._baked_uris = []
+        for entry in record.entries:
+            for sub in entry.subs:
+                if sub.out_uri:
+                    self._baked_uris.append(sub.out_uri)
+        return res
+
+    def _editPosts(self):
+        posts_dir = os.path.join(self.site_dir, 'posts')
+        paths = sorted(os.listdir(posts_dir))
+        for fn in random.sample(paths, min(self.edit_count, len(paths))):
+            with open(os.path.join(posts_dir, fn), 'a',
+                      encoding='utf8') as fp:
+                fp.write('\nEdited for benchmarking at %s.\n' % time.time())
+
+    def _getServedUris(self):
+        if not self._baked_uris:
+            self._bake(force=False)
+        uris = sorted(set(self._baked_uris))
+        if len(uris) > self.serve_count:
+            uris = random.sample(uris, self.serve_count)
+        return uris
+
+    def _clearCache(self):
+        from piecrust import CACHE_DIR
+        cache_dir = os.path.join(self.site_dir, CACHE_DIR)
+        if os.path.isdir(cache_dir):
+            shutil.rmtree(cache_dir)
+
+    def _getAppFactory(self):
+        from piecrust.app import PieCrustFactory
+        config_values = None
+        if self.workers:
+            config_values = [('baker/workers', self.workers)]
+        return PieCrustFactory(self.site_dir, config_values=config_values)
+
+    def _getApp(self):
+        return self._getAppFactory().create()
+
+
+def _to_camel_case(name):
+    return ''.join(p.capitalize() for p in name.split('_'))
+
+
+def _make_result(wall_time, stats):
+    return {
+            'time': wall_time,
+            'timers': dict(stats.timers),
+            'counters': dict(stats.counters)}
+
+
+def _run_requests(client, uris):
+    latencies = []
+    error_count = 0
+    for uri in uris:
+        start = time.perf_counter()
+        resp = client.get(uri)
+        latencies.append(time.perf_counter() - start)
+        if resp.status_code != 200:
+            print("Got HTTP %d when requesting: %s" %
+                  (resp.status_code, uri))
+            error_count += 1
+
+    latencies.sort()
+    return {
+            'time': sum(latencies),
+            'requests': len(latencies),
+            'errors': error_count,
+            'latency': {
+                'min': latencies[0] if latencies else 0,
+                'median': _percentile(latencies, 0.5),
+                'p90': _percentile(latencies, 0.9),
+                'max': latencies[-1] if latencies else 0}}
+
+
+def _percentile(sorted_values, p):
+    if not sorted_values:
+        return 0
+    idx = int(round(p * (len(sorted_values) - 1)))
+    return sorted_values[idx]
+
+
+def make_results_document(results, site_info):
+    import piecrust
+    return {
+            'version': BENCH_RESULTS_VERSION,
+            'date': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'piecrust': piecrust.APP_VERSION,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'site': site_info,
+            'benchmarks': results}
+
+
+def get_measurements(results):
+    """ Flattens benchmark results into a dictionary of comparable
+        durations, keyed by names like `full_bake` or
+        `full_bake:BakeWorker_0`.
+    """
+    res = {}
+    for bench, data in results.items():
+        res[bench] = data['time']
+        for n, v in data.get('timers', {}).items():
+            res['%s:%s' % (bench, n)] = v
+        for n, v in data.get('latency', {}).items():
+            res['%s:latency_%s' % (bench, n)] = v
+    return res
+
+
+def compare_results(baseline, current, *, threshold=DEFAULT_THRESHOLD,
+                    min_time=MIN_COMPARED_TIME):
+    """ Compares benchmark results with a baseline.
+
+        The baseline document can have a `thresholds` dictionary to override
+        the threshold for some benchmarks or measurements. Returns a list of
+        `(name, baseline_time, current_time, ratio)` tuples, one for each
+        measurement that's slower than the baseline by more than the
+        threshold.
+    """
+    if baseline.get('version') != BENCH_RESULTS_VERSION:
+        raise Exception("Baseline results have version %s, expected %s." %
+                        (baseline.get('version'), BENCH_RESULTS_VERSION))
+
+    thresholds = baseline.get('thresholds', {})
+    base_values = get_measurements(baseline['benchmarks'])
+    cur_values = get_measurements(current['benchmarks'])
+
+    regressions = []
+    for name, base_value in sorted(base_values.items()):
+        cur_value = cur_values.get(name)
+        if cur_value is None or base_value < min_time:
+            continue
+        bench = name.split(':', 1)[0]
+        t = thresholds.get(name, thresholds.get(bench, threshold))
+        ratio = cur_value / base_value - 1
+        if ratio > t:
+            regressions.append((name, base_value, cur_value, ratio))
+    return regressions
+
+
+def print_results(results):
+    for bench, data in results.items():
+        line = "%-20s %8.3f s" % (bench, data['time'])
+        if 'latency' in data:
+            lat = data['latency']
+            line += "  (%d requests, %d errors, median %.1f ms, " \
+                    "p90 %.1f ms)" % (
+                            data['requests'], data['errors'],
+                            lat['median'] * 1000.0, lat['p90'] * 1000.0)
+        print(line)
+
+
+def print_regressions(regressions):
+    for name, base_value, cur_value, ratio in regressions:
+        print("REGRESSION: %-40s %8.3f s -> %8.3f s (%+.1f%%)" %
+              (name, base_value, cur_value, ratio * 100.0))
+
+
+def run_benchmarks(site_dir=None, *, names=None, out=None, baseline=None,
+                   threshold=DEFAULT_THRESHOLD, repeat=3, workers=None,
+                   post_count=500, tag_count=30, template_count=5,
+                   asset_count=50, edit_count=10, serve_count=20,
+                   seed=None):
+    """ Generates a benchmark website if needed, runs benchmarks on it,
+        and compares the results with a baseline if given.
+
+        Returns `True` if no regressions were found.
+    """
+    from garcon.benchsite import generate
+
+    if seed is not None:
+        random.seed(seed)
+
+    site_info = {
+            'posts': post_count, 'tags': tag_count,
+            'templates': template_count, 'assets': asset_count,
+            'seed': seed}
+    tmp_dir = None
+    if site_dir is None:
+        tmp_dir = tempfile.mkdtemp(prefix='piecrust-bench-')
+        site_dir = os.path.join(tmp_dir, 'site')
+    if not os.path.isdir(site_dir):
+        generate('piecrust', site_dir,
+                 post_count=post_count, tag_count=tag_count,
+                 template_count=template_count, asset_count=asset_count)
+    else:
+        print("Using existing website: %s" % site_dir)
+        site_info = {'path': site_dir}
+
+    try:
+        runner = BenchmarkRunner(
+                site_dir, repeat=repeat, edit_count=edit_count,
+                serve_count=serve_count, workers=workers)
+        results = runner.run(names)
+    finally:
+        if tmp_dir is not None:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    doc = make_results_document(results, site_info)
+    print_results(results)
+
+    if out:
+        with open(out, 'w', encoding='utf8') as fp:
+            json.dump(doc, fp, indent=2, sort_keys=True)
+        print("Results saved to: %s" % out)
+
+    if baseline:
+        with open(baseline, 'r', encoding='utf8') as fp:
+            baseline_doc = json.load(fp)
+        regressions = compare_results(baseline_doc, doc, threshold=threshold)
+        if regressions:
+            print_regressions(regressions)
+            return False
+        print("No regressions compared to: %s" % baseline)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(
+            prog='benchmark',
+            description=("Runs PieCrust benchmarks on a generated website, "
+                         "and compares the results with a baseline."))
+    parser.add_argument(
+            'site_dir',
+            nargs='?',
+            help=("The website to benchmark. It's generated if it doesn't "
+                  "exist. Defaults to a temporary website."))
+    parser.add_argument(
+            '-b', '--bench',
+            action='append',
+            choices=ALL_BENCHMARKS,
+            help="The benchmarks to run. Defaults to all of them.")
+    parser.add_argument(
+            '-o', '--out',
+            help="Save the results to the given JSON file.")
+    parser.add_argument(
+            '--baseline',
+            help="Compare the results with the given JSON file.")
+    parser.add_argument(
+            '--threshold',
+            type=float,
+            default=DEFAULT_THRESHOLD,
+            help=("The ratio by which a measurement can be slower than the "
+                  "baseline before it's considered a regression."))
+    parser.add_argument(
+            '-r', '--repeat',
+            type=int,
+            default=3,
+            help="How many times to run each benchmark.")
+    parser.add_argument(
+            '-w', '--workers',
+            type=int,
+            help="The number of bake workers to use.")
+    parser.add_argument('--post-count', type=int, default=500)
+    parser.add_argument('--tag-count', type=int, default=30)
+    parser.add_argument('--template-count', type=int, default=5)
+    parser.add_argument('--asset-count', type=int, default=50)
+    parser.add_argument(
+            '--edit-count',
+            type=int,
+            default=10,
+            help="The number of posts to edit before an incremental bake.")
+    parser.add_argument(
+            '--serve-count',
+            type=int,
+            default=20,
+            help="The number of pages to request when serving.")
+    parser.add_argument(
+            '--seed',
+            type=int,
+            help="The random seed to use when generating the website.")
+
+    result = parser.parse_args()
+    ok = run_benchmarks(
+            result.site_dir, names=result.bench, out=result.out,
+            baseline=result.baseline, threshold=result.threshold,
+            repeat=result.repeat, workers=result.workers,
+            post_count=result.post_count, tag_count=result.tag_count,
+            template_count=result.template_count,
+            asset_count=result.asset_count, edit_count=result.edit_count,
+            serve_count=result.serve_count, seed=result.seed)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
+else:
+    from invoke import task
+
+    @task(help={
+        'site_dir': "The website to benchmark. It's generated if it doesn't "
+                    "exist. Defaults to a temporary website.",
+        'bench': "A comma-separated list of benchmarks to run. Defaults to "
+                 "all of them.",
+        'out': "Save the results to the given JSON file.",
+        'baseline': "Compare the results with the given JSON file, and fail "
+                    "if there are regressions.",
+        'threshold': "The ratio by which a measurement can be slower than "
+                     "the baseline before it's considered a regression."
+        })
+    def benchmark(site_dir=None, bench=None, out=None, baseline=None,
+                  threshold=DEFAULT_THRESHOLD, repeat=3, workers=None,
+                  post_count=500, tag_count=30, template_count=5,
+                  asset_count=50, edit_count=10, serve_count=20, seed=None):
+        names = bench.split(',') if bench else None
+        ok = run_benchmarks(
+                site_dir, names=names, out=out, baseline=baseline,
+                threshold=float(threshold), repeat=int(repeat),
+                workers=int(workers) if workers else None,
+                post_count=int(post_count), tag_count=int(tag_count),
+                template_count=int(template_count),
+                asset_count=int(asset_count), edit_count=int(edit_count),
+                serve_count=int(serve_count),
+                seed=int(seed) if seed is not None else None)
+        if not ok:
+            raise Exception("Found performance regressions.")
@@ -39,6 +39,8 @@ class BenchmarkSiteGenerator(object):
     def __init__(self, out_dir):
         self.out_dir = out_dir
         self.all_tags = []
+        self.template_count = 0
+        self.asset_count = 0
 
     def generatePost(self):
         post_info = {}
@@ -73,6 +75,54 @@ class PieCrustBechmarkSiteGenerator(BenchmarkSiteGenerator):
         if not os.path.isdir(posts_dir):
             os.makedirs(posts_dir)
 
+        config_path = os.path.join(self.out_dir, 'config.yml')
+        if not os.path.isfile(config_path):
+            with open(config_path, 'w', encoding='utf8') as f:
+                f.write('site:\n')
+                f.write('  title: Benchmark Website\n')
+
+        if self.template_count > 0:
+            tpl_dir = os.path.join(self.out_dir, 'templates')
+            if not os.path.isdir(tpl_dir):
+                os.makedirs(tpl_dir)
+            for i in range(self.template_count):
+                self.writeTemplate(tpl_dir, i)
+
+        if self.asset_count > 0:
+            for ext in ['css', 'js']:
+                asset_dir = os.path.join(self.out_dir, 'assets', ext)
+                if not os.path.isdir(asset_dir):
+                    os.makedirs(asset_dir)
+            for i in range(self.asset_count):
+                self.writeAsset(i)
+
+    def writeTemplate(self, tpl_dir, num):
+        with open(os.path.join(tpl_dir, 'bench_%d.html' % num), 'w',
+                  encoding='utf8') as f:
+            f.write('{% extends "default.html" %}\n')
+            f.write('{% block footer %}\n')
+            f.write('<p>%s</p>\n' % generateSentence(10))
+            f.write('<ul>\n')
+            f.write('{%% for p in blog.posts.limit(%d) %%}\n' %
+                    random.randint(5, 10))
+            f.write('<li><a href="{{p.url}}">{{p.title}}</a></li>\n')
+            f.write('{% endfor %}\n')
+            f.write('</ul>\n')
+            f.write('{% endblock %}\n')
+
+    def writeAsset(self, num):
+        if num % 2 == 0:
+            path = os.path.join(self.out_dir, 'assets', 'css',
+                                'style_%d.css' % num)
+            rule = '.%s { margin: %dpx; }\n'
+        else:
+            path = os.path.join(self.out_dir, 'assets', 'js',
+                                'script_%d.js' % num)
+            rule = 'var %s = %d;\n'
+        with open(path, 'w', encoding='utf8') as f:
+            for i in range(random.randint(50, 200)):
+                f.write(rule % (generateWord(5, 10), i))
+
     def writePost(self, post_info):
         out_dir = os.path.join(self.out_dir, 'posts')
         slug = post_info['slug']
@@ -83,6 +133,9 @@ class PieCrustBechmarkSiteGenerator(BenchmarkSiteGenerator):
             f.write('title: %s\n' % post_info['title'])
             f.write('description: %s\n' % post_info['description'])
             f.write('tags: [%s]\n' % post_info['tags'])
+            if self.template_count > 0:
+                f.write('layout: bench_%d\n' %
+                        random.randrange(self.template_count))
             f.write('---\n')
 
             para_count = random.randint(5, 10)
@@ -193,14 +246,29 @@ def main():
             help="The number of tags to use.",
             type=int,
             default=30)
+    parser.add_argument(
+            '--template-count',
+            help=("The number of layout templates to create (only "
+                  "supported for PieCrust)."),
+            type=int,
+            default=0)
+    parser.add_argument(
+            '--asset-count',
+            help=("The number of CSS and Javascript files to create (only "
+                  "supported for PieCrust)."),
+            type=int,
+            default=0)
 
     result = parser.parse_args()
     generate(result.engine, result.out_dir,
              post_count=result.post_count,
-             tag_count=result.tag_count)
+             tag_count=result.tag_count,
+             template_count=result.template_count,
+             asset_count=result.asset_count)
 
 
-def generate(engine, out_dir, post_count=100, tag_count=10):
+def generate(engine, out_dir, post_count=100, tag_count=10,
+             template_count=0, asset_count=0):
     print("Generating %d posts in %s..." % (post_count, out_dir))
 
     if not os.path.exists(out_dir):
@@ -208,6 +276,8 @@ def generate(engine, out_dir, post_count=100, tag_count=10):
 
     gen = generators[engine](out_dir)
     gen.all_tags = [generateWord(3, 12) for _ in range(tag_count)]
+    gen.template_count = template_count
+    gen.asset_count = asset_count
     gen.initialize()
 
     for i in range(post_count):
@@ -220,8 +290,11 @@ else:
     from invoke import task
 
     @task
-    def genbenchsite(engine, out_dir, post_count=100, tag_count=10):
+    def genbenchsite(engine, out_dir, post_count=100, tag_count=10,
+                     template_count=0, asset_count=0):
         generate(engine, out_dir,
                  post_count=post_count,
-                 tag_count=tag_count)
+                 tag_count=tag_count,
+                 template_count=template_count,
+                 asset_count=asset_count)
 
@@ -1,3 +1,4 @@
+import copy
 import time
 import os.path
 import hashlib
@@ -23,13 +24,24 @@ logger = logging.getLogger(__name__)
 
 class PieCrust(object):
     def __init__(self, root_dir, cache=True, debug=False, theme_site=False,
-                 env=None, cache_key=None):
+                 env=None, cache_key=None, snapshot=None):
         self.root_dir = root_dir
         self.debug = debug
         self.theme_site = theme_site
         self.plugin_loader = PluginLoader(self)
         self.cache_key = cache_key or 'default'
 
+        if snapshot is not None:
+            # Whoever made the snapshot already loaded the configuration
+            # and found the theme, so pre-fill those cached properties.
+            config = PieCrustConfiguration(theme_config=theme_site)
+            config.setLoadedValues(snapshot.getConfigValues())
+            self.__dict__.update({
+                    'config': config,
+                    'theme_dir': snapshot.theme_dir,
+                    'templates_dirs': list(snapshot.templates_dirs),
+                    'assets_dirs': list(snapshot.assets_dirs)})
+
         if cache:
             self.cache = ExtensibleCache(self.cache_dir)
         else:
@@ -185,8 +197,8 @@ class PieCrust(object):
             if isinstance(t, dict):
                 pub_type = t.get('type')
             elif isinstance(t, str):
-                comps = urllib.parse.urlparse(t)
-                pub_type = comps.scheme
+                t = urllib.parse.urlparse(t)
+                pub_type = t.scheme
                 is_scheme = True
             cls = (defs_by_scheme.get(pub_type) if is_scheme
                     else defs_by_name.get(pub_type))
@@ -270,12 +282,29 @@ def apply_variant_and_values(app, config_variant=None, config_values=None):
             app.config.addVariantValue(name, value)
 
 
+class PieCrustSnapshot(object):
+    """ A read-only copy of an app's configuration, along with the
+        directories it figured out from it. Worker processes can create
+        their app from it instead of loading, merging and validating the
+        configuration files all over again.
+    """
+    def __init__(self, app):
+        self._config_values = copy.deepcopy(app.config.getAll())
+        self.theme_dir = app.theme_dir
+        self.templates_dirs = tuple(app.templates_dirs)
+        self.assets_dirs = tuple(app.assets_dirs)
+
+    def getConfigValues(self):
+        # Apps can change their configuration, so they each get a copy.
+        return copy.deepcopy(self._config_values)
+
+
 class PieCrustFactory(object):
     def __init__(
             self, root_dir, *,
             cache=True, cache_key=None,
             config_variant=None, config_values=None,
-            debug=False, theme_site=False):
+            debug=False, theme_site=False, snapshot=None):
         self.root_dir = root_dir
         self.cache = cache
         self.cache_key = cache_key
@@ -283,6 +312,7 @@ class PieCrustFactory(object):
         self.config_values = config_values
         self.debug = debug
         self.theme_site = theme_site
+        self.snapshot = snapshot
 
     def create(self):
         app = PieCrust(
@@ -290,8 +320,11 @@ class PieCrustFactory(object):
                 cache=self.cache,
                 cache_key=self.cache_key,
                 debug=self.debug,
-                theme_site=self.theme_site)
-        apply_variant_and_values(
-                app, self.config_variant, self.config_values)
+                theme_site=self.theme_site,
+                snapshot=self.snapshot)
+        if self.snapshot is None:
+            # The snapshot's configuration already has those applied.
+            apply_variant_and_values(
+                    app, self.config_variant, self.config_values)
         return app
 
@@ -75,6 +75,13 @@ class PieCrustConfiguration(Configuration):
             values = self._validateAll(values)
         self._values = values
 
+    def setLoadedValues(self, values):
+        """ Sets values that were already loaded and validated, like the
+            ones from another app's configuration.
+        """
+        self._ensureNotLoaded()
+        self._values = values
+
     def _ensureNotLoaded(self):
         if self._values is not None:
             raise Exception("The configurations has been loaded.")
@@ -1,11 +1,10 @@
 import time
 import os.path
-import hashlib
 import logging
 from piecrust.baking.records import (
-        BakeRecordEntry, TransitionalBakeRecord)
+        BakeRecordEntry, TransitionalBakeRecord, get_bake_record_id)
 from piecrust.baking.worker import (
-        save_factory,
+        save_factory, make_bake_job_context,
         JOB_LOAD, JOB_RENDER_FIRST, JOB_BAKE)
 from piecrust.chefutil import (
         format_timed_scope, format_timed)
@@ -22,13 +21,16 @@ logger = logging.getLogger(__name__)
 class Baker(object):
     def __init__(self, app, out_dir, force=False,
                  applied_config_variant=None,
-                 applied_config_values=None):
+                 applied_config_values=None,
+                 trace=False):
         assert app and out_dir
         self.app = app
         self.out_dir = out_dir
         self.force = force
         self.applied_config_variant = applied_config_variant
         self.applied_config_values = applied_config_values
+        self.trace = trace
+        self.trace_events = None
 
         # Remember what generator pages we should skip.
         self.generator_pages = []
@@ -60,7 +62,7 @@ class Baker(object):
         # Load/create the bake record.
         record = TransitionalBakeRecord()
         record_cache = self.app.cache.getCache('baker')
-        record_id = hashlib.md5(self.out_dir.encode('utf8')).hexdigest()
+        record_id = get_bake_record_id(self.out_dir)
         record_name = record_id + '.record'
         previous_record_path = None
         if not self.force and record_cache.has(record_name):
@@ -112,6 +114,17 @@ class Baker(object):
                 worker_name = 'BakeWorker_%d' % i
                 record.current.stats[worker_name] = worker_stats
                 total_stats.mergeStats(worker_stats)
+        self._handleWriteErrors(
+                record, [e for r in reports if r is not None
+                         for e in r.get('write_errors', [])])
+
+        # Keep the trace out of the bake record.
+        if self.trace:
+            self.trace_events = total_stats.popTraceEvents() or []
+            for s in record.current.stats.values():
+                s.popTraceEvents()
+        record.collectSlowestPages(
+                self.app.config.get('baker/slowest_pages', 20))
 
         # Delete files from the output.
         self._handleDeletetions(record)
@@ -216,13 +229,14 @@ class Baker(object):
             # as we add page files whose last modification times are later
             # than the last bake.
             record_entry = BakeRecordEntry(res['source_name'], res['path'])
-            record_entry.config = res['config']
+            record_entry.config = record.internConfig(res['config'])
             record_entry.timestamp = res['timestamp']
             if res['errors']:
                 record_entry.errors += res['errors']
                 record.current.success = False
                 self._logErrors(res['path'], res['errors'])
             record.addEntry(record_entry)
+            record.addPageTime(res['path'], res['duration'])
 
         logger.debug("Loading %d realm pages..." % len(factories))
         with format_timed_scope(logger,
@@ -242,6 +256,7 @@ class Baker(object):
     def _renderRealmPages(self, record, pool, factories):
         def _handler(res):
             entry = record.getCurrentEntry(res['path'])
+            record.addPageTime(res['path'], res['duration'])
             if res['errors']:
                 entry.errors += res['errors']
                 record.current.success = False
@@ -296,6 +311,7 @@ class Baker(object):
         def _handler(res):
             entry = record.getCurrentEntry(res['path'])
             entry.subs = res['sub_entries']
+            record.addPageTime(res['path'], res['duration'])
             if res['errors']:
                 entry.errors += res['errors']
                 self._logErrors(res['path'], res['errors'])
@@ -317,6 +333,7 @@ class Baker(object):
                 if job is not None:
                     jobs.append(job)
 
+            pool.broadcastContext(make_bake_job_context(record))
             ar = pool.queueJobs(jobs, handler=_handler)
             ar.wait()
 
@@ -368,9 +385,7 @@ class Baker(object):
                         'factory_info': save_factory(fac),
                         'generator_name': None,
                         'generator_record_key': None,
-                        'route_index': route_index,
-                        'route_metadata': route_metadata,
-                        'dirty_source_names': record.dirty_source_names
+                        'route_index': route_index
                         }
                 }
         return job
@@ -388,6 +403,26 @@ class Baker(object):
                 # by the user.
                 pass
 
+    def _handleWriteErrors(self, record, write_errors):
+        # Outputs are written asynchronously, so failures are only known
+        # once the workers are done. Put them on the sub-entries they
+        # belong to.
+        if not write_errors:
+            return
+
+        record.current.success = False
+        subs_by_out_path = {}
+        for entry in record.current.entries:
+            for sub in entry.subs:
+                subs_by_out_path[sub.out_path] = (entry, sub)
+        for out_path, error in write_errors:
+            entry, sub = subs_by_out_path.get(out_path, (None, None))
+            if sub is not None:
+                sub.errors.append(error)
+                self._logErrors(entry.path, [error])
+            else:
+                logger.error(error)
+
     def _logErrors(self, path, errors):
         rel_path = os.path.relpath(path, self.app.root_dir)
         logger.error("Errors found in %s:" % rel_path)
@@ -395,7 +430,7 @@ class Baker(object):
             logger.error("  " + e)
 
     def _createWorkerPool(self, previous_record_path):
-        from piecrust.app import PieCrustFactory
+        from piecrust.app import PieCrustFactory, PieCrustSnapshot
         from piecrust.workerpool import WorkerPool
         from piecrust.baking.worker import BakeWorkerContext, BakeWorker
 
@@ -406,20 +441,24 @@ class Baker(object):
                 config_variant=self.applied_config_variant,
                 config_values=self.applied_config_values,
                 debug=self.app.debug,
-                theme_site=self.app.theme_site)
+                theme_site=self.app.theme_site,
+                snapshot=PieCrustSnapshot(self.app))
 
         worker_count = self.app.config.get('baker/workers')
         batch_size = self.app.config.get('baker/batch_size')
+        start_method = self.app.config.get('baker/worker_start_method')
 
         ctx = BakeWorkerContext(
                 appfactory,
                 self.out_dir,
                 force=self.force,
-                previous_record_path=previous_record_path)
+                previous_record_path=previous_record_path,
+                trace=self.trace)
         pool = WorkerPool(
                 worker_count=worker_count,
                 batch_size=batch_size,
                 worker_class=BakeWorker,
-                initargs=(ctx,))
+                initargs=(ctx,),
+                start_method=start_method)
         return pool
 
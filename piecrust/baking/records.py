@@ -1,8 +1,11 @@
+import sys
 import copy
+import heapq
 import os.path
 import hashlib
 import logging
-from piecrust.records import Record, TransitionalRecord
+from piecrust.configuration import freeze_value
+from piecrust.records import Record, RecordEntry, TransitionalRecord
 
 
 logger = logging.getLogger(__name__)
@@ -15,8 +18,12 @@ def _get_transition_key(path, extra_key=None):
     return hashlib.md5(key.encode('utf8')).hexdigest()
 
 
+def get_bake_record_id(out_dir):
+    return hashlib.md5(out_dir.encode('utf8')).hexdigest()
+
+
 class BakeRecord(Record):
-    RECORD_VERSION = 20
+    RECORD_VERSION = 23
 
     def __init__(self):
         super(BakeRecord, self).__init__()
@@ -26,9 +33,13 @@ class BakeRecord(Record):
         self.total_baked_count = {}
         self.deleted = []
         self.success = True
+        self.slowest_pages = []  # (path, extra_key, duration) tuples
 
 
-class SubPageBakeInfo(object):
+class SubPageBakeInfo(RecordEntry):
+    __slots__ = ['out_uri', 'out_path', 'flags', 'errors', 'render_info',
+                 'assets']
+
     FLAG_NONE = 0
     FLAG_BAKED = 2**0
     FLAG_FORCED_BY_SOURCE = 2**1
@@ -42,6 +53,7 @@ class SubPageBakeInfo(object):
         self.flags = self.FLAG_NONE
         self.errors = []
         self.render_info = [None, None]  # Same length as RENDER_PASSES
+        self.assets = {}  # Output path -> copy mode
 
     @property
     def was_clean(self):
@@ -62,27 +74,35 @@ class SubPageBakeInfo(object):
         return False
 
     def copyRenderInfo(self):
-        return copy.deepcopy(self.render_info)
+        return list(self.render_info)
 
 
-class BakeRecordEntry(object):
+class BakeRecordEntry(RecordEntry):
     """ An entry in the bake record.
     """
+    __slots__ = ['source_name', 'path', 'extra_key', 'flags', 'config',
+                 'timestamp', 'errors', 'subs']
+
     FLAG_NONE = 0
     FLAG_NEW = 2**0
     FLAG_SOURCE_MODIFIED = 2**1
     FLAG_OVERRIDEN = 2**2
 
     def __init__(self, source_name, path, extra_key=None):
-        self.source_name = source_name
+        self.source_name = sys.intern(source_name)
         self.path = path
-        self.extra_key = extra_key
+        self.extra_key = _intern_str(extra_key)
         self.flags = self.FLAG_NONE
         self.config = None
         self.timestamp = None
         self.errors = []
         self.subs = []
 
+    def __setstate__(self, state):
+        super(BakeRecordEntry, self).__setstate__(state)
+        self.source_name = sys.intern(self.source_name)
+        self.extra_key = _intern_str(self.extra_key)
+
     @property
     def path_mtime(self):
         return os.path.getmtime(self.path)
@@ -143,6 +163,38 @@ class TransitionalBakeRecord(TransitionalRecord):
         super(TransitionalBakeRecord, self).__init__(BakeRecord,
                                                      previous_path)
         self.dirty_source_names = set()
+        self._page_times = {}
+        self._config_table = {}
+
+    def addPageTime(self, path, duration, extra_key=None):
+        key = (path, extra_key)
+        self._page_times[key] = self._page_times.get(key, 0) + duration
+
+    def collectSlowestPages(self, count):
+        slowest = heapq.nlargest(
+                count, self._page_times.items(), key=lambda i: i[1])
+        self.current.slowest_pages = [
+                (path, extra_key, duration)
+                for (path, extra_key), duration in slowest]
+
+    def internConfig(self, config):
+        """ Returns a configuration equal to the given one, with interned
+            keys and strings, and that is shared with any other entry that
+            has the same configuration.
+        """
+        if config is None:
+            return None
+        config = _intern_config_value(config)
+        try:
+            key = hash(freeze_value(config))
+        except TypeError:
+            return config
+        candidates = self._config_table.setdefault(key, [])
+        for c in candidates:
+            if c == config:
+                return c
+        candidates.append(config)
+        return config
 
     def addEntry(self, entry):
         if (self.previous.bake_time and
@@ -202,3 +254,20 @@ class TransitionalBakeRecord(TransitionalRecord):
     def _onNewEntryAdded(self, entry):
         entry.flags |= BakeRecordEntry.FLAG_NEW
 
+
+def _intern_str(value):
+    if isinstance(value, str):
+        return sys.intern(value)
+    return value
+
+
+def _intern_config_value(value):
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, dict):
+        return value.__class__(
+                (_intern_str(k), _intern_config_value(v))
+                for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return value.__class__(_intern_config_value(v) for v in value)
+    return value
@@ -1,11 +1,9 @@
 import os.path
-import queue
-import shutil
 import logging
-import threading
 import urllib.parse
-from piecrust import ASSET_DIR_SUFFIX
 from piecrust.baking.records import SubPageBakeInfo
+from piecrust.baking.writer import OutputWriter, ensure_dir_exists
+from piecrust.copyutil import FileCopier
 from piecrust.rendering import (
         QualifiedPage, PageRenderingContext, render_page,
         PASS_FORMATTING)
@@ -19,24 +17,6 @@ class BakingError(Exception):
     pass
 
 
-def _text_writer(q):
-    while True:
-        item = q.get()
-        if item is not None:
-            out_path, txt = item
-            out_dir = os.path.dirname(out_path)
-            _ensure_dir_exists(out_dir)
-
-            with open(out_path, 'w', encoding='utf8') as fp:
-                fp.write(txt)
-
-            q.task_done()
-        else:
-            # Sentinel object, terminate the thread.
-            q.task_done()
-            break
-
-
 class PageBaker(object):
     def __init__(self, app, out_dir, force=False, copy_assets=True):
         self.app = app
@@ -45,16 +25,22 @@ class PageBaker(object):
         self.copy_assets = copy_assets
         self.site_root = app.config.get('site/root')
         self.pretty_urls = app.config.get('site/pretty_urls')
-        self._writer_queue = queue.Queue()
-        self._writer = threading.Thread(
-                name='PageSerializer',
-                target=_text_writer,
-                args=(self._writer_queue,))
-        self._writer.start()
+        skip_identical = app.config.get('baker/skip_identical_outputs',
+                                        False)
+        self._writer = OutputWriter(
+                thread_count=app.config.get('baker/writer_threads', 2),
+                queue_size=app.config.get('baker/writer_queue_size', 64),
+                skip_identical=skip_identical)
+        self._copier = FileCopier(
+                app.config.get('baker/copy_mode', 'copy'),
+                skip_identical=skip_identical,
+                preserve_times=True)
+
+    def flush(self):
+        return self._writer.flush()
 
     def shutdown(self):
-        self._writer_queue.put_nowait(None)
-        self._writer.join()
+        self._writer.shutdown()
 
     def getOutputPath(self, uri):
         uri_root, uri_path = split_uri(self.app, uri)
@@ -117,6 +103,7 @@ class PageBaker(object):
             # Keep trying for as many subs as we know this page has.
             if not do_bake:
                 sub_entry.render_info = prev_sub_entry.copyRenderInfo()
+                sub_entry.assets = dict(prev_sub_entry.assets)
                 sub_entry.flags = SubPageBakeInfo.FLAG_NONE
 
                 if prev_entry.num_subs >= cur_sub + 1:
@@ -165,16 +152,15 @@ class PageBaker(object):
                                                       out_name_noext)
 
                 logger.debug("Copying page assets to: %s" % out_assets_dir)
-                _ensure_dir_exists(out_assets_dir)
+                ensure_dir_exists(out_assets_dir)
 
-                page_pathname, _ = os.path.splitext(qualified_page.path)
-                in_assets_dir = page_pathname + ASSET_DIR_SUFFIX
-                for fn in os.listdir(in_assets_dir):
-                    full_fn = os.path.join(in_assets_dir, fn)
-                    if os.path.isfile(full_fn):
-                        dest_ap = os.path.join(out_assets_dir, fn)
-                        logger.debug("  %s -> %s" % (full_fn, dest_ap))
-                        shutil.copy(full_fn, dest_ap)
+                assets = self.app.env.page_asset_index.getAssets(
+                        qualified_page.path)
+                for asset in assets:
+                    dest_ap = os.path.join(out_assets_dir, asset.filename)
+                    logger.debug("  %s -> %s" % (asset.path, dest_ap))
+                    mode = self._copier.copy(asset.path, dest_ap)
+                    sub_entry.assets[dest_ap] = mode
 
             # Figure out if we have more work.
             has_more_subs = False
@@ -190,11 +176,14 @@ class PageBaker(object):
         if qp.route.is_generator_route:
             qp.route.generator.prepareRenderContext(ctx)
 
-        with self.app.env.timerScope("PageRender"):
+        trace_args = None
+        if self.app.env.is_tracing:
+            trace_args = {'uri': ctx.uri, 'sub_num': num}
+        with self.app.env.timerScope("PageRender", trace_args=trace_args):
             rp = render_page(ctx)
 
         with self.app.env.timerScope("PageSerialize"):
-            self._writer_queue.put_nowait((out_path, rp.content))
+            self._writer.write(out_path, rp.content)
 
         return rp
 
@@ -262,15 +251,3 @@ def _get_dirty_source_names_and_render_passes(sub_entry, dirty_source_names):
                     break
     return dirty_for_this, invalidated_render_passes
 
-
-def _ensure_dir_exists(path):
-    try:
-        os.makedirs(path, mode=0o755, exist_ok=True)
-    except OSError:
-        # In a multiprocess environment, several process may very
-        # occasionally try to create the same directory at the same time.
-        # Let's ignore any error and if something's really wrong (like file
-        # acces permissions or whatever), then it will more legitimately fail
-        # just after this when we try to write files.
-        pass
-
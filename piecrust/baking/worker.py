@@ -16,14 +16,24 @@ logger = logging.getLogger(__name__)
 
 class BakeWorkerContext(object):
     def __init__(self, appfactory, out_dir, *,
-                 force=False, previous_record_path=None):
+                 force=False, previous_record_path=None, trace=False):
         self.appfactory = appfactory
         self.out_dir = out_dir
         self.force = force
         self.previous_record_path = previous_record_path
+        self.trace = trace
         self.app = None
         self.previous_record = None
         self.previous_record_index = None
+        self.dirty_source_names = set()
+
+
+def _warm_up_app(app):
+    app.plugin_loader.getFormatters()
+    app.plugin_loader.getTemplateEngines()
+    app.sources
+    app.routes
+    app.generators
 
 
 class BakeWorker(IWorker):
@@ -31,17 +41,31 @@ class BakeWorker(IWorker):
         self.ctx = ctx
         self.work_start_time = time.perf_counter()
 
+    @classmethod
+    def preload(cls, ctx):
+        # Create the app before the workers are forked, and load everything
+        # that doesn't depend on the worker.
+        app = ctx.appfactory.create()
+        _warm_up_app(app)
+        ctx.app = app
+
     def initialize(self):
-        # Create the app local to this worker.
-        app = self.ctx.appfactory.create()
+        # Create the app local to this worker, unless it was preloaded.
+        app = self.ctx.app
+        if app is None:
+            app = self.ctx.appfactory.create()
         app.config.set('baker/is_baking', True)
         app.config.set('baker/worker_id', self.wid)
         app.env.base_asset_url_format = '%uri%'
         app.env.fs_cache_only_for_main_page = True
+        if self.ctx.trace:
+            app.env.enableTracing("BakeWorker_%d" % self.wid, self.wid)
         app.env.registerTimer("BakeWorker_%d_Total" % self.wid)
         app.env.registerTimer("BakeWorkerInit")
         app.env.registerTimer("JobReceive")
         app.env.registerCounter("SourceUseAbortions")
+        app.env.registerCounter("OutputsWritten")
+        app.env.registerCounter("OutputsSkipped")
         app.env.registerManifest("LoadJobs")
         app.env.registerManifest("RenderJobs")
         app.env.registerManifest("BakeJobs")
@@ -69,17 +93,38 @@ class BakeWorker(IWorker):
 
     def process(self, job):
         handler = self.job_handlers[job['type']]
-        with self.ctx.app.env.timerScope(type(handler).__name__):
-            return handler.handleJob(job['job'])
+        trace_args = None
+        if self.ctx.app.env.is_tracing:
+            trace_args = {'path': get_job_page_path(job)}
+
+        start_time = time.perf_counter()
+        with self.ctx.app.env.timerScope(type(handler).__name__,
+                                         trace_args=trace_args):
+            result = handler.handleJob(job['job'])
+        result['duration'] = time.perf_counter() - start_time
+        return result
+
+    def updateContext(self, version, data):
+        self.ctx.dirty_source_names = data.get(
+                'dirty_source_names', self.ctx.dirty_source_names)
+
+    def getJobTag(self, job):
+        return type(self.job_handlers[job['type']]).__name__
 
     def getReport(self, pool_reports):
+        # Make sure all outputs are on disk before we report anything.
+        write_errors = []
+        for jh in self.job_handlers.values():
+            write_errors += jh.flush()
+
         self.ctx.app.env.stepTimerSince("BakeWorker_%d_Total" % self.wid,
                                         self.work_start_time)
         data = self.ctx.app.env.getStats()
-        data.timers.update(pool_reports)
+        data.mergeStats(pool_reports)
         return {
                 'type': 'stats',
-                'data': data}
+                'data': data,
+                'write_errors': write_errors}
 
     def shutdown(self):
         for jh in self.job_handlers.values():
@@ -100,6 +145,9 @@ class JobHandler(object):
     def handleJob(self, job):
         raise NotImplementedError()
 
+    def flush(self):
+        return []
+
     def shutdown(self):
         pass
 
@@ -112,6 +160,13 @@ def _get_errors(ex):
     return errors
 
 
+def make_bake_job_context(record):
+    """ Returns the state shared by all the bake jobs, which is broadcast
+        to the workers instead of being sent with each job.
+    """
+    return {'dirty_source_names': record.dirty_source_names}
+
+
 def save_factory(fac):
     return {
             'source_name': fac.source.name,
@@ -124,6 +179,14 @@ def load_factory(app, info):
     return PageFactory(source, info['rel_path'], info['metadata'])
 
 
+def get_job_page_path(job):
+    if job['type'] == JOB_LOAD:
+        info = job['job']
+    else:
+        info = job['job']['factory_info']
+    return '%s:%s' % (info['source_name'], info['rel_path'])
+
+
 class LoadJobHandler(JobHandler):
     def handleJob(self, job):
         # Just make sure the page has been cached.
@@ -190,6 +253,12 @@ class BakeJobHandler(JobHandler):
         super(BakeJobHandler, self).__init__(ctx)
         self.page_baker = PageBaker(ctx.app, ctx.out_dir, ctx.force)
 
+    def flush(self):
+        written, skipped, errors = self.page_baker.flush()
+        self.app.env.stepCounter("OutputsWritten", written)
+        self.app.env.stepCounter("OutputsSkipped", skipped)
+        return errors
+
     def shutdown(self):
         self.page_baker.shutdown()
 
@@ -199,14 +268,19 @@ class BakeJobHandler(JobHandler):
         self.app.env.addManifestEntry('BakeJobs', fac.ref_spec)
 
         route_index = job['route_index']
-        route_metadata = job['route_metadata']
         route = self.app.routes[route_index]
 
         gen_name = job['generator_name']
         gen_key = job['generator_record_key']
-        dirty_source_names = job['dirty_source_names']
+        dirty_source_names = self.ctx.dirty_source_names
 
+        # The route metadata is built the same way as in the main process,
+        # so only generators need to send the extra metadata they add.
         page = fac.buildPage()
+        route_metadata = create_route_metadata(page)
+        extra_route_metadata = job.get('extra_route_metadata')
+        if extra_route_metadata:
+            route_metadata.update(extra_route_metadata)
         qp = QualifiedPage(page, route, route_metadata)
 
         result = {
@@ -0,0 +1,138 @@
+import os
+import os.path
+import queue
+import hashlib
+import logging
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+
+class OutputWriter(object):
+    """ Writes baked outputs to disk from a small pool of threads.
+
+        Outputs are first written to a temporary file next to their
+        destination, and then moved over it, so that nothing ever sees a
+        half-written file. When `skip_identical` is enabled, outputs whose
+        contents are the same as what's already on disk are not written at
+        all, which preserves their modification time.
+    """
+    def __init__(self, *, thread_count=1, queue_size=64,
+                 skip_identical=False):
+        self.skip_identical = skip_identical
+        self._queue = queue.Queue(max(queue_size, thread_count))
+        self._known_dirs = set()
+        self._lock = threading.Lock()
+        self._written_count = 0
+        self._skipped_count = 0
+        self._errors = []
+        self._threads = []
+        for i in range(max(1, thread_count)):
+            t = threading.Thread(
+                    name='PageSerializer_%d' % i,
+                    target=self._run)
+            t.start()
+            self._threads.append(t)
+
+    def write(self, out_path, txt):
+        # This will block if the writer threads are too far behind, so that
+        # we don't keep a lot of rendered pages in memory.
+        self._queue.put((out_path, txt))
+
+    def flush(self):
+        """ Waits until all queued outputs have been written, and returns
+            how many were written and skipped since the last flush, along
+            with a list of `(out_path, error)` tuples for the outputs that
+            couldn't be written.
+        """
+        self._queue.join()
+        with self._lock:
+            res = (self._written_count, self._skipped_count, self._errors)
+            self._written_count = 0
+            self._skipped_count = 0
+            self._errors = []
+        return res
+
+    def shutdown(self):
+        for t in self._threads:
+            self._queue.put(None)
+        for t in self._threads:
+            t.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                # Sentinel object, terminate the thread.
+                self._queue.task_done()
+                break
+
+            out_path, txt = item
+            try:
+                did_write = self._writeOutput(out_path, txt)
+                with self._lock:
+                    if did_write:
+                        self._written_count += 1
+                    else:
+                        self._skipped_count += 1
+            except Exception as ex:
+                logger.debug("Error writing output: %s" % out_path)
+                with self._lock:
+                    self._errors.append(
+                            (out_path, "Error writing output: %s" % ex))
+            finally:
+                self._queue.task_done()
+
+    def _writeOutput(self, out_path, txt):
+        data = txt.encode('utf8')
+        if self.skip_identical and _is_same_content(out_path, data):
+            logger.debug("Skipping identical output: %s" % out_path)
+            return False
+
+        out_dir = os.path.dirname(out_path)
+        if out_dir not in self._known_dirs:
+            ensure_dir_exists(out_dir)
+            self._known_dirs.add(out_dir)
+
+        tmp_path = '%s.%d.%d.tmp' % (out_path, os.getpid(),
+                                     threading.get_ident())
+        try:
+            with open(tmp_path, 'wb') as fp:
+                fp.write(data)
+            os.replace(tmp_path, out_path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        return True
+
+
+def ensure_dir_exists(path):
+    try:
+        os.makedirs(path, mode=0o755, exist_ok=True)
+    except OSError:
+        # In a multiprocess environment, several process may very
+        # occasionally try to create the same directory at the same time.
+        # Let's ignore any error and if something's really wrong (like file
+        # acces permissions or whatever), then it will more legitimately fail
+        # just after this when we try to write files.
+        pass
+
+
+def _is_same_content(path, data, chunk_size=65536):
+    try:
+        if os.path.getsize(path) != len(data):
+            return False
+        h = hashlib.md5()
+        with open(path, 'rb') as fp:
+            while True:
+                chunk = fp.read(chunk_size)
+                if not chunk:
+                    break
+                h.update(chunk)
+    except OSError:
+        return False
+    return h.digest() == hashlib.md5(data).digest()
@@ -155,7 +155,10 @@ def _make_fs_cache_key(key):
 
 class MemCache(object):
     """ Simple memory cache. It can be backed by a simple file-system
-        cache, but items need to be JSON-serializable to do this.
+        cache, but items need to be JSON-serializable to do this. Objects
+        with `__getstate__` and `__setstate__` methods are saved as their
+        state, and it's up to the caller to re-create them when they're
+        read back.
     """
     def __init__(self, size=2048):
         self.cache = repoze.lru.LRUCache(size)
@@ -182,7 +185,7 @@ class MemCache(object):
         self.cache.put(key, item)
         if self.fs_cache and save_to_fs:
             fs_key = _make_fs_cache_key(key)
-            item_raw = json.dumps(item)
+            item_raw = json.dumps(item, default=_json_default)
             self.fs_cache.write(fs_key, item_raw)
 
     def get(self, key, item_maker, fs_cache_time=None, save_to_fs=True):
@@ -216,9 +219,13 @@ class MemCache(object):
 
         # Save to the file-system if needed.
         if self.fs_cache is not None and save_to_fs:
-            item_raw = json.dumps(item)
+            item_raw = json.dumps(item, default=_json_default)
             self.fs_cache.write(fs_key, item_raw)
 
         return item
 
 
+def _json_default(obj):
+    if getattr(type(obj), '__setstate__', None) is None:
+        raise TypeError("Can't serialize object to JSON: %r" % obj)
+    return obj.__getstate__()
@@ -1,5 +1,6 @@
 import logging
 import argparse
+import importlib
 import functools
 from piecrust.pathutil import SiteNotFoundError
 
@@ -36,6 +37,49 @@ class ChefCommand(object):
         return self.run(ctx)
 
 
+class LazyChefCommand(ChefCommand):
+    """ A command whose name and description are known up-front, but whose
+        implementation is only imported when it's actually needed. This
+        keeps `chef` from importing everything just to parse the command
+        line.
+    """
+    def __init__(self, name, description, class_path, *,
+                 requires_website=True, cache_name='default'):
+        super(LazyChefCommand, self).__init__()
+        self.name = name
+        self.description = description
+        self.requires_website = requires_website
+        self.cache_name = cache_name
+        self.class_path = class_path
+        self._command = None
+
+    @property
+    def command(self):
+        if self._command is None:
+            mod_name, cls_name = self.class_path.rsplit('.', 1)
+            mod = importlib.import_module(mod_name)
+            self._command = getattr(mod, cls_name)()
+            if self._command.name != self.name:
+                raise Exception("Command '%s' was registered as '%s'." %
+                                (self._command.name, self.name))
+        return self._command
+
+    def setupParser(self, parser, app):
+        self.command.setupParser(parser, app)
+
+    def run(self, ctx):
+        return self.command.run(ctx)
+
+    def checkedRun(self, ctx):
+        return self.command.checkedRun(ctx)
+
+    def __getattr__(self, name):
+        # Forward anything else to the actual command.
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.command, name)
+
+
 class ExtendableChefCommand(ChefCommand):
     def __init__(self):
         super(ExtendableChefCommand, self).__init__()
@@ -73,11 +117,11 @@ class HelpCommand(ExtendableChefCommand):
         self.name = 'help'
         self.description = "Prints help about PieCrust's chef."
         self.requires_website = False
-        self._topic_providers = []
+        self._topic_providers = None
 
     @property
     def has_topics(self):
-        return len(self._topic_providers) > 0
+        return bool(self._topic_providers)
 
     def getTopics(self):
         return [(n, d) for (n, d, e) in self._topic_providers]
@@ -85,7 +129,12 @@ class HelpCommand(ExtendableChefCommand):
     def setupParser(self, parser, app):
         parser.add_argument('topic', nargs='?',
                 help="The command name or topic on which to get help.")
+        self.loadTopics(app)
 
+    def loadTopics(self, app):
+        if self._topic_providers is not None:
+            return
+        self._topic_providers = []
         extensions = self.getExtensions(app)
         for ext in extensions:
             for name, desc in ext.getHelpTopics():
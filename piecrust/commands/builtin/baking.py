@@ -1,11 +1,12 @@
 import time
+import json
 import os.path
 import logging
 import hashlib
 import fnmatch
 import datetime
 from colorama import Fore
-from piecrust import CACHE_DIR
+from piecrust import CACHE_DIR, sampling
 from piecrust.baking.baker import Baker
 from piecrust.baking.records import (
         BakeRecord, BakeRecordEntry, SubPageBakeInfo)
@@ -59,13 +60,39 @@ class BakeCommand(ChefCommand):
                 '--show-stats',
                 help="Show detailed information about the bake.",
                 action='store_true')
+        parser.add_argument(
+                '--trace',
+                help="Record the timing of each job, page, rendering pass, "
+                     "template, formatter, and processor, and save it to "
+                     "the given file in the Chrome trace-event format "
+                     "(or as JSON lines if the file ends with `.jsonl`).")
+        parser.add_argument(
+                '--profile',
+                help="Profile the bake with a sampling profiler, and save "
+                     "the collapsed stacks of all processes to the given "
+                     "file, ready to be turned into a flame graph.")
 
     def run(self, ctx):
+        if not ctx.args.profile:
+            return self._doRun(ctx)
+
+        sampling.start_sampling()
+        sampling.set_thread_tag('Baker')
+        try:
+            return self._doRun(ctx)
+        finally:
+            samples = sampling.stop_sampling()
+            sampling.save_collapsed_stacks(ctx.args.profile, samples)
+            logger.info("Saved profile to: %s" % ctx.args.profile)
+
+    def _doRun(self, ctx):
         out_dir = (ctx.args.output or
                    os.path.join(ctx.app.root_dir, '_counter'))
 
         success = True
         ctx.stats = {}
+        ctx.trace_events = [] if ctx.args.trace else None
+        ctx.bake_record = None
         start_time = time.perf_counter()
         try:
             # Bake the site sources.
@@ -81,6 +108,13 @@ class BakeCommand(ChefCommand):
                 logger.info("-------------------")
                 logger.info("Timing information:")
                 _show_stats(ctx.stats)
+                if ctx.bake_record is not None:
+                    _show_slowest_pages(ctx.bake_record, ctx.app.root_dir)
+
+            # Save the trace.
+            if ctx.trace_events is not None:
+                _save_trace(ctx.args.trace, ctx.trace_events)
+                logger.info("Saved trace to: %s" % ctx.args.trace)
 
             # All done.
             logger.info('-------------------------')
@@ -102,9 +136,13 @@ class BakeCommand(ChefCommand):
                 ctx.app, out_dir,
                 force=ctx.args.force,
                 applied_config_variant=ctx.config_variant,
-                applied_config_values=ctx.config_values)
+                applied_config_values=ctx.config_values,
+                trace=ctx.trace_events is not None)
         record = baker.bake()
         _merge_stats(record.stats, ctx.stats)
+        if baker.trace_events:
+            ctx.trace_events += baker.trace_events
+        ctx.bake_record = record
         return record.success
 
     def _bakeAssets(self, ctx, out_dir):
@@ -112,9 +150,12 @@ class BakeCommand(ChefCommand):
                 ctx.app, out_dir,
                 force=ctx.args.force,
                 applied_config_variant=ctx.config_variant,
-                applied_config_values=ctx.config_values)
+                applied_config_values=ctx.config_values,
+                trace=ctx.trace_events is not None)
         record = proc.run()
         _merge_stats(record.stats, ctx.stats)
+        if proc.trace_events:
+            ctx.trace_events += proc.trace_events
         return record.success
 
 
@@ -159,6 +200,32 @@ def _show_stats(stats, *, full=False):
                     logger.info("%s  - %s" % (indent, v))
 
 
+def _show_slowest_pages(record, root_dir):
+    slowest_pages = getattr(record, 'slowest_pages', None)
+    if not slowest_pages:
+        return
+    logger.info('Slowest pages:')
+    for path, extra_key, duration in slowest_pages:
+        rel_path = path
+        if path.startswith(root_dir):
+            rel_path = os.path.relpath(path, root_dir)
+        if extra_key:
+            rel_path += ' [%s]' % extra_key
+        logger.info("    [%s%8.1f ms%s] %s" %
+                    (Fore.GREEN, duration * 1000.0, Fore.RESET, rel_path))
+
+
+def _save_trace(path, events):
+    events = sorted(events, key=lambda e: e.get('ts', 0))
+    with open(path, 'w', encoding='utf8') as fp:
+        if path.endswith('.jsonl'):
+            for e in events:
+                fp.write(json.dumps(e))
+                fp.write('\n')
+        else:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, fp)
+
+
 class ShowRecordCommand(ChefCommand):
     def __init__(self):
         super(ShowRecordCommand, self).__init__()
@@ -230,6 +297,8 @@ class ShowRecordCommand(ChefCommand):
             if proc_rec:
                 _merge_stats(proc_rec.stats, stats)
             _show_stats(stats, full=False)
+            if bake_rec:
+                _show_slowest_pages(bake_rec, ctx.app.root_dir)
 
     def _getBakeRecord(self, ctx, record_name):
         record_cache = ctx.app.cache.getCache('baker')
@@ -304,6 +373,11 @@ class ShowRecordCommand(ChefCommand):
                 logging.info("     path:   %s" % os.path.relpath(
                         sub.out_path, record.out_dir))
                 logging.info("     flags:  %s" % _join(sub_flags))
+                if sub.assets:
+                    logging.info("     assets:")
+                    for ap, mode in sub.assets.items():
+                        logging.info("     - %s [%s]" % (
+                                os.path.relpath(ap, record.out_dir), mode))
 
                 pass_names = {
                         PASS_FORMATTING: 'formatting pass',
@@ -377,6 +451,10 @@ class ShowRecordCommand(ChefCommand):
             logger.info(" - ")
             logger.info("   path:      %s" % rel_path)
             logger.info("   out paths: %s" % entry.rel_outputs)
+            if entry.copy_modes:
+                logger.info("   copied:    %s" % _join(
+                        ['%s [%s]' % (o, m)
+                         for o, m in entry.copy_modes.items()]))
             logger.info("   flags:     %s" % _join(flags))
             logger.info("   proc tree: %s" % _format_proc_tree(
                     entry.proc_tree, 14*' '))
@@ -1,4 +1,6 @@
+import os
 import logging
+from piecrust import sampling
 from piecrust.commands.base import ChefCommand
 from piecrust.serving.wrappers import run_werkzeug_server, run_gunicorn_server
 
@@ -35,6 +37,11 @@ class ServeCommand(ChefCommand):
                 help="The WSGI server implementation to use",
                 choices=['werkzeug', 'gunicorn'],
                 default='werkzeug')
+        parser.add_argument(
+                '--profile',
+                help="Profile the requests and the asset processing loop "
+                     "with a sampling profiler, and save the collapsed "
+                     "stacks to the given file when the server exits.")
 
     def run(self, ctx):
         root_dir = ctx.app.root_dir
@@ -52,6 +59,27 @@ class ServeCommand(ChefCommand):
                 debug=ctx.app.debug,
                 theme_site=ctx.app.theme_site)
 
+        # When using Werkzeug's reloader, only profile the child process,
+        # since that's the one actually serving requests.
+        profile_path = ctx.args.profile
+        if (profile_path and ctx.args.wsgi == 'werkzeug' and
+                ctx.args.use_reloader and
+                os.environ.get('WERKZEUG_RUN_MAIN') != 'true'):
+            profile_path = None
+
+        if not profile_path:
+            self._runServer(ctx, appfactory, host, port, debug)
+            return
+
+        sampling.start_sampling()
+        try:
+            self._runServer(ctx, appfactory, host, port, debug)
+        finally:
+            samples = sampling.stop_sampling()
+            sampling.save_collapsed_stacks(profile_path, samples)
+            logger.info("Saved profile to: %s" % profile_path)
+
+    def _runServer(self, ctx, appfactory, host, port, debug):
         if ctx.args.wsgi == 'werkzeug':
             run_werkzeug_server(
                     appfactory, host, port,
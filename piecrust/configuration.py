@@ -197,6 +197,23 @@ def _recurse_visit_dict(cur, parent_path, visitor):
             _recurse_visit_dict(v, key_path, visitor)
 
 
+def freeze_value(value, *, freeze_dicts=True):
+    """ Returns an immutable copy of the given value, where lists, tuples
+        and sets become tuples, and dictionaries become frozen sets of
+        items. With `freeze_dicts` set to False, dictionaries are copied
+        instead, with their values frozen.
+    """
+    if isinstance(value, dict):
+        if freeze_dicts:
+            return frozenset((k, freeze_value(v)) for k, v in value.items())
+        return {k: freeze_value(v, freeze_dicts=False)
+                for k, v in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(freeze_value(v, freeze_dicts=freeze_dicts)
+                     for v in value)
+    return value
+
+
 header_regex = re.compile(
         r'(---\s*\n)(?P<header>(.*\n)*?)^(---\s*\n)', re.MULTILINE)
 
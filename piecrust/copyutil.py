@@ -0,0 +1,164 @@
+import os
+import os.path
+import errno
+import shutil
+import hashlib
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+COPY_MODE_COPY = 'copy'
+COPY_MODE_HARDLINK = 'hardlink'
+COPY_MODE_REFLINK = 'reflink'
+COPY_MODE_RANGE = 'copy_file_range'
+COPY_SKIPPED = 'skipped'
+
+COPY_MODES = [
+        COPY_MODE_COPY, COPY_MODE_HARDLINK, COPY_MODE_REFLINK,
+        COPY_MODE_RANGE]
+
+# See `linux/fs.h`.
+_FICLONE = 0x40049409
+
+# Errors that mean a copy mode isn't supported for a given source and
+# destination, in which case we fall back to a plain copy.
+_unsupported_errnos = set([
+        errno.EXDEV, errno.EPERM, errno.EACCES, errno.EINVAL,
+        errno.ENOTTY, errno.EOPNOTSUPP, errno.ENOSYS, errno.EMLINK])
+
+
+class FileCopier(object):
+    """ Copies files using the given mode, falling back to a plain copy
+        when that mode isn't supported by the OS or the file-system.
+
+        When `skip_identical` is enabled, files are not copied if the
+        destination already has the same size and contents as the source.
+        When `preserve_times` is also enabled, copies get the modification
+        time of their source, so that a destination with the exact same
+        size and modification time is skipped without reading it.
+    """
+    def __init__(self, mode=COPY_MODE_COPY, *, skip_identical=False,
+                 preserve_times=False):
+        if mode not in COPY_MODES:
+            raise Exception("Unknown copy mode '%s'. Supported modes are: "
+                            "%s" % (mode, ', '.join(COPY_MODES)))
+        self.mode = mode
+        self.skip_identical = skip_identical
+        self.preserve_times = preserve_times
+        self._unsupported_modes = set()
+
+    def copy(self, src, dst):
+        """ Copies `src` to `dst` and returns the copy mode that was
+            actually used, or `COPY_SKIPPED` if nothing was copied.
+        """
+        if self._canSkip(src, dst):
+            logger.debug("Skipping identical file: %s" % dst)
+            return COPY_SKIPPED
+
+        mode = self._copy(src, dst)
+        if self.preserve_times and mode != COPY_MODE_HARDLINK:
+            src_stat = os.stat(src)
+            os.utime(dst, ns=(src_stat.st_atime_ns, src_stat.st_mtime_ns))
+        return mode
+
+    def _copy(self, src, dst):
+        mode = self.mode
+        if mode != COPY_MODE_COPY and mode not in self._unsupported_modes:
+            try:
+                _copy_funcs[mode](src, dst)
+                return mode
+            except OSError as ex:
+                if ex.errno not in _unsupported_errnos:
+                    raise
+                logger.debug("Copy mode '%s' isn't supported for '%s', "
+                             "falling back to copying files: %s" %
+                             (mode, dst, ex))
+                self._unsupported_modes.add(mode)
+
+        shutil.copyfile(src, dst)
+        return COPY_MODE_COPY
+
+    def _canSkip(self, src, dst):
+        try:
+            dst_stat = os.stat(dst)
+        except OSError:
+            return False
+
+        src_stat = os.stat(src)
+        if (src_stat.st_ino == dst_stat.st_ino and
+                src_stat.st_dev == dst_stat.st_dev):
+            # Already hard-linked.
+            return True
+
+        if not self.skip_identical:
+            return False
+        if src_stat.st_size != dst_stat.st_size:
+            return False
+        if (self.preserve_times and
+                src_stat.st_mtime_ns == dst_stat.st_mtime_ns):
+            # We copied this file before, and it hasn't changed since.
+            return True
+        return get_file_hash(src) == get_file_hash(dst)
+
+
+def get_file_hash(path, chunk_size=65536):
+    h = hashlib.md5()
+    with open(path, 'rb') as fp:
+        while True:
+            chunk = fp.read(chunk_size)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _copy_hardlink(src, dst):
+    # Link to a temporary path first so that an existing destination file
+    # is atomically replaced.
+    tmp_dst = '%s.%d.lnk' % (dst, os.getpid())
+    os.link(src, tmp_dst)
+    try:
+        os.replace(tmp_dst, dst)
+    except OSError:
+        os.remove(tmp_dst)
+        raise
+
+
+def _copy_reflink(src, dst):
+    try:
+        import fcntl
+    except ImportError:
+        raise OSError(errno.ENOSYS, "Reflinks aren't supported on this OS.")
+
+    with open(src, 'rb') as ifp, open(dst, 'wb') as ofp:
+        fcntl.ioctl(ofp.fileno(), _FICLONE, ifp.fileno())
+
+
+def _copy_file_range(src, dst):
+    copy_func = getattr(os, 'copy_file_range', None)
+    if copy_func is None:
+        sendfile = getattr(os, 'sendfile', None)
+        if sendfile is None:
+            raise OSError(errno.ENOSYS,
+                          "In-kernel copies aren't supported on this OS.")
+
+        def copy_func(in_fd, out_fd, count):
+            return sendfile(out_fd, in_fd, None, count)
+
+    with open(src, 'rb') as ifp, open(dst, 'wb') as ofp:
+        in_fd = ifp.fileno()
+        out_fd = ofp.fileno()
+        remaining = os.fstat(in_fd).st_size
+        while remaining > 0:
+            copied = copy_func(in_fd, out_fd, remaining)
+            if copied == 0:
+                break
+            remaining -= copied
+
+
+_copy_funcs = {
+        COPY_MODE_HARDLINK: _copy_hardlink,
+        COPY_MODE_REFLINK: _copy_reflink,
+        COPY_MODE_RANGE: _copy_file_range}
@@ -1,7 +1,7 @@
 import os
 import os.path
 import logging
-from piecrust import ASSET_DIR_SUFFIX
+from piecrust import ASSET_DIR_SUFFIX, osutil
 from piecrust.uriutil import multi_replace
 
 
@@ -31,6 +31,56 @@ def build_base_url(app, uri, rel_assets_path):
     return base_url.rstrip('/') + '/'
 
 
+class PageAsset(object):
+    __slots__ = ['filename', 'path']
+
+    def __init__(self, filename, path):
+        self.filename = filename
+        self.path = path
+
+
+class PageAssetIndex(object):
+    """ Lists the assets of an application's pages. Each directory
+        containing pages is listed once to know which pages have an assets
+        directory, and each assets directory is listed once, no matter how
+        many times the page gets rendered, listed, or baked.
+    """
+    def __init__(self):
+        self._dir_names = {}
+        self._assets = {}
+
+    def getAssets(self, page_path):
+        assets = self._assets.get(page_path)
+        if assets is None:
+            assets = self._listAssets(page_path)
+            self._assets[page_path] = assets
+        return assets
+
+    def _listAssets(self, page_path):
+        name, ext = os.path.splitext(page_path)
+        assets_dir = name + ASSET_DIR_SUFFIX
+        parent_dir, assets_dirname = os.path.split(assets_dir)
+
+        names = self._dir_names.get(parent_dir)
+        if names is None:
+            try:
+                names = set(osutil.listdir(parent_dir))
+            except OSError:
+                names = set()
+            self._dir_names[parent_dir] = names
+        if assets_dirname not in names:
+            return []
+
+        assets = []
+        for fn in sorted(osutil.listdir(assets_dir)):
+            full_fn = os.path.join(assets_dir, fn)
+            if not os.path.isfile(full_fn):
+                logger.debug("Skipping: %s" % full_fn)
+                continue
+            assets.append(PageAsset(fn, full_fn))
+        return assets
+
+
 class Assetor(object):
     debug_render_doc = """Helps render URLs to files in the current page's
                           asset folder."""
@@ -70,24 +120,22 @@ class Assetor(object):
             return
 
         self._cache = {}
-        name, ext = os.path.splitext(self._page.path)
-        assets_dir = name + ASSET_DIR_SUFFIX
-        if not os.path.isdir(assets_dir):
+        app = self._page.app
+        assets = app.env.page_asset_index.getAssets(self._page.path)
+        if not assets:
             return
 
-        rel_assets_dir = os.path.relpath(assets_dir, self._page.app.root_dir)
-        base_url = build_base_url(self._page.app, self._uri, rel_assets_dir)
-        for fn in os.listdir(assets_dir):
-            full_fn = os.path.join(assets_dir, fn)
-            if not os.path.isfile(full_fn):
-                raise Exception("Skipping: %s" % full_fn)
-                continue
-
+        name, ext = os.path.splitext(self._page.path)
+        assets_dir = name + ASSET_DIR_SUFFIX
+        rel_assets_dir = os.path.relpath(assets_dir, app.root_dir)
+        base_url = build_base_url(app, self._uri, rel_assets_dir)
+        for asset in assets:
+            fn = asset.filename
             name, ext = os.path.splitext(fn)
             if name in self._cache:
                 raise UnsupportedAssetsError(
                         "Multiple asset files are named '%s'." % name)
-            self._cache[name] = (base_url + fn, full_fn)
+            self._cache[name] = (base_url + fn, asset.path)
 
         cpi = self._page.app.env.exec_info_stack.current_page_info
         if cpi is not None:
@@ -68,3 +68,89 @@ class MergedMapping(collections.abc.Mapping):
     def _appendMapping(self, d):
         self._dicts.append(d)
 
+
+class LayeredMapping(collections.abc.Mapping):
+    """ Like `MergedMapping`, but values are only resolved once, and nested
+        mappings found in more than one layer are merged once too. Plain
+        dictionaries are looked up by key only, which saves failed
+        `getattr` calls.
+    """
+    def __init__(self, layers, path=''):
+        self._layers = layers
+        self._path = path
+        self._resolved = {}
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError("No such attribute: %s" % self._subp(name))
+
+    def __getitem__(self, name):
+        try:
+            return self._resolved[name]
+        except KeyError:
+            pass
+
+        val = self._resolve(name)
+        self._resolved[name] = val
+        return val
+
+    def __iter__(self):
+        keys = set()
+        for d in self._layers:
+            keys |= set(d.keys())
+        return iter(keys)
+
+    def __len__(self):
+        keys = set()
+        for d in self._layers:
+            keys |= set(d.keys())
+        return len(keys)
+
+    def _resolve(self, name):
+        values = []
+        for d in self._layers:
+            if type(d) is dict:
+                if name in d:
+                    values.append(d[name])
+                continue
+
+            try:
+                values.append(getattr(d, name))
+                continue
+            except AttributeError:
+                pass
+
+            try:
+                values.append(d[name])
+            except KeyError:
+                pass
+
+        if len(values) == 0:
+            raise KeyError("No such item: %s" % self._subp(name))
+        if len(values) == 1:
+            return values[0]
+
+        for val in values:
+            if not isinstance(val, (dict, collections.abc.Mapping)):
+                raise Exception(
+                        "Template data for '%s' contains an incompatible mix "
+                        "of data: %s" % (
+                            self._subp(name),
+                            ', '.join([str(type(v)) for v in values])))
+
+        return LayeredMapping(values, self._subp(name))
+
+    def _subp(self, name):
+        return '%s/%s' % (self._path, name)
+
+    def _prependMapping(self, d):
+        self._layers.insert(0, d)
+        self._resolved.clear()
+
+    def _appendMapping(self, d):
+        self._layers.append(d)
+        self._resolved.clear()
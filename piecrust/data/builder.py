@@ -1,7 +1,7 @@
 import logging
 from werkzeug.utils import cached_property
 from piecrust.data.assetor import Assetor
-from piecrust.data.base import MergedMapping
+from piecrust.data.base import LayeredMapping
 from piecrust.data.linker import PageLinkerData
 from piecrust.data.pagedata import PageData
 from piecrust.data.paginator import Paginator
@@ -53,7 +53,7 @@ def build_page_data(ctx):
 
     site_data = app.config.getAll()
     providers_data = DataProvidersData(page)
-    data = MergedMapping([data, providers_data, site_data])
+    data = LayeredMapping([data, providers_data, site_data])
 
     # Do this at the end because we want all the data to be ready to be
     # displayed in the debugger window.
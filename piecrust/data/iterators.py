@@ -1,4 +1,6 @@
+import heapq
 import logging
+from piecrust.configuration import freeze_value
 from piecrust.data.filters import PaginationFilter, IsFilterClause, NotClause
 from piecrust.environment import AbortedSourceUseError
 from piecrust.events import Event
@@ -9,6 +11,20 @@ from piecrust.sources.interfaces import IPaginationSource
 logger = logging.getLogger(__name__)
 
 
+def sorted_top(it, count, key=None, reverse=False):
+    """ Returns the same thing as `sorted(it, key=key, reverse=reverse)`
+        truncated to `count` items, along with the total number of items,
+        without sorting all of them.
+    """
+    items = list(it)
+    total_count = len(items)
+    if count >= total_count:
+        return sorted(items, key=key, reverse=reverse), total_count
+    if reverse:
+        return heapq.nlargest(count, items, key=key), total_count
+    return heapq.nsmallest(count, items, key=key), total_count
+
+
 class SliceIterator(object):
     def __init__(self, it, offset=0, limit=-1):
         self.it = it
@@ -17,34 +33,79 @@ class SliceIterator(object):
         self.current_page = None
         self.has_more = False
         self.inner_count = -1
-        self.next_page = None
-        self.prev_page = None
+        self.result_cache = None
+        self.result_cache_key = None
         self._cache = None
+        self._prev_next_pages = None
+
+    @property
+    def next_page(self):
+        return self._getPrevNextPages()[1]
+
+    @property
+    def prev_page(self):
+        return self._getPrevNextPages()[0]
 
     def __iter__(self):
         if self._cache is None:
-            inner_list = list(self.it)
-            self.inner_count = len(inner_list)
+            self._load()
+        return iter(self._cache)
 
-            if self.limit > 0:
-                self.has_more = self.inner_count > (self.offset + self.limit)
-                self._cache = inner_list[self.offset:self.offset + self.limit]
-            else:
-                self.has_more = False
-                self._cache = inner_list[self.offset:]
+    def _load(self):
+        # If we're slicing sorted items, only sort the ones we need.
+        get_sorted_top = getattr(self.it, 'getSortedTop', None)
+        if self.limit > 0 and get_sorted_top is not None:
+            top_count = self.offset + self.limit
+            top = None
+            if self.result_cache is not None:
+                cache_key = (self.result_cache_key, top_count)
+                top = self.result_cache.get(cache_key)
+            if top is None:
+                top = get_sorted_top(top_count)
+                if self.result_cache is not None:
+                    self.result_cache[cache_key] = top
+            top_list, self.inner_count = top
+            self.has_more = self.inner_count > top_count
+            self._cache = top_list[self.offset:]
+            return
 
-            if self.current_page:
-                try:
-                    idx = inner_list.index(self.current_page)
-                except ValueError:
-                    idx = -1
-                if idx >= 0:
-                    if idx < self.inner_count - 1:
-                        self.next_page = inner_list[idx + 1]
-                    if idx > 0:
-                        self.prev_page = inner_list[idx - 1]
+        inner_list = list(self.it)
+        self.inner_count = len(inner_list)
 
-        return iter(self._cache)
+        if self.limit > 0:
+            self.has_more = self.inner_count > (self.offset + self.limit)
+            self._cache = inner_list[self.offset:self.offset + self.limit]
+        else:
+            self.has_more = False
+            self._cache = inner_list[self.offset:]
+
+        self._prev_next_pages = self._findPrevNextPages(inner_list)
+
+    def _getPrevNextPages(self):
+        if self._prev_next_pages is None:
+            # We need all the items for this, so it's only done when
+            # those pages are needed.
+            if self.current_page:
+                self._prev_next_pages = self._findPrevNextPages(
+                        list(self.it))
+            else:
+                self._prev_next_pages = (None, None)
+        return self._prev_next_pages
+
+    def _findPrevNextPages(self, inner_list):
+        prev_page = None
+        next_page = None
+        if self.current_page:
+            try:
+                idx = inner_list.index(self.current_page)
+            except ValueError:
+                idx = -1
+            if idx >= 0:
+                if idx < len(inner_list) - 1:
+                    next_page = inner_list[idx + 1]
+                if idx > 0:
+                    prev_page = inner_list[idx - 1]
+        return (prev_page, next_page)
 
 
 class SettingFilterIterator(object):
@@ -72,6 +133,9 @@ class NaturalSortIterator(object):
     def __iter__(self):
         return iter(sorted(self.it, reverse=self.reverse))
 
+    def getSortedTop(self, count):
+        return sorted_top(self.it, count, reverse=self.reverse)
+
 
 class SettingSortIterator(object):
     def __init__(self, it, name, reverse=False, value_accessor=None):
@@ -84,6 +148,10 @@ class SettingSortIterator(object):
         return iter(sorted(self.it, key=self._key_getter,
                            reverse=self.reverse))
 
+    def getSortedTop(self, count):
+        return sorted_top(self.it, count, key=self._key_getter,
+                          reverse=self.reverse)
+
     def _key_getter(self, item):
         key = self.value_accessor(item, self.name)
         if key is None:
@@ -137,10 +205,16 @@ class PageIterator(object):
         self._pagesData = None
         self._pagination_slicer = None
         self._has_sorter = False
-        self._next_page = None
-        self._prev_page = None
+        self._prev_next_pages = None
         self._iter_event = Event()
 
+        # Results of sorting and slicing pages from a source can be re-used
+        # by any other iterator doing the same thing on the same source, so
+        # we keep track of what this one does.
+        self._cache_key = None
+        if isinstance(source, PageSource):
+            self._cache_key = (source.name,)
+
         if isinstance(source, IPaginationSource):
             src_it = source.getSourceIterator()
             if src_it is not None:
@@ -159,15 +233,18 @@ class PageIterator(object):
                     IsFilterClause(setting_name, True))
             self._simpleNonSortedWrap(
                     PaginationFilterIterator, draft_filter)
+            self._addCacheKey('draft', setting_name)
 
         # Apply any filter first, before we start sorting or slicing.
         if pagination_filter is not None:
             self._simpleNonSortedWrap(PaginationFilterIterator,
                                       pagination_filter)
+            self._cache_key = None
 
         if sorter is not None:
             self._simpleNonSortedWrap(GenericSortIterator, sorter)
             self._has_sorter = True
+            self._cache_key = None
 
         if offset > 0 or limit > 0:
             self.slice(offset, limit)
@@ -183,13 +260,11 @@ class PageIterator(object):
 
     @property
     def next_page(self):
-        self._load()
-        return self._next_page
+        return self._getPrevNextPages()[1]
 
     @property
     def prev_page(self):
-        self._load()
-        return self._prev_page
+        return self._getPrevNextPages()[0]
 
     def __len__(self):
         self._load()
@@ -209,24 +284,27 @@ class PageIterator(object):
             def is_filter(value):
                 conf = {'is_%s' % name[3:]: value}
                 accessor = self._getSettingAccessor()
-                return self._simpleNonSortedWrap(SettingFilterIterator, conf,
-                                                 accessor)
+                self._simpleNonSortedWrap(SettingFilterIterator, conf,
+                                          accessor)
+                return self._addCacheKey('filter', conf)
             return is_filter
 
         if name[:4] == 'has_':
             def has_filter(value):
                 conf = {name: value}
                 accessor = self._getSettingAccessor()
-                return self._simpleNonSortedWrap(SettingFilterIterator, conf,
-                                                 accessor)
+                self._simpleNonSortedWrap(SettingFilterIterator, conf,
+                                          accessor)
+                return self._addCacheKey('filter', conf)
             return has_filter
 
         if name[:5] == 'with_':
             def has_filter(value):
                 conf = {'has_%s' % name[5:]: value}
                 accessor = self._getSettingAccessor()
-                return self._simpleNonSortedWrap(SettingFilterIterator, conf,
-                                                 accessor)
+                self._simpleNonSortedWrap(SettingFilterIterator, conf,
+                                          accessor)
+                return self._addCacheKey('filter', conf)
             return has_filter
 
         return self.__getattribute__(name)
@@ -250,8 +328,9 @@ class PageIterator(object):
                             "header for page: %s" %
                             (filter_name, self._current_page.path))
         accessor = self._getSettingAccessor()
-        return self._simpleNonSortedWrap(SettingFilterIterator, filter_conf,
-                                         accessor)
+        self._simpleNonSortedWrap(SettingFilterIterator, filter_conf,
+                                  accessor)
+        return self._addCacheKey('filter', filter_conf)
 
     def sort(self, setting_name=None, reverse=False):
         self._ensureUnlocked()
@@ -263,7 +342,7 @@ class PageIterator(object):
         else:
             self._pages = NaturalSortIterator(self._pages, reverse)
         self._has_sorter = True
-        return self
+        return self._addCacheKey('sort', setting_name, reverse)
 
     def reset(self):
         self._ensureUnlocked()
@@ -282,9 +361,15 @@ class PageIterator(object):
         self._unload()
         self._ensureSorter()
         self._pages = it_class(self._pages, *args, **kwargs)
-        if self._pagination_slicer is None and it_class is SliceIterator:
-            self._pagination_slicer = self._pages
-            self._pagination_slicer.current_page = self._current_page
+        if it_class is SliceIterator:
+            if self._pagination_slicer is None:
+                self._pagination_slicer = self._pages
+                self._pagination_slicer.current_page = self._current_page
+            if self._cache_key is not None:
+                self._pages.result_cache = \
+                        self._source.app.env.sorted_page_tops
+                self._pages.result_cache_key = self._cache_key
+            self._addCacheKey('slice', self._pages.offset, self._pages.limit)
         return self
 
     def _simpleNonSortedWrap(self, it_class, *args, **kwargs):
@@ -293,6 +378,16 @@ class PageIterator(object):
         self._pages = it_class(self._pages, *args, **kwargs)
         return self
 
+    def _addCacheKey(self, *bits):
+        if self._cache_key is not None:
+            try:
+                bits = freeze_value(bits)
+                hash(bits)
+                self._cache_key += (bits,)
+            except TypeError:
+                self._cache_key = None
+        return self
+
     def _getSettingAccessor(self):
         accessor = None
         if isinstance(self._source, IPaginationSource):
@@ -312,12 +407,12 @@ class PageIterator(object):
             sort_it = self._source.getSorterIterator(self._pages)
             if sort_it is not None:
                 self._pages = sort_it
+                self._addCacheKey('source_sort')
         self._has_sorter = True
 
     def _unload(self):
         self._pagesData = None
-        self._next_page = None
-        self._prev_page = None
+        self._prev_next_pages = None
 
     def _load(self):
         if self._pagesData is not None:
@@ -333,20 +428,24 @@ class PageIterator(object):
         self._ensureSorter()
 
         it_chain = self._pages
-        is_pgn_source = False
         if isinstance(self._source, IPaginationSource):
-            is_pgn_source = True
             tail_it = self._source.getTailIterator(self._pages)
             if tail_it is not None:
                 it_chain = tail_it
 
         self._pagesData = list(it_chain)
 
-        if is_pgn_source and self._current_page and self._pagination_slicer:
-            pn = [self._pagination_slicer.prev_page,
-                    self._pagination_slicer.next_page]
-            pn_it = self._source.getTailIterator(iter(pn))
-            self._prev_page, self._next_page = (list(pn_it))
+    def _getPrevNextPages(self):
+        self._load()
+        if self._prev_next_pages is None:
+            self._prev_next_pages = (None, None)
+            if (isinstance(self._source, IPaginationSource) and
+                    self._current_page and self._pagination_slicer):
+                pn = [self._pagination_slicer.prev_page,
+                      self._pagination_slicer.next_page]
+                pn_it = self._source.getTailIterator(iter(pn))
+                self._prev_next_pages = tuple(pn_it)
+        return self._prev_next_pages
 
     def _debugRenderDoc(self):
         return "Contains %d items" % len(self)
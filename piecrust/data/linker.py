@@ -205,6 +205,44 @@ class _LinkedPage(object):
         return getattr(self._page, name)
 
 
+class SourceHierarchyIndex(object):
+    """ A cache of the listings of a source's directories, shared by all
+        the linkers of an application. Sidebars and such often go through
+        the whole hierarchy of a source for every page, so we don't want to
+        hit the file-system every time.
+    """
+    def __init__(self, source):
+        self._source = source
+        self._listings = {}
+
+    def listPath(self, dir_path):
+        return self._getListing(dir_path)[0]
+
+    def getPageFactory(self, dir_path, name):
+        return self._getListing(dir_path)[1].get(name)
+
+    def _getListing(self, dir_path):
+        listing = self._listings.get(dir_path)
+        if listing is None:
+            items = list(self._source.listPath(dir_path))
+            page_facs = {}
+            for is_dir, name, data in items:
+                if not is_dir:
+                    page_facs[name] = data
+            listing = (items, page_facs)
+            self._listings[dir_path] = listing
+        return listing
+
+
+def get_source_hierarchy_index(source):
+    indexes = source.app.env.source_hierarchy_indexes
+    idx = indexes.get(source.name)
+    if idx is None:
+        idx = SourceHierarchyIndex(source)
+        indexes[source.name] = idx
+    return idx
+
+
 class Linker(object):
     debug_render_doc = """Provides access to sibling and children pages."""
 
@@ -254,16 +292,16 @@ class Linker(object):
         if self._parent is None:
             parent_name = self._source.getBasename(self._dir_path)
             parent_dir_path = self._source.getDirpath(self._dir_path)
-            for is_dir, name, data in self._source.listPath(parent_dir_path):
-                if not is_dir and name == parent_name:
-                    parent_page = data.buildPage()
-                    item = _LinkedPage(parent_page)
-                    item._linker_info.name = parent_name
-                    item._linker_info.child_linker = Linker(
-                            self._source, parent_dir_path,
-                            root_page_path=self._root_page_path)
-                    self._parent = LinkedPageData(item)
-                    break
+            idx = get_source_hierarchy_index(self._source)
+            fac = idx.getPageFactory(parent_dir_path, parent_name)
+            if fac is not None:
+                parent_page = fac.buildPage()
+                item = _LinkedPage(parent_page)
+                item._linker_info.name = parent_name
+                item._linker_info.child_linker = Linker(
+                        self._source, parent_dir_path,
+                        root_page_path=self._root_page_path)
+                self._parent = LinkedPageData(item)
             else:
                 self._parent = Linker(self._source, parent_dir_path,
                                       root_page_path=self._root_page_path)
@@ -312,7 +350,8 @@ class Linker(object):
         if not is_listable:
             raise Exception("Source '%s' can't be listed." % self._source.name)
 
-        items = list(self._source.listPath(self._dir_path))
+        idx = get_source_hierarchy_index(self._source)
+        items = idx.listPath(self._dir_path)
         self._items = collections.OrderedDict()
         for is_dir, name, data in items:
             # If `is_dir` is true, `data` will be the directory's source
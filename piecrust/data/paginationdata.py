@@ -9,23 +9,39 @@ from piecrust.uriutil import split_uri
 logger = logging.getLogger(__name__)
 
 
+def get_page_route_info(page):
+    """ Returns the route, route metadata, and URL of the given page.
+        Those don't change for the lifetime of the application, and pages
+        get listed a lot (menus, archives, etc.), so they're only figured
+        out once.
+    """
+    infos = page.app.env.page_route_infos
+    key = (page.source.name, page.rel_path)
+    info = infos.get(key)
+    if info is None:
+        # TODO: this is not quite correct, as we're missing parts of the
+        #       route metadata if the current page is a taxonomy page.
+        route_metadata = create_route_metadata(page)
+        route = page.app.getSourceRoute(page.source.name, route_metadata)
+        if route is None:
+            raise Exception("Can't get route for page: %s" % page.path)
+        info = (route, route_metadata, route.getUri(route_metadata))
+        infos[key] = info
+    return info
+
+
 class PaginationData(LazyPageConfigData):
     def __init__(self, page):
         super(PaginationData, self).__init__(page)
         self._route = None
         self._route_metadata = None
+        self._uri = None
 
     def _get_uri(self):
-        page = self._page
         if self._route is None:
-            # TODO: this is not quite correct, as we're missing parts of the
-            #       route metadata if the current page is a taxonomy page.
-            route_metadata = create_route_metadata(page)
-            self._route = page.app.getSourceRoute(page.source.name, route_metadata)
-            self._route_metadata = route_metadata
-            if self._route is None:
-                raise Exception("Can't get route for page: %s" % page.path)
-        return self._route.getUri(self._route_metadata)
+            self._route, self._route_metadata, self._uri = \
+                get_page_route_info(self._page)
+        return self._uri
 
     def _load(self):
         page = self._page
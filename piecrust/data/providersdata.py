@@ -5,35 +5,52 @@ import collections.abc
 re_endpoint_sep = re.compile(r'[\/\.]')
 
 
+def build_provider_endpoints(app):
+    """ Returns a tree of dictionaries whose leaves are the lists of sources
+        providing data at each endpoint. This only depends on the website's
+        configuration, so it's built once per application.
+    """
+    endpoints = {}
+    for source in app.sources:
+        endpoint_bits = re_endpoint_sep.split(source.data_endpoint)
+        endpoint = endpoints
+        for e in endpoint_bits[:-1]:
+            if e not in endpoint:
+                endpoint[e] = {}
+            endpoint = endpoint[e]
+        endpoint.setdefault(endpoint_bits[-1], []).append(source)
+    return endpoints
+
+
 class DataProvidersData(collections.abc.Mapping):
-    def __init__(self, page):
+    def __init__(self, page, endpoints=None):
         self._page = page
-        self._dict = None
+        if endpoints is None:
+            endpoints = page.app.env.data_provider_endpoints
+        self._endpoints = endpoints
+        self._dict = {}
 
     def __getitem__(self, name):
-        self._load()
-        return self._dict[name]
+        try:
+            return self._dict[name]
+        except KeyError:
+            pass
+
+        endpoint = self._endpoints[name]
+        if isinstance(endpoint, list):
+            # Data providers can be chained, like for instance with
+            # `site.pages` listing both the theme pages and the user site's
+            # pages.
+            val = None
+            for source in endpoint:
+                val = source.buildDataProvider(self._page, val)
+        else:
+            val = DataProvidersData(self._page, endpoint)
+        self._dict[name] = val
+        return val
 
     def __iter__(self):
-        self._load()
-        return iter(self._dict)
+        return iter(self._endpoints)
 
     def __len__(self):
-        self._load()
-        return len(self._dict)
-
-    def _load(self):
-        if self._dict is not None:
-            return
-
-        self._dict = {}
-        for source in self._page.app.sources:
-            endpoint_bits = re_endpoint_sep.split(source.data_endpoint)
-            endpoint = self._dict
-            for e in endpoint_bits[:-1]:
-                if e not in endpoint:
-                    endpoint[e] = {}
-                endpoint = endpoint[e]
-            override = endpoint.get(endpoint_bits[-1])
-            provider = source.buildDataProvider(self._page, override)
-            endpoint[endpoint_bits[-1]] = provider
+        return len(self._endpoints)
@@ -1,4 +1,6 @@
+import os
 import time
+import bisect
 import logging
 import contextlib
 from piecrust.cache import MemCache
@@ -52,11 +54,83 @@ class ExecutionInfoStack(object):
         self._page_stack = []
 
 
+# Bucket upper bounds, in seconds, good for timing most things.
+DEFAULT_HISTOGRAM_BUCKETS = [
+        0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+        1.0, 2.5, 5.0, 10.0]
+
+
+class Histogram(object):
+    """ Counts values in buckets, so we can cheaply estimate percentiles
+        without keeping all the values around.
+    """
+    def __init__(self, buckets=None):
+        self.buckets = list(buckets or DEFAULT_HISTOGRAM_BUCKETS)
+        # The last count is for values above the last bucket.
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def getPercentile(self, p):
+        """ Estimates the value below which `p` percent of the observed
+            values are, by interpolating inside the matching bucket.
+        """
+        if self.count == 0:
+            return None
+        rank = self.count * p / 100.0
+        seen = 0
+        for i, c in enumerate(self.counts):
+            if c > 0 and seen + c >= rank:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i > 0 else 0
+                upper = self.buckets[i]
+                return lower + (upper - lower) * (rank - seen) / c
+            seen += c
+        return self.buckets[-1]
+
+    def mergeHistogram(self, other):
+        if other.buckets != self.buckets:
+            raise Exception("Can't merge histograms with different buckets.")
+        for i, c in enumerate(other.counts):
+            self.counts[i] += c
+        self.count += other.count
+        self.sum += other.sum
+
+
 class ExecutionStats(object):
     def __init__(self):
         self.timers = {}
         self.counters = {}
         self.manifests = {}
+        self.histograms = {}
+        self.trace_events = None
+
+    @property
+    def is_tracing(self):
+        return self.trace_events is not None
+
+    def enableTracing(self, name, thread_id=0):
+        """ Makes timer scopes also record spans in the Chrome trace-event
+            format, for the given worker.
+        """
+        self.trace_events = []
+        self._trace_pid = os.getpid()
+        self._trace_tid = thread_id
+        self.trace_events.append({
+                'name': 'thread_name', 'ph': 'M',
+                'pid': self._trace_pid, 'tid': thread_id,
+                'args': {'name': name}})
+
+    def popTraceEvents(self):
+        res = self.trace_events
+        self.trace_events = None
+        return res
 
     def registerTimer(self, category, *, raise_if_registered=True):
         if raise_if_registered and category in self.timers:
@@ -65,10 +139,26 @@ class ExecutionStats(object):
         self.timers[category] = 0
 
     @contextlib.contextmanager
-    def timerScope(self, category):
+    def timerScope(self, category, *, trace_args=None):
+        if self.trace_events is None:
+            start = time.perf_counter()
+            yield
+            self.timers[category] += time.perf_counter() - start
+            return
+
+        start_ts = time.time()
         start = time.perf_counter()
         yield
-        self.timers[category] += time.perf_counter() - start
+        duration = time.perf_counter() - start
+        self.timers[category] += duration
+        evt = {
+                'name': category, 'ph': 'X',
+                'ts': int(start_ts * 1000000),
+                'dur': int(duration * 1000000),
+                'pid': self._trace_pid, 'tid': self._trace_tid}
+        if trace_args:
+            evt['args'] = trace_args
+        self.trace_events.append(evt)
 
     def stepTimer(self, category, value):
         self.timers[category] += value
@@ -94,6 +184,16 @@ class ExecutionStats(object):
     def addManifestEntry(self, name, entry):
         self.manifests[name].append(entry)
 
+    def registerHistogram(self, category, buckets=None, *,
+                          raise_if_registered=True):
+        if raise_if_registered and category in self.histograms:
+            raise Exception("Histogram '%s' has already been registered." %
+                            category)
+        self.histograms[category] = Histogram(buckets)
+
+    def observeHistogram(self, category, value):
+        self.histograms[category].observe(value)
+
     def mergeStats(self, other):
         for oc, ov in other.timers.items():
             v = self.timers.setdefault(oc, 0)
@@ -104,6 +204,18 @@ class ExecutionStats(object):
         for oc, ov in other.manifests.items():
             v = self.manifests.setdefault(oc, [])
             self.manifests[oc] = v + ov
+        other_histograms = getattr(other, 'histograms', None)
+        if other_histograms:
+            for oc, ov in other_histograms.items():
+                h = self.histograms.get(oc)
+                if h is None:
+                    h = self.histograms[oc] = Histogram(ov.buckets)
+                h.mergeHistogram(ov)
+        other_events = getattr(other, 'trace_events', None)
+        if other_events:
+            if self.trace_events is None:
+                self.trace_events = []
+            self.trace_events += other_events
 
 
 class Environment(object):
@@ -115,11 +227,16 @@ class Environment(object):
         self.base_asset_url_format = '%uri%'
         self.page_repository = MemCache()
         self.rendered_segments_repository = MemCache()
+        self.page_route_infos = {}
+        self.source_hierarchy_indexes = {}
+        self.sorted_page_tops = {}
         self.fs_caches = {
                 'renders': self.rendered_segments_repository}
         self.fs_cache_only_for_main_page = False
         self.abort_source_use = False
         self._default_layout_extensions = None
+        self._data_provider_endpoints = None
+        self._page_asset_index = None
         self._stats = ExecutionStats()
 
     @property
@@ -136,12 +253,36 @@ class Environment(object):
                                            for e in dte.EXTENSIONS]
         return self._default_layout_extensions
 
+    @property
+    def data_provider_endpoints(self):
+        if self._data_provider_endpoints is not None:
+            return self._data_provider_endpoints
+
+        if self.app is None:
+            raise Exception("This environment has not been initialized yet.")
+
+        from piecrust.data.providersdata import build_provider_endpoints
+        self._data_provider_endpoints = build_provider_endpoints(self.app)
+        return self._data_provider_endpoints
+
+    @property
+    def page_asset_index(self):
+        if self._page_asset_index is None:
+            from piecrust.data.assetor import PageAssetIndex
+            self._page_asset_index = PageAssetIndex()
+        return self._page_asset_index
+
     def initialize(self, app):
         self.app = app
         self.start_time = time.perf_counter()
         self.exec_info_stack.clear()
         self.was_cache_cleaned = False
         self.base_asset_url_format = '%uri%'
+        self._data_provider_endpoints = None
+        self._page_asset_index = None
+        self.page_route_infos = {}
+        self.source_hierarchy_indexes = {}
+        self.sorted_page_tops = {}
 
         for name, repo in self.fs_caches.items():
             cache = app.cache.getCache(name)
@@ -151,8 +292,15 @@ class Environment(object):
         self._stats.registerTimer(
                 category, raise_if_registered=raise_if_registered)
 
-    def timerScope(self, category):
-        return self._stats.timerScope(category)
+    @property
+    def is_tracing(self):
+        return self._stats.is_tracing
+
+    def enableTracing(self, name, thread_id=0):
+        self._stats.enableTracing(name, thread_id)
+
+    def timerScope(self, category, *, trace_args=None):
+        return self._stats.timerScope(category, trace_args=trace_args)
 
     def stepTimer(self, category, value):
         self._stats.stepTimer(category, value)
@@ -174,6 +322,14 @@ class Environment(object):
     def addManifestEntry(self, name, entry):
         self._stats.addManifestEntry(name, entry)
 
+    def registerHistogram(self, category, buckets=None, *,
+                          raise_if_registered=True):
+        self._stats.registerHistogram(
+                category, buckets, raise_if_registered=raise_if_registered)
+
+    def observeHistogram(self, category, value):
+        self._stats.observeHistogram(category, value)
+
     def getStats(self):
         repos = [
                 ('RenderedSegmentsRepo', self.rendered_segments_repository),
@@ -185,7 +185,8 @@ def _pickle_object(obj):
     if conv is not None:
         return conv(obj, _pickle_object, _PICKLING)
 
-    # Use instance dictionary, or a custom state.
+    # Use instance dictionary, or a custom state (which is then given back
+    # to `__setstate__` when unpickling).
     getter = getattr(obj, '__getstate__', None)
     if getter is not None:
         state = getter()
@@ -243,6 +244,16 @@ def _unpickle_object(state):
     class_def = getattr(mod, class_name)
     obj = class_def.__new__(class_def)
 
+    setter = getattr(class_def, '__setstate__', None)
+    if setter is not None:
+        obj_state = {}
+        for name, val in state.items():
+            if name == '__class__' or name == '__module__':
+                continue
+            obj_state[name] = _unpickle_object(val)
+        obj.__setstate__(obj_state)
+        return obj
+
     attr_names = list(state.keys())
     for name in attr_names:
         if name == '__class__' or name == '__module__':
@@ -1,6 +1,7 @@
 from werkzeug.utils import cached_property
 from piecrust.baking.records import BakeRecordEntry
-from piecrust.baking.worker import save_factory, JOB_BAKE
+from piecrust.baking.worker import (
+        save_factory, make_bake_job_context, JOB_BAKE)
 from piecrust.configuration import ConfigurationError
 from piecrust.routing import create_route_metadata
 from piecrust.sources.pageref import PageRef
@@ -78,8 +79,7 @@ class PageGeneratorBakeContext(object):
                         'generator_name': self._generator.name,
                         'generator_record_key': extra_key,
                         'route_index': route_index,
-                        'route_metadata': route_metadata,
-                        'dirty_source_names': self._record.dirty_source_names,
+                        'extra_route_metadata': extra_route_metadata,
                         'needs_config': True
                         }
                 }
@@ -89,8 +89,10 @@ class PageGeneratorBakeContext(object):
         def _handler(res):
             entry = self._record.getCurrentEntry(
                     res['path'], res['generator_record_key'])
-            entry.config = res['config']
+            entry.config = self._record.internConfig(res['config'])
             entry.subs = res['sub_entries']
+            self._record.addPageTime(res['path'], res['duration'],
+                                     res['generator_record_key'])
             if res['errors']:
                 entry.errors += res['errors']
             if entry.has_any_error:
@@ -98,6 +100,7 @@ class PageGeneratorBakeContext(object):
 
         self._is_running = True
         try:
+            self._pool.broadcastContext(make_bake_job_context(self._record))
             ar = self._pool.queueJobs(self._job_queue, handler=_handler)
             ar.wait()
         finally:
@@ -220,6 +220,18 @@ def _build_cache_key(pre_args):
     return cache_key
 
 
+def _get_commands(app, cmd_name):
+    # The built-in commands are declared statically, so if we're running
+    # one of them, we don't need to load the website's plugins at all. We
+    # still need them to list all the commands, or for the help.
+    from piecrust.plugins.builtin import BuiltInPlugin
+    builtin_commands = BuiltInPlugin().getCommands()
+    if cmd_name != 'help' and any(
+            c.name == cmd_name for c in builtin_commands):
+        return builtin_commands
+    return app.plugin_loader.getCommands()
+
+
 def _run_chef(pre_args, argv):
     # Setup the app.
     start_time = time.perf_counter()
@@ -261,16 +273,27 @@ def _run_chef(pre_args, argv):
             formatter_class=argparse.RawDescriptionHelpFormatter)
     _setup_main_parser_arguments(parser)
 
-    commands = sorted(app.plugin_loader.getCommands(),
+    cmd_name = None
+    if pre_args.extra_args:
+        cmd_name = pre_args.extra_args[0]
+
+    commands = sorted(_get_commands(app, cmd_name),
                       key=lambda c: c.name)
     subparsers = parser.add_subparsers(title='list of commands')
     for c in commands:
         p = subparsers.add_parser(c.name, help=c.description)
-        c.setupParser(p, app)
+        # Only the command we're running needs its arguments, and setting
+        # up the others would import them for nothing.
+        if c.name == cmd_name:
+            c.setupParser(p, app)
         p.set_defaults(func=c.checkedRun)
         p.set_defaults(cache_name=c.cache_name)
 
-    help_cmd = next(filter(lambda c: c.name == 'help', commands), None)
+    help_cmd = None
+    if cmd_name is None or cmd_name == 'help':
+        help_cmd = next(filter(lambda c: c.name == 'help', commands), None)
+        if help_cmd:
+            help_cmd.loadTopics(app)
     if help_cmd and help_cmd.has_topics:
         with io.StringIO() as epilog:
             epilog.write("additional help topics:\n")
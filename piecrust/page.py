@@ -7,7 +7,6 @@ import logging
 import datetime
 import dateutil.parser
 import collections
-from werkzeug.utils import cached_property
 from piecrust.configuration import (
         Configuration, ConfigurationError,
         parse_config_header)
@@ -38,10 +37,15 @@ FLAG_RAW_CACHE_VALID = 2**0
 
 
 class Page(IRouteMetadataProvider):
+    __slots__ = ['source', 'source_metadata', 'rel_path', '_path',
+                 '_path_mtime', '_config', '_segments', '_flags', '_datetime']
+
     def __init__(self, source, source_metadata, rel_path):
         self.source = source
         self.source_metadata = source_metadata
         self.rel_path = rel_path
+        self._path = None
+        self._path_mtime = None
         self._config = None
         self._segments = None
         self._flags = FLAG_NONE
@@ -55,14 +59,17 @@ class Page(IRouteMetadataProvider):
     def ref_spec(self):
         return '%s:%s' % (self.source.name, self.rel_path)
 
-    @cached_property
+    @property
     def path(self):
-        path, _ = self.source.resolveRef(self.rel_path)
-        return path
+        if self._path is None:
+            self._path, _ = self.source.resolveRef(self.rel_path)
+        return self._path
 
-    @cached_property
+    @property
     def path_mtime(self):
-        return os.path.getmtime(self.path)
+        if self._path_mtime is None:
+            self._path_mtime = os.path.getmtime(self.path)
+        return self._path_mtime
 
     @property
     def flags(self):
@@ -209,6 +216,8 @@ class ContentSegment(object):
 
 
 class ContentSegmentPart(object):
+    __slots__ = ['content', 'fmt', 'offset', 'line']
+
     def __init__(self, content, fmt=None, offset=-1, line=-1):
         self.content = content
         self.fmt = fmt
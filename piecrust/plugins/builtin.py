@@ -1,86 +1,77 @@
-from piecrust.commands.base import HelpCommand
-from piecrust.commands.builtin.admin import AdministrationPanelCommand
-from piecrust.commands.builtin.baking import (
-        BakeCommand, ShowRecordCommand)
-from piecrust.commands.builtin.info import (
-        RootCommand, ShowConfigCommand,
-        FindCommand, ShowSourcesCommand, ShowRoutesCommand, ShowPathsCommand)
-from piecrust.commands.builtin.plugins import PluginsCommand
-from piecrust.commands.builtin.publishing import PublishCommand
-from piecrust.commands.builtin.scaffolding import (
-        PrepareCommand,
-        DefaultPrepareTemplatesCommandExtension,
-        UserDefinedPrepareTemplatesCommandExtension,
-        DefaultPrepareTemplatesHelpTopic)
-from piecrust.commands.builtin.serving import (ServeCommand)
-from piecrust.commands.builtin.themes import (ThemesCommand)
-from piecrust.commands.builtin.util import (
-        InitCommand, PurgeCommand, ImportCommand)
-from piecrust.data.provider import (IteratorDataProvider, BlogDataProvider)
-from piecrust.formatting.hoedownformatter import HoedownFormatter
-from piecrust.formatting.markdownformatter import MarkdownFormatter
-from piecrust.formatting.textileformatter import TextileFormatter
-from piecrust.formatting.smartypantsformatter import SmartyPantsFormatter
-from piecrust.generation.blogarchives import BlogArchivesPageGenerator
-from piecrust.generation.taxonomy import TaxonomyPageGenerator
-from piecrust.importing.jekyll import JekyllImporter
-from piecrust.importing.piecrust import PieCrust1Importer
-from piecrust.importing.wordpress import WordpressXmlImporter
+from piecrust.commands.base import HelpCommand, LazyChefCommand
 from piecrust.plugins.base import PieCrustPlugin
-from piecrust.processing.base import CopyFileProcessor
-from piecrust.processing.compass import CompassProcessor
-from piecrust.processing.compressors import (
-        CleanCssProcessor, UglifyJSProcessor)
-from piecrust.processing.less import LessProcessor
-from piecrust.processing.pygments_style import PygmentsStyleProcessor
-from piecrust.processing.requirejs import RequireJSProcessor
-from piecrust.processing.sass import SassProcessor
-from piecrust.processing.sitemap import SitemapProcessor
-from piecrust.processing.util import ConcatProcessor
-from piecrust.publishing.sftp import SftpPublisher
-from piecrust.publishing.shell import ShellCommandPublisher
-from piecrust.publishing.rsync import RsyncPublisher
-from piecrust.sources.default import DefaultPageSource
-from piecrust.sources.posts import (
-        FlatPostsSource, ShallowPostsSource, HierarchyPostsSource)
-from piecrust.sources.autoconfig import (
-        AutoConfigSource, OrderedPageSource)
-from piecrust.sources.prose import ProseSource
-from piecrust.templating.jinjaengine import JinjaTemplateEngine
-from piecrust.templating.pystacheengine import PystacheTemplateEngine
+
+
+# Built-in commands are declared here so that `chef` can build its command
+# line parser without importing all of them. Only the one being run gets
+# imported.
+_builtin_commands = [
+        ('init', "Creates a new empty PieCrust website.",
+         'piecrust.commands.builtin.util.InitCommand',
+         {'requires_website': False}),
+        ('import', "Imports content from another CMS into PieCrust.",
+         'piecrust.commands.builtin.util.ImportCommand', {}),
+        ('root', "Gets the root directory of the current website.",
+         'piecrust.commands.builtin.info.RootCommand', {}),
+        ('purge', "Purges the website's cache.",
+         'piecrust.commands.builtin.util.PurgeCommand', {}),
+        ('showconfig', "Shows the website's configuration.",
+         'piecrust.commands.builtin.info.ShowConfigCommand', {}),
+        ('find', "Find pages in the website.",
+         'piecrust.commands.builtin.info.FindCommand', {}),
+        ('prepare', "Prepares new content for your website.",
+         'piecrust.commands.builtin.scaffolding.PrepareCommand', {}),
+        ('sources', "Shows the sources defined for this website.",
+         'piecrust.commands.builtin.info.ShowSourcesCommand', {}),
+        ('routes', "Shows the routes defined for this website.",
+         'piecrust.commands.builtin.info.ShowRoutesCommand', {}),
+        ('paths', "Shows the paths that this website is using.",
+         'piecrust.commands.builtin.info.ShowPathsCommand', {}),
+        ('themes', "Manage the themes for the current website.",
+         'piecrust.commands.builtin.themes.ThemesCommand', {}),
+        ('plugins', "Manage the plugins for the current website.",
+         'piecrust.commands.builtin.plugins.PluginsCommand', {}),
+        ('bake', "Bakes your website into static HTML files.",
+         'piecrust.commands.builtin.baking.BakeCommand', {}),
+        ('showrecord', "Shows the bake record for a given output directory.",
+         'piecrust.commands.builtin.baking.ShowRecordCommand', {}),
+        ('serve', "Runs a local web server to serve your website.",
+         'piecrust.commands.builtin.serving.ServeCommand',
+         {'cache_name': 'server'}),
+        ('admin', "Manages the PieCrust administration panel.",
+         'piecrust.commands.builtin.admin.AdministrationPanelCommand',
+         {'requires_website': False}),
+        ('publish', "Publishes you website to a specific target.",
+         'piecrust.commands.builtin.publishing.PublishCommand', {})]
 
 
 class BuiltInPlugin(PieCrustPlugin):
     name = '__builtin__'
 
     def getCommands(self):
-        return [
-                InitCommand(),
-                ImportCommand(),
-                HelpCommand(),
-                RootCommand(),
-                PurgeCommand(),
-                ShowConfigCommand(),
-                FindCommand(),
-                PrepareCommand(),
-                ShowSourcesCommand(),
-                ShowRoutesCommand(),
-                ShowPathsCommand(),
-                ThemesCommand(),
-                PluginsCommand(),
-                BakeCommand(),
-                ShowRecordCommand(),
-                ServeCommand(),
-                AdministrationPanelCommand(),
-                PublishCommand()]
+        commands = [
+                LazyChefCommand(name, desc, class_path, **kwargs)
+                for name, desc, class_path, kwargs in _builtin_commands]
+        commands.insert(2, HelpCommand())
+        return commands
 
     def getCommandExtensions(self):
+        from piecrust.commands.builtin.scaffolding import (
+                DefaultPrepareTemplatesCommandExtension,
+                UserDefinedPrepareTemplatesCommandExtension,
+                DefaultPrepareTemplatesHelpTopic)
         return [
                 DefaultPrepareTemplatesCommandExtension(),
                 UserDefinedPrepareTemplatesCommandExtension(),
                 DefaultPrepareTemplatesHelpTopic()]
 
     def getSources(self):
+        from piecrust.sources.default import DefaultPageSource
+        from piecrust.sources.posts import (
+                FlatPostsSource, ShallowPostsSource, HierarchyPostsSource)
+        from piecrust.sources.autoconfig import (
+                AutoConfigSource, OrderedPageSource)
+        from piecrust.sources.prose import ProseSource
         return [
                 DefaultPageSource,
                 FlatPostsSource,
@@ -91,21 +82,32 @@ class BuiltInPlugin(PieCrustPlugin):
                 ProseSource]
 
     def getPageGenerators(self):
+        from piecrust.generation.blogarchives import BlogArchivesPageGenerator
+        from piecrust.generation.taxonomy import TaxonomyPageGenerator
         return [
                 TaxonomyPageGenerator,
                 BlogArchivesPageGenerator]
 
     def getDataProviders(self):
+        from piecrust.data.provider import (
+                IteratorDataProvider, BlogDataProvider)
         return [
                 IteratorDataProvider,
                 BlogDataProvider]
 
     def getTemplateEngines(self):
+        from piecrust.templating.jinjaengine import JinjaTemplateEngine
+        from piecrust.templating.pystacheengine import PystacheTemplateEngine
         return [
                 JinjaTemplateEngine(),
                 PystacheTemplateEngine()]
 
     def getFormatters(self):
+        from piecrust.formatting.hoedownformatter import HoedownFormatter
+        from piecrust.formatting.markdownformatter import MarkdownFormatter
+        from piecrust.formatting.textileformatter import TextileFormatter
+        from piecrust.formatting.smartypantsformatter import (
+                SmartyPantsFormatter)
         return [
                 HoedownFormatter(),
                 MarkdownFormatter(),
@@ -113,6 +115,16 @@ class BuiltInPlugin(PieCrustPlugin):
                 TextileFormatter()]
 
     def getProcessors(self):
+        from piecrust.processing.base import CopyFileProcessor
+        from piecrust.processing.compass import CompassProcessor
+        from piecrust.processing.compressors import (
+                CleanCssProcessor, UglifyJSProcessor)
+        from piecrust.processing.less import LessProcessor
+        from piecrust.processing.pygments_style import PygmentsStyleProcessor
+        from piecrust.processing.requirejs import RequireJSProcessor
+        from piecrust.processing.sass import SassProcessor
+        from piecrust.processing.sitemap import SitemapProcessor
+        from piecrust.processing.util import ConcatProcessor
         return [
                 CopyFileProcessor(),
                 ConcatProcessor(),
@@ -126,14 +138,21 @@ class BuiltInPlugin(PieCrustPlugin):
                 UglifyJSProcessor()]
 
     def getImporters(self):
+        from piecrust.importing.jekyll import JekyllImporter
+        from piecrust.importing.piecrust import PieCrust1Importer
+        from piecrust.importing.wordpress import WordpressXmlImporter
         return [
                 PieCrust1Importer(),
                 JekyllImporter(),
                 WordpressXmlImporter()]
 
     def getPublishers(self):
+        from piecrust.publishing.mirror import DirectoryMirrorPublisher
+        from piecrust.publishing.rsync import RsyncPublisher
+        from piecrust.publishing.sftp import SftpPublisher
+        from piecrust.publishing.shell import ShellCommandPublisher
         return [
                 ShellCommandPublisher,
                 SftpPublisher,
-                RsyncPublisher]
-
+                RsyncPublisher,
+                DirectoryMirrorPublisher]
@@ -0,0 +1,165 @@
+import os
+import os.path
+import json
+import shutil
+import hashlib
+import logging
+from piecrust.copyutil import get_file_hash
+
+
+logger = logging.getLogger(__name__)
+
+
+ARTIFACTS_VERSION = 2
+
+ENTRY_FILENAME = '__entry.json'
+SIDE_FILENAME_FORMAT = '__side_%d'
+
+
+class ProcessingArtifactCache(object):
+    """ A content-addressed cache of processed assets.
+
+        Artifacts are keyed by the chain of processors that produced them,
+        the configuration of those processors, and the contents of the
+        input file. Each entry also remembers the dependencies the processor
+        reported (like files imported by a LESS stylesheet) and their hashes,
+        so that an entry is only used if those dependencies didn't change
+        either.
+
+        Since nothing in there depends on the output directory, artifacts
+        are shared between bakes to different output directories, variants,
+        and checkouts sharing the same cache directory.
+
+        Processors can also have "side files" that go along with their
+        outputs, like source maps in the temp directory. They're stored in
+        the entry too, and restored wherever the processor wants them.
+    """
+    def __init__(self, base_dir, root_dir, *, exclude_dirs=None):
+        self.base_dir = base_dir
+        self.root_dir = root_dir
+        self.exclude_dirs = [os.path.join(d, '') for d in exclude_dirs or []]
+        self._config_hashes = {}
+
+    def getKey(self, app, proc_tree, in_path):
+        """ Gets the cache key for processing `in_path` with the processors
+            in `proc_tree`, as returned by `get_node_name_tree`.
+        """
+        h = hashlib.md5()
+        h.update(('%d|' % ARTIFACTS_VERSION).encode('utf8'))
+        h.update(json.dumps(proc_tree).encode('utf8'))
+        for name in sorted(_get_processor_names(proc_tree)):
+            h.update(self._getConfigHash(app, name).encode('utf8'))
+        h.update(get_file_hash(in_path).encode('utf8'))
+        return h.hexdigest()
+
+    def restore(self, key, out_paths, side_paths=None):
+        """ Copies the cached artifacts for the given key to `out_paths`,
+            and the cached side files to `side_paths`. Returns whether the
+            cache had valid artifacts for them.
+        """
+        entry_dir = self._getEntryDir(key)
+        entry = self._loadEntry(entry_dir)
+        if entry is None:
+            return False
+
+        out_names = [os.path.basename(p) for p in out_paths]
+        if sorted(out_names) != sorted(entry['outputs']):
+            return False
+        side_paths = side_paths or []
+        if len(side_paths) != entry.get('side_files', 0):
+            return False
+
+        for rel_path, dep_hash in entry['deps'].items():
+            dep_path = os.path.join(self.root_dir, rel_path)
+            try:
+                if get_file_hash(dep_path) != dep_hash:
+                    return False
+            except OSError:
+                return False
+
+        try:
+            for p in out_paths:
+                shutil.copyfile(
+                        os.path.join(entry_dir, os.path.basename(p)), p)
+            for i, p in enumerate(side_paths):
+                shutil.copyfile(
+                        os.path.join(entry_dir, SIDE_FILENAME_FORMAT % i), p)
+        except OSError as ex:
+            logger.debug("Error restoring cached artifacts for '%s': %s" %
+                         (key, ex))
+            return False
+        return True
+
+    def store(self, key, out_paths, deps, side_paths=None):
+        """ Stores the given outputs and side files as the artifacts for
+            the given key, along with the dependencies that went into making
+            them.
+        """
+        entry_dir = self._getEntryDir(key)
+        dep_hashes = {}
+        for d in deps or []:
+            d = os.path.abspath(d)
+            if any(d.startswith(ed) for ed in self.exclude_dirs):
+                # Processor book-keeping, like source maps in the temp
+                # directory... those aren't real inputs.
+                continue
+            rel_path = d
+            if d.startswith(os.path.join(self.root_dir, '')):
+                rel_path = os.path.relpath(d, self.root_dir)
+            dep_hashes[rel_path] = get_file_hash(d)
+
+        side_paths = side_paths or []
+        entry = {
+                'outputs': [os.path.basename(p) for p in out_paths],
+                'side_files': len(side_paths),
+                'deps': dep_hashes}
+
+        # Build the entry next to its final location and rename it, so that
+        # concurrent workers never see a partial entry.
+        tmp_dir = '%s.%d.tmp' % (entry_dir, os.getpid())
+        try:
+            os.makedirs(tmp_dir, 0o755, exist_ok=True)
+            for p in out_paths:
+                shutil.copyfile(
+                        p, os.path.join(tmp_dir, os.path.basename(p)))
+            for i, p in enumerate(side_paths):
+                shutil.copyfile(
+                        p, os.path.join(tmp_dir, SIDE_FILENAME_FORMAT % i))
+            with open(os.path.join(tmp_dir, ENTRY_FILENAME), 'w',
+                      encoding='utf8') as fp:
+                json.dump(entry, fp)
+
+            if os.path.isdir(entry_dir):
+                shutil.rmtree(entry_dir, ignore_errors=True)
+            os.rename(tmp_dir, entry_dir)
+        except OSError as ex:
+            logger.debug("Error caching artifacts for '%s': %s" % (key, ex))
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _getEntryDir(self, key):
+        return os.path.join(self.base_dir, key[:2], key)
+
+    def _loadEntry(self, entry_dir):
+        try:
+            with open(os.path.join(entry_dir, ENTRY_FILENAME), 'r',
+                      encoding='utf8') as fp:
+                return json.load(fp)
+        except (OSError, ValueError):
+            return None
+
+    def _getConfigHash(self, app, proc_name):
+        h = self._config_hashes.get(proc_name)
+        if h is None:
+            conf = app.config.get(proc_name)
+            h = hashlib.md5(json.dumps(
+                    [proc_name, conf], sort_keys=True,
+                    default=str).encode('utf8')).hexdigest()
+            self._config_hashes[proc_name] = h
+        return h
+
+
+def _get_processor_names(proc_tree):
+    name, children = proc_tree
+    yield name
+    for c in children:
+        yield from _get_processor_names(c)
@@ -1,6 +1,6 @@
-import shutil
 import os.path
 import logging
+from piecrust.copyutil import FileCopier, COPY_SKIPPED
 
 
 logger = logging.getLogger(__name__)
@@ -40,6 +40,7 @@ class Processor(object):
         self.priority = PRIORITY_NORMAL
         self.is_bypassing_structured_processing = False
         self.is_delegating_dependency_check = True
+        self.is_caching_artifacts = True
 
     def initialize(self, app):
         self.app = app
@@ -59,6 +60,9 @@ class Processor(object):
     def getOutputFilenames(self, filename):
         return None
 
+    def getArtifactSideFiles(self, path):
+        return None
+
     def process(self, path, out_dir):
         pass
 
@@ -69,6 +73,17 @@ class CopyFileProcessor(Processor):
     def __init__(self):
         super(CopyFileProcessor, self).__init__()
         self.priority = PRIORITY_LAST
+        # Copying files is as fast as restoring them from the cache.
+        self.is_caching_artifacts = False
+        self.copy_modes = {}
+        self._copier = None
+
+    def onPipelineStart(self, ctx):
+        self.copy_modes = {}
+        self._copier = FileCopier(
+                self.app.config.get('baker/copy_mode', 'copy'),
+                skip_identical=self.app.config.get(
+                    'baker/skip_identical_outputs', False))
 
     def matches(self, path):
         return True
@@ -77,10 +92,14 @@ class CopyFileProcessor(Processor):
         return [filename]
 
     def process(self, path, out_dir):
+        if self._copier is None:
+            self._copier = FileCopier()
+
         out_path = os.path.join(out_dir, os.path.basename(path))
         logger.debug("Copying: %s -> %s" % (path, out_path))
-        shutil.copyfile(path, out_path)
-        return True
+        mode = self._copier.copy(path, out_path)
+        self.copy_modes[out_path] = mode
+        return mode != COPY_SKIPPED
 
 
 class SimpleFileProcessor(Processor):
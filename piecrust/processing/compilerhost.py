@@ -0,0 +1,203 @@
+import os
+import os.path
+import json
+import logging
+import platform
+import subprocess
+from piecrust import RESOURCES_DIR
+from piecrust.processing.base import ExternalProcessException
+
+
+logger = logging.getLogger(__name__)
+
+
+class CompilerHostError(Exception):
+    pass
+
+
+class CompilerHost(object):
+    """ A long-lived `node` process that compiles assets, so that we don't
+        pay for starting `node` for every single file.
+
+        The protocol is described in `resources/processing/compilerhost.js`.
+        Jobs are sent in batches, and results come back in the same order.
+    """
+    def __init__(self, compiler, *, node_bin='node', cwd=None):
+        self.compiler = compiler
+        self.node_bin = node_bin
+        self.cwd = cwd
+        self._proc = None
+        self._next_id = 0
+        self._failed = False
+
+    @property
+    def is_running(self):
+        return self._proc is not None
+
+    def start(self):
+        """ Starts the host process if needed, and returns whether it's
+            available for this compiler.
+        """
+        if self._proc is not None:
+            return True
+        if self._failed:
+            return False
+
+        script_path = os.path.join(
+                RESOURCES_DIR, 'processing', 'compilerhost.js')
+        env = dict(os.environ)
+        if self.cwd:
+            # Make the website's own node modules available.
+            node_path = os.path.join(self.cwd, 'node_modules')
+            if env.get('NODE_PATH'):
+                node_path += os.pathsep + env['NODE_PATH']
+            env['NODE_PATH'] = node_path
+
+        args = [self.node_bin, script_path]
+        logger.debug("Starting compiler host for '%s': %s" %
+                     (self.compiler, args))
+
+        # On Windows, we need to run the process in a shell environment
+        # otherwise it looks like `PATH` isn't taken into account.
+        shell = (platform.system() == 'Windows')
+        try:
+            self._proc = subprocess.Popen(
+                    args, shell=shell, cwd=self.cwd, env=env,
+                    stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+            hello = self._readMessage()
+        except (OSError, CompilerHostError) as ex:
+            logger.debug("Can't start compiler host for '%s': %s" %
+                         (self.compiler, ex))
+            self._fail()
+            return False
+
+        if self.compiler not in hello.get('compilers', []):
+            logger.debug("Compiler host can't load the node module for "
+                         "'%s', falling back to the command line." %
+                         self.compiler)
+            self.shutdown()
+            self._failed = True
+            return False
+
+        return True
+
+    def compile(self, jobs):
+        """ Sends a batch of jobs to the host, and returns the list of
+            results, in the same order.
+        """
+        if self._proc is None:
+            raise CompilerHostError("Compiler host isn't running.")
+
+        req_id = self._next_id
+        self._next_id += 1
+        req = {'id': req_id, 'compiler': self.compiler, 'jobs': jobs}
+        try:
+            data = json.dumps(req, separators=(',', ':'))
+            self._proc.stdin.write(data.encode('utf8') + b'\n')
+            self._proc.stdin.flush()
+            res = self._readMessage()
+        except (OSError, CompilerHostError) as ex:
+            self._fail()
+            raise CompilerHostError(
+                    "Compiler host for '%s' stopped responding." %
+                    self.compiler) from ex
+
+        if res.get('id') != req_id or len(res['results']) != len(jobs):
+            self._fail()
+            raise CompilerHostError(
+                    "Compiler host for '%s' sent an unexpected response." %
+                    self.compiler)
+        return res['results']
+
+    def shutdown(self):
+        if self._proc is None:
+            return
+
+        logger.debug("Shutting down compiler host for '%s'." % self.compiler)
+        proc = self._proc
+        self._proc = None
+        try:
+            proc.stdin.close()
+            proc.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            proc.kill()
+            proc.wait()
+        finally:
+            proc.stdout.close()
+
+    def _readMessage(self):
+        line = self._proc.stdout.readline()
+        if not line:
+            raise CompilerHostError("Compiler host exited unexpectedly.")
+        try:
+            return json.loads(line.decode('utf8'))
+        except ValueError as ex:
+            raise CompilerHostError(
+                    "Invalid message from compiler host: %s" % line) from ex
+
+    def _fail(self):
+        self._failed = True
+        if self._proc is not None:
+            proc = self._proc
+            self._proc = None
+            proc.kill()
+            proc.wait()
+
+
+class CompilerHostMixin(object):
+    """ Lets an external processor compile files through a `CompilerHost`
+        when the `daemon` setting is enabled in its configuration section.
+        Processors using this need a `_conf` dictionary.
+
+        The dependencies reported by the host for each compiled file are
+        kept around, so processors don't have to read them back from disk.
+    """
+    def __init__(self, *args, **kwargs):
+        super(CompilerHostMixin, self).__init__(*args, **kwargs)
+        self._compiler_host = None
+        self._host_deps = {}
+
+    def onPipelineEnd(self, ctx):
+        if self._compiler_host is not None:
+            self._compiler_host.shutdown()
+            self._compiler_host = None
+        super(CompilerHostMixin, self).onPipelineEnd(ctx)
+
+    def _compileWithHost(self, job):
+        """ Compiles the given job with the compiler host, and returns its
+            result. Returns `None` if the command line should be used
+            instead.
+        """
+        self._host_deps.pop(job['in_path'], None)
+        if not self._conf.get('daemon'):
+            return None
+
+        if self._compiler_host is None:
+            self._compiler_host = CompilerHost(
+                    self.PROCESSOR_NAME,
+                    node_bin=self._conf.get('node_bin', 'node'),
+                    cwd=self.app.root_dir)
+        if not self._compiler_host.start():
+            return None
+
+        try:
+            res = self._compiler_host.compile([job])[0]
+        except CompilerHostError as ex:
+            logger.warning("%s -- Falling back to the command line." % ex)
+            return None
+
+        if res['ok']:
+            self._host_deps[job['in_path']] = res.get('deps') or []
+            return res
+        if res.get('unsupported'):
+            logger.debug("Compiler host can't process '%s': %s -- Falling "
+                         "back to the command line." %
+                         (job['in_path'], res['error']))
+            return None
+        raise ExternalProcessException(res['error'])
+
+    def _getHostDependencies(self, path):
+        """ Returns the dependencies reported by the compiler host the last
+            time it compiled the given file, or `None` if it didn't.
+        """
+        return self._host_deps.get(path)
@@ -4,12 +4,13 @@ import logging
 import platform
 import subprocess
 from piecrust.processing.base import Processor, SimpleFileProcessor
+from piecrust.processing.compilerhost import CompilerHostMixin
 
 
 logger = logging.getLogger(__name__)
 
 
-class CleanCssProcessor(Processor):
+class CleanCssProcessor(CompilerHostMixin, Processor):
     PROCESSOR_NAME = 'cleancss'
 
     def __init__(self):
@@ -31,6 +32,12 @@ class CleanCssProcessor(Processor):
         out_name = self.getOutputFilenames(in_name)[0]
         out_path = os.path.join(out_dir, out_name)
 
+        res = self._compileWithHost({
+                'in_path': path, 'out_path': out_path,
+                'options': self._conf['options']})
+        if res is not None:
+            return True
+
         args = [self._conf['bin'], '-o', out_path]
         args += self._conf['options']
         args.append(path)
@@ -66,7 +73,7 @@ class CleanCssProcessor(Processor):
                             "must be an array of arguments.")
 
 
-class UglifyJSProcessor(SimpleFileProcessor):
+class UglifyJSProcessor(CompilerHostMixin, SimpleFileProcessor):
     PROCESSOR_NAME = 'uglifyjs'
 
     def __init__(self):
@@ -76,6 +83,12 @@ class UglifyJSProcessor(SimpleFileProcessor):
     def _doProcess(self, in_path, out_path):
         self._ensureInitialized()
 
+        res = self._compileWithHost({
+                'in_path': in_path, 'out_path': out_path,
+                'options': self._conf['options']})
+        if res is not None:
+            return True
+
         args = [self._conf['bin'], in_path, '-o', out_path]
         args += self._conf['options']
         logger.debug("Uglifying JS file: %s" % args)
@@ -8,13 +8,14 @@ import platform
 import subprocess
 from piecrust.processing.base import (
         SimpleFileProcessor, ExternalProcessException)
+from piecrust.processing.compilerhost import CompilerHostMixin
 from piecrust.processing.tree import FORCE_BUILD
 
 
 logger = logging.getLogger(__name__)
 
 
-class LessProcessor(SimpleFileProcessor):
+class LessProcessor(CompilerHostMixin, SimpleFileProcessor):
     PROCESSOR_NAME = 'less'
 
     def __init__(self):
@@ -30,6 +31,15 @@ class LessProcessor(SimpleFileProcessor):
 
     def getDependencies(self, path):
         map_path = self._getMapPath(path)
+        path_dir = os.path.dirname(path)
+
+        # If the compiler host just compiled this file, we already know
+        # which files it imported.
+        host_deps = self._getHostDependencies(path)
+        if host_deps is not None:
+            return [map_path] + [os.path.join(path_dir, p)
+                                 for p in host_deps]
+
         try:
             with open(map_path, 'r') as f:
                 dep_map = json.load(f)
@@ -47,19 +57,31 @@ class LessProcessor(SimpleFileProcessor):
 
         # Get the sources, but make all paths absolute.
         sources = dep_map.get('sources')
-        path_dir = os.path.dirname(path)
 
         def _makeAbs(p):
             return os.path.join(path_dir, p)
         deps = list(map(_makeAbs, sources))
         return [map_path] + deps
 
+    def getArtifactSideFiles(self, path):
+        return [self._getMapPath(path)]
+
     def _doProcess(self, in_path, out_path):
         self._ensureInitialized()
 
+        # The map URL doesn't include the cache key, so that cached
+        # artifacts can be used with any cache key. The preview server
+        # looks for it in the cache directory of the app it serves.
         map_path = self._getMapPath(in_path)
-        map_url = '/' + os.path.relpath(
-                map_path, self.app.root_dir).replace('\\', '/')
+        map_url = '/_cache/' + os.path.relpath(
+                map_path, self.app.cache_dir).replace('\\', '/')
+
+        res = self._compileWithHost({
+                'in_path': in_path, 'out_path': out_path,
+                'map_path': map_path, 'map_url': map_url,
+                'options': self._conf['options']})
+        if res is not None:
+            return True
 
         # On Windows, it looks like LESSC is confused with paths when the
         # map file is not to be created in the same directory as the input
@@ -11,6 +11,8 @@ from piecrust.processing.base import PipelineContext
 from piecrust.processing.records import (
         ProcessorPipelineRecordEntry, TransitionalProcessorPipelineRecord,
         FLAG_PROCESSED)
+from piecrust.processing.scanner import (
+        DirectoryScanner, load_dir_listings, save_dir_listings)
 from piecrust.processing.worker import (
         ProcessingWorkerJob,
         get_filtered_processors)
@@ -19,9 +21,11 @@ from piecrust.processing.worker import (
 logger = logging.getLogger(__name__)
 
 
+DIR_LISTINGS_NAME = 'dirs.json'
+
+
 class _ProcessingContext(object):
-    def __init__(self, jobs, record, base_dir, mount_info):
-        self.jobs = jobs
+    def __init__(self, record, base_dir, mount_info):
         self.record = record
         self.base_dir = base_dir
         self.mount_info = mount_info
@@ -30,13 +34,16 @@ class _ProcessingContext(object):
 class ProcessorPipeline(object):
     def __init__(self, app, out_dir, force=False,
                  applied_config_variant=None,
-                 applied_config_values=None):
+                 applied_config_values=None,
+                 trace=False):
         assert app and out_dir
         self.app = app
         self.out_dir = out_dir
         self.force = force
         self.applied_config_variant = applied_config_variant
         self.applied_config_values = applied_config_values
+        self.trace = trace
+        self.trace_events = None
 
         tmp_dir = app.cache_dir
         if not tmp_dir:
@@ -71,6 +78,8 @@ class ProcessorPipeline(object):
         self.enabled_processors = None
         self.additional_processors_factories = None
 
+        self._dir_listings = None
+
     def addIgnorePatterns(self, patterns):
         self.ignore_patterns += make_re(patterns)
 
@@ -129,6 +138,7 @@ class ProcessorPipeline(object):
             entry.flags = res.flags
             entry.proc_tree = res.proc_tree
             entry.rel_outputs = res.rel_outputs
+            entry.copy_modes = res.copy_modes
             if entry.flags & FLAG_PROCESSED:
                 record.current.processed_count += 1
             if res.errors:
@@ -140,11 +150,13 @@ class ProcessorPipeline(object):
                 for e in entry.errors:
                     logger.error("  " + e)
 
-        jobs = []
-        self._process(src_dir_or_file, record, jobs)
+        # Start the workers before looking for files, so that they can get
+        # going as soon as we find some.
+        jobs = self._process(src_dir_or_file, record)
         pool = self._createWorkerPool()
         ar = pool.queueJobs(jobs, handler=_handler)
         ar.wait()
+        self._saveDirListings(record_cache)
 
         # Shutdown the workers and get timing information from them.
         reports = pool.close()
@@ -157,6 +169,12 @@ class ProcessorPipeline(object):
                 record.current.stats[worker_name] = worker_stats
                 total_stats.mergeStats(worker_stats)
 
+        # Keep the trace out of the processing record.
+        if self.trace:
+            self.trace_events = total_stats.popTraceEvents() or []
+            for s in record.current.stats.values():
+                s.popTraceEvents()
+
         # Invoke post-processors.
         pipeline_ctx.record = record.current
         for proc in processors:
@@ -190,7 +208,7 @@ class ProcessorPipeline(object):
 
         return record.detach()
 
-    def _process(self, src_dir_or_file, record, jobs):
+    def _process(self, src_dir_or_file, record):
         if src_dir_or_file is not None:
             # Process only the given path.
             # Find out what mount point this is in.
@@ -205,32 +223,45 @@ class ProcessorPipeline(object):
                                 "mount point: %s" %
                                 (src_dir_or_file, known_roots))
 
-            ctx = _ProcessingContext(jobs, record, base_dir, mount_info)
-            logger.debug("Initiating processing pipeline on: %s" %
-                         src_dir_or_file)
-            if os.path.isdir(src_dir_or_file):
-                self._processDirectory(ctx, src_dir_or_file)
-            elif os.path.isfile(src_dir_or_file):
-                self._processFile(ctx, src_dir_or_file)
-
+            ctx = _ProcessingContext(record, base_dir, mount_info)
+            roots = [(ctx, src_dir_or_file)]
         else:
             # Process everything.
-            for path, info in self.mounts.items():
-                ctx = _ProcessingContext(jobs, record, path, info)
-                logger.debug("Initiating processing pipeline on: %s" % path)
-                self._processDirectory(ctx, path)
-
-    def _processDirectory(self, ctx, start_dir):
-        for dirpath, dirnames, filenames in os.walk(start_dir):
-            rel_dirpath = os.path.relpath(dirpath, start_dir)
-            dirnames[:] = [d for d in dirnames
-                           if not re_matchany(
-                               d, self.ignore_patterns, rel_dirpath)]
-
-            for filename in filenames:
-                if re_matchany(filename, self.ignore_patterns, rel_dirpath):
-                    continue
-                self._processFile(ctx, os.path.join(dirpath, filename))
+            roots = [(_ProcessingContext(record, path, info), path)
+                     for path, info in self.mounts.items()]
+
+        return self._generateJobs(roots, src_dir_or_file is None)
+
+    def _generateJobs(self, roots, is_full_scan):
+        listings = self._loadDirListings()
+        scanner = DirectoryScanner(self.ignore_patterns, listings)
+        for ctx, path in roots:
+            logger.debug("Initiating processing pipeline on: %s" % path)
+            if os.path.isdir(path):
+                for file_path in scanner.scan(path):
+                    yield self._processFile(ctx, file_path)
+            elif os.path.isfile(path):
+                yield self._processFile(ctx, path)
+
+        if is_full_scan:
+            # Forget about directories that don't exist anymore.
+            for dirpath in list(listings.keys()):
+                if dirpath not in scanner.visited:
+                    del listings[dirpath]
+        logger.debug("Listed %d directories, %d from cache." %
+                     (len(scanner.visited), scanner.cached_count))
+
+    def _loadDirListings(self):
+        if self._dir_listings is None:
+            record_cache = self.app.cache.getCache('proc')
+            self._dir_listings = load_dir_listings(
+                    record_cache, DIR_LISTINGS_NAME)
+        return self._dir_listings
+
+    def _saveDirListings(self, record_cache):
+        if self._dir_listings is not None:
+            save_dir_listings(record_cache, DIR_LISTINGS_NAME,
+                              self._dir_listings)
 
     def _processFile(self, ctx, path):
         # TODO: handle overrides between mount-points.
@@ -242,12 +273,11 @@ class ProcessorPipeline(object):
         force_this = (self.force or previous_entry is None or
                       not previous_entry.was_processed_successfully)
 
-        job = ProcessingWorkerJob(ctx.base_dir, ctx.mount_info, path,
-                                  force=force_this)
-        ctx.jobs.append(job)
+        return ProcessingWorkerJob(ctx.base_dir, ctx.mount_info, path,
+                                   force=force_this)
 
     def _createWorkerPool(self):
-        from piecrust.app import PieCrustFactory
+        from piecrust.app import PieCrustFactory, PieCrustSnapshot
         from piecrust.workerpool import WorkerPool
         from piecrust.processing.worker import (
                 ProcessingWorkerContext, ProcessingWorker)
@@ -259,12 +289,14 @@ class ProcessorPipeline(object):
                 config_variant=self.applied_config_variant,
                 config_values=self.applied_config_values,
                 debug=self.app.debug,
-                theme_site=self.app.theme_site)
+                theme_site=self.app.theme_site,
+                snapshot=PieCrustSnapshot(self.app))
 
         ctx = ProcessingWorkerContext(
                 appfactory,
                 self.out_dir, self.tmp_dir,
-                force=self.force)
+                force=self.force,
+                trace=self.trace)
         ctx.enabled_processors = self.enabled_processors
         if self.additional_processors_factories is not None:
             ctx.additional_processors = [
@@ -273,7 +305,9 @@ class ProcessorPipeline(object):
 
         pool = WorkerPool(
                 worker_class=ProcessingWorker,
-                initargs=(ctx,))
+                initargs=(ctx,),
+                start_method=self.app.config.get(
+                    'baker/worker_start_method'))
         return pool
 
 
@@ -1,10 +1,10 @@
 import os.path
 import hashlib
-from piecrust.records import Record, TransitionalRecord
+from piecrust.records import Record, RecordEntry, TransitionalRecord
 
 
 class ProcessorPipelineRecord(Record):
-    RECORD_VERSION = 7
+    RECORD_VERSION = 9
 
     def __init__(self):
         super(ProcessorPipelineRecord, self).__init__()
@@ -26,12 +26,16 @@ def _get_transition_key(path):
     return hashlib.md5(path.encode('utf8')).hexdigest()
 
 
-class ProcessorPipelineRecordEntry(object):
+class ProcessorPipelineRecordEntry(RecordEntry):
+    __slots__ = ['path', 'flags', 'rel_outputs', 'copy_modes', 'proc_tree',
+                 'errors']
+
     def __init__(self, path):
         self.path = path
 
         self.flags = FLAG_NONE
         self.rel_outputs = []
+        self.copy_modes = {}
         self.proc_tree = None
         self.errors = []
 
@@ -84,6 +88,8 @@ class TransitionalProcessorPipelineRecord(TransitionalRecord):
                         & ~FLAG_PROCESSED
                         | FLAG_COLLAPSED_FROM_LAST_RUN)
                 cur.rel_outputs = list(prev.rel_outputs)
+                if not cur.copy_modes:
+                    cur.copy_modes = dict(prev.copy_modes)
                 cur.errors = list(prev.errors)
 
     def getDeletions(self):
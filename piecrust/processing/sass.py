@@ -6,13 +6,14 @@ import logging
 import platform
 import subprocess
 from piecrust.processing.base import SimpleFileProcessor
+from piecrust.processing.compilerhost import CompilerHostMixin
 from piecrust.processing.tree import FORCE_BUILD
 
 
 logger = logging.getLogger(__name__)
 
 
-class SassProcessor(SimpleFileProcessor):
+class SassProcessor(CompilerHostMixin, SimpleFileProcessor):
     PROCESSOR_NAME = 'sass'
 
     def __init__(self):
@@ -39,6 +40,12 @@ class SassProcessor(SimpleFileProcessor):
         if _is_include_only(path):
             raise Exception("Include only Sass files should be ignored!")
 
+        # If the compiler host just compiled this file, we already know
+        # which files it included.
+        host_deps = self._getHostDependencies(path)
+        if host_deps is not None:
+            return host_deps
+
         map_path = self._getMapPath(path)
         try:
             with open(map_path, 'r') as f:
@@ -57,12 +64,28 @@ class SassProcessor(SimpleFileProcessor):
         deps = list(map(_clean_scheme, sources))
         return deps
 
+    def getArtifactSideFiles(self, path):
+        if self.app.cache.enabled:
+            return [self._getMapPath(path)]
+        return None
+
     def _doProcess(self, in_path, out_path):
         self._ensureInitialized()
 
         if _is_include_only(in_path):
             raise Exception("Include only Sass files should be ignored!")
 
+        map_path = None
+        if self.app.cache.enabled:
+            map_path = self._getMapPath(in_path)
+        res = self._compileWithHost({
+                'in_path': in_path, 'out_path': out_path,
+                'map_path': map_path, 'style': self._conf['style'],
+                'load_paths': self._conf['load_paths'],
+                'options': self._conf['options']})
+        if res is not None:
+            return True
+
         sourcemap = 'none'
         if self.app.cache.enabled:
             sourcemap = 'file'
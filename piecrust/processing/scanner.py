@@ -0,0 +1,120 @@
+import os
+import os.path
+import re
+import json
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+DIR_LISTINGS_VERSION = 1
+
+
+class DirectoryScanner(object):
+    """ Finds the files to process in a directory tree.
+
+        Files are yielded as they are found, so the caller can start
+        working on them right away. Directory listings are remembered along
+        with the directory's modification time, so that directories that
+        didn't change since the last scan don't need to be listed again.
+    """
+    def __init__(self, ignore_patterns, listings=None):
+        self.ignore_re = make_combined_re(ignore_patterns)
+        self.listings = listings if listings is not None else {}
+        self.visited = set()
+        self.cached_count = 0
+
+    def scan(self, start_dir):
+        walk_stack = [(start_dir, '')]
+        while walk_stack:
+            dirpath, rel_dirpath = walk_stack.pop()
+            dirnames, filenames = self._listDir(dirpath)
+
+            for fn in filenames:
+                if not self._isIgnored(fn, rel_dirpath):
+                    yield os.path.join(dirpath, fn)
+
+            for dn in reversed(dirnames):
+                if not self._isIgnored(dn, rel_dirpath):
+                    walk_stack.append((
+                            os.path.join(dirpath, dn),
+                            os.path.join(rel_dirpath, dn)))
+
+    def _isIgnored(self, name, rel_dirpath):
+        if rel_dirpath:
+            name = os.path.join(rel_dirpath, name)
+        # Ignore patterns use a forward slash regardless of the platform.
+        name = name.replace('\\', '/')
+        return self.ignore_re.search(name) is not None
+
+    def _listDir(self, dirpath):
+        self.visited.add(dirpath)
+        try:
+            mtime = os.stat(dirpath).st_mtime_ns
+        except OSError:
+            return [], []
+
+        listing = self.listings.get(dirpath)
+        if listing is not None and listing[0] == mtime:
+            self.cached_count += 1
+            return listing[1], listing[2]
+
+        # Mimic `os.walk`, which doesn't follow symlinks to directories.
+        dirnames = []
+        filenames = []
+        with os.scandir(dirpath) as it:
+            for e in it:
+                if e.is_dir():
+                    if not e.is_symlink():
+                        dirnames.append(e.name)
+                else:
+                    filenames.append(e.name)
+        dirnames.sort()
+        filenames.sort()
+
+        self.listings[dirpath] = (mtime, dirnames, filenames)
+        return dirnames, filenames
+
+
+def load_dir_listings(cache, name):
+    if not cache.has(name):
+        return {}
+    try:
+        data = json.loads(cache.read(name))
+    except ValueError:
+        logger.debug("Ignoring invalid directory listings cache.")
+        return {}
+    if data.get('version') != DIR_LISTINGS_VERSION:
+        return {}
+    return {k: tuple(v) for k, v in data['listings'].items()}
+
+
+def save_dir_listings(cache, name, listings):
+    data = {'version': DIR_LISTINGS_VERSION, 'listings': listings}
+    cache.write(name, json.dumps(data))
+
+
+def make_combined_re(patterns):
+    """ Combines the given compiled patterns into one, so that matching
+        a path only runs one regex search.
+    """
+    if not patterns:
+        return re.compile(r'(?!)')
+    try:
+        return re.compile('|'.join('(?:%s)' % p.pattern for p in patterns))
+    except re.error:
+        # Some patterns may have inline flags that can't be combined.
+        return _PatternList(patterns)
+
+
+class _PatternList(object):
+    def __init__(self, patterns):
+        self.patterns = patterns
+
+    def search(self, s):
+        for p in self.patterns:
+            m = p.search(s)
+            if m is not None:
+                return m
+        return None
@@ -1,6 +1,13 @@
+import os
+import os.path
+import re
+import gzip
+import shutil
 import time
 import logging
 import yaml
+from piecrust.baking.records import (
+        BakeRecord, BakeRecordEntry, get_bake_record_id)
 from piecrust.data.iterators import PageIterator
 from piecrust.processing.base import SimpleFileProcessor
 from piecrust.routing import create_route_metadata
@@ -22,50 +29,99 @@ SITEURL_CHANGEFREQ = "    <changefreq>%s</changefreq>\n"
 SITEURL_PRIORITY =   "    <priority>%0.1f</priority>\n"
 SITEURL_FOOTER =     "  </url>\n"
 
+SITEMAPINDEX_HEADER = \
+"""<?xml version="1.0" encoding="utf-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+"""
+SITEMAPINDEX_FOOTER = "</sitemapindex>\n"
+
+SITEMAPINDEX_ENTRY = \
+"""  <sitemap>
+    <loc>%s</loc>
+    <lastmod>%s</lastmod>
+  </sitemap>
+"""
+
+# Limits from the Sitemap protocol.
+MAX_URLS_PER_SITEMAP = 50000
+MAX_BYTES_PER_SITEMAP = 50 * 1024 * 1024
+
 
 class SitemapProcessor(SimpleFileProcessor):
     PROCESSOR_NAME = 'sitemap'
 
     def __init__(self):
         super(SitemapProcessor, self).__init__({'sitemap': 'xml'})
+        # Sitemaps can be split into any number of files, which the
+        # artifact cache doesn't know about.
+        self.is_caching_artifacts = False
         self._start_time = None
+        self._out_dir = None
+        self._tmp_dir = None
+        self._bake_record = None
 
     def onPipelineStart(self, pipeline):
         self._start_time = time.time()
+        self._out_dir = pipeline.out_dir
+        self._tmp_dir = pipeline.tmp_dir
+        self._bake_record = None
+
+    def getDependencies(self, path):
+        # Re-generate the sitemap whenever the website was baked again.
+        record_path = self._getBakeRecordPath()
+        if record_path is not None and os.path.isfile(record_path):
+            return [record_path]
+        return None
 
     def _doProcess(self, in_path, out_path):
         with open(in_path, 'r') as fp:
             sitemap = yaml.load(fp)
 
-        with open(out_path, 'w') as fp:
-            fp.write(SITEMAP_HEADER)
-            self._writeManualLocs(sitemap, fp)
-            self._writeAutoLocs(sitemap, fp)
-            fp.write(SITEMAP_FOOTER)
+        max_urls = min(sitemap.get('max_urls', MAX_URLS_PER_SITEMAP),
+                       MAX_URLS_PER_SITEMAP)
+        rel_path = self._getRelativeOutputPath(out_path)
+        writer = _ShardedSitemapWriter(
+                out_path, self._getShardsDir(out_path, rel_path),
+                self._getUri(rel_path), max_urls,
+                use_gzip=sitemap.get('gzip', False))
+        try:
+            self._writeManualLocs(sitemap, writer)
+            self._writeAutoLocs(sitemap, writer)
+        finally:
+            writer.close()
 
         return True
 
-    def _writeManualLocs(self, sitemap, fp):
+    def _writeManualLocs(self, sitemap, writer):
         locs = sitemap.setdefault('locations', None)
         if not locs:
             return
 
         logger.debug("Generating manual sitemap entries.")
         for loc in locs:
-            self._writeEntry(loc, fp)
+            writer.writeEntry(loc)
 
-    def _writeAutoLocs(self, sitemap, fp):
+    def _writeAutoLocs(self, sitemap, writer):
         source_names = sitemap.setdefault('autogen', None)
         if not source_names:
             return
 
+        for name in source_names:
+            if self.app.getSource(name) is None:
+                raise Exception("No such source: %s" % name)
+
+        record = self._getBakeRecord()
+        if record is not None:
+            logger.debug("Generating automatic sitemap entries from the "
+                         "bake record.")
+            self._writeAutoLocsFromRecord(record, source_names, writer)
+            return
+
         cur_time = strftime_iso8601(time.time())
         for name in source_names:
             logger.debug("Generating automatic sitemap entries for '%s'." %
                          name)
             source = self.app.getSource(name)
-            if source is None:
-                raise Exception("No such source: %s" % name)
 
             it = PageIterator(source)
             for page in it:
@@ -76,20 +132,200 @@ class SitemapProcessor(SimpleFileProcessor):
                 if sm_cfg:
                     args.update(sm_cfg)
 
-                self._writeEntry(args, fp)
+                writer.writeEntry(args)
+
+    def _writeAutoLocsFromRecord(self, record, source_names, writer):
+        source_names = set(source_names)
+        for entry in record.entries:
+            if (entry.source_name not in source_names or
+                    entry.flags & BakeRecordEntry.FLAG_OVERRIDEN or
+                    entry.has_any_error):
+                continue
+
+            sm_cfg = None
+            if entry.config:
+                sm_cfg = entry.config.get('sitemap')
+
+            for sub in entry.subs:
+                try:
+                    mtime = os.path.getmtime(sub.out_path)
+                except OSError:
+                    continue
+
+                args = {'url': sub.out_uri,
+                        'lastmod': strftime_iso8601(mtime)}
+                if sm_cfg:
+                    args.update(sm_cfg)
+                writer.writeEntry(args)
+
+    def _getBakeRecordPath(self):
+        if self._out_dir is None or not self.app.cache.enabled:
+            return None
+        record_cache = self.app.cache.getCache('baker')
+        return record_cache.getCachePath(
+                get_bake_record_id(self._out_dir) + '.record')
+
+    def _getBakeRecord(self):
+        if self._bake_record is not None:
+            return self._bake_record
+
+        record_path = self._getBakeRecordPath()
+        if record_path is None or not os.path.isfile(record_path):
+            return None
+        try:
+            record = BakeRecord.load(record_path)
+        except Exception as ex:
+            logger.debug("Can't load bake record for the sitemap: %s" % ex)
+            return None
+        if not record.hasLatestVersion():
+            return None
 
-    def _writeEntry(self, args, fp):
-        fp.write(SITEURL_HEADER)
-        fp.write(SITEURL_LOC % args['url'])
+        self._bake_record = record
+        return record
+
+    def _getRelativeOutputPath(self, out_path):
+        if self._tmp_dir and _is_in_dir(out_path, self._tmp_dir):
+            # Temp outputs are in a sub-directory named after the level of
+            # the processing tree node.
+            rel_path = os.path.relpath(out_path, self._tmp_dir)
+            return rel_path.split(os.sep, 1)[-1]
+        if self._out_dir and _is_in_dir(out_path, self._out_dir):
+            return os.path.relpath(out_path, self._out_dir)
+        return os.path.basename(out_path)
+
+    def _getShardsDir(self, out_path, rel_path):
+        # The sitemap file itself may be written to the temp directory, to
+        # be copied to the output directory later, but we write the split
+        # files directly to the output directory.
+        if self._out_dir is None:
+            return os.path.dirname(out_path)
+        return os.path.dirname(os.path.join(self._out_dir, rel_path))
+
+    def _getUri(self, rel_path):
+        root = self.app.config.get('site/root') or '/'
+        return root + rel_path.replace('\\', '/')
+
+
+class _ShardedSitemapWriter(object):
+    """ Writes sitemap entries, starting new `sitemap-N.xml` files when the
+        current one gets too big. If that happens, the main sitemap file
+        becomes an index of those files.
+    """
+    def __init__(self, out_path, shards_dir, out_uri, max_urls, *,
+                 use_gzip=False):
+        self.out_path = out_path
+        self.shards_dir = shards_dir
+        self.out_uri = out_uri
+        self.max_urls = max(1, max_urls)
+        self.use_gzip = use_gzip
+        self.shard_paths = []
+        self._fp = None
+        self._url_count = 0
+        self._byte_count = 0
+
+    def writeEntry(self, args):
+        txt = SITEURL_HEADER
+        txt += SITEURL_LOC % args['url']
         if 'lastmod' in args:
-            fp.write(SITEURL_LASTMOD % args['lastmod'])
+            txt += SITEURL_LASTMOD % args['lastmod']
         if 'changefreq' in args:
-            fp.write(SITEURL_CHANGEFREQ % args['changefreq'])
+            txt += SITEURL_CHANGEFREQ % args['changefreq']
         if 'priority' in args:
-            fp.write(SITEURL_PRIORITY % args['priority'])
-        fp.write(SITEURL_FOOTER)
+            txt += SITEURL_PRIORITY % args['priority']
+        txt += SITEURL_FOOTER
+        data = txt.encode('utf8')
+
+        if self._fp is None:
+            self._openShard(self.out_path)
+        elif (self._url_count >= self.max_urls or
+                self._byte_count + len(data) + len(SITEMAP_FOOTER) >
+                MAX_BYTES_PER_SITEMAP):
+            self._nextShard()
+
+        self._fp.write(data)
+        self._url_count += 1
+        self._byte_count += len(data)
+
+    def close(self):
+        if self._fp is None:
+            # No entries at all, write an empty sitemap.
+            self._openShard(self.out_path)
+        self._closeShard()
+
+        if self.shard_paths:
+            # We had to shard the sitemap, so write the index.
+            lastmod = strftime_iso8601(time.time())
+            base_uri = self.out_uri.rsplit('/', 1)[0]
+            with open(self.out_path, 'w', encoding='utf8') as fp:
+                fp.write(SITEMAPINDEX_HEADER)
+                for p in self.shard_paths:
+                    uri = '%s/%s' % (base_uri, os.path.basename(p))
+                    fp.write(SITEMAPINDEX_ENTRY % (uri, lastmod))
+                fp.write(SITEMAPINDEX_FOOTER)
+
+        self._removeStaleShards()
+
+    def _removeStaleShards(self):
+        # The split files aren't outputs of the processing pipeline, so
+        # nobody else will delete the ones left over from a previous run
+        # that had more entries, or that used another compression setting.
+        if not os.path.isdir(self.shards_dir):
+            return
+        base, ext = os.path.splitext(os.path.basename(self.out_path))
+        shard_re = re.compile(r'^%s-\d+%s(\.gz)?$' %
+                              (re.escape(base), re.escape(ext)))
+        keep = set(os.path.basename(p) for p in self.shard_paths)
+        for fn in os.listdir(self.shards_dir):
+            if shard_re.match(fn) and fn not in keep:
+                logger.debug("Removing stale sitemap file: %s" % fn)
+                os.remove(os.path.join(self.shards_dir, fn))
+
+    def _nextShard(self):
+        self._closeShard()
+        if not self.shard_paths:
+            if not os.path.isdir(self.shards_dir):
+                os.makedirs(self.shards_dir, 0o755, exist_ok=True)
+            # The main sitemap file was the first shard... move it aside
+            # so it can be replaced by the index.
+            first_path = self._getShardPath(1)
+            if self.use_gzip:
+                with open(self.out_path, 'rb') as ifp, \
+                        gzip.open(first_path, 'wb') as ofp:
+                    ofp.write(ifp.read())
+                os.remove(self.out_path)
+            else:
+                shutil.move(self.out_path, first_path)
+            self.shard_paths.append(first_path)
+
+        path = self._getShardPath(len(self.shard_paths) + 1)
+        self._openShard(path)
+        self.shard_paths.append(path)
+
+    def _getShardPath(self, num):
+        base, ext = os.path.splitext(os.path.basename(self.out_path))
+        path = os.path.join(self.shards_dir, '%s-%d%s' % (base, num, ext))
+        if self.use_gzip:
+            path += '.gz'
+        return path
+
+    def _openShard(self, path):
+        if self.use_gzip and path != self.out_path:
+            self._fp = gzip.open(path, 'wb')
+        else:
+            self._fp = open(path, 'wb')
+        self._fp.write(SITEMAP_HEADER.encode('utf8'))
+        self._url_count = 0
+        self._byte_count = len(SITEMAP_HEADER)
+
+    def _closeShard(self):
+        self._fp.write(SITEMAP_FOOTER.encode('utf8'))
+        self._fp.close()
+        self._fp = None
+
+
+def _is_in_dir(path, dirpath):
+    return path.startswith(dirpath.rstrip(os.sep) + os.sep)
 
 
 def strftime_iso8601(t):
     return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(t))
-
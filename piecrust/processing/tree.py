@@ -119,10 +119,13 @@ class ProcessingTreeBuilder(object):
 
 
 class ProcessingTreeRunner(object):
-    def __init__(self, base_dir, tmp_dir, out_dir):
+    def __init__(self, base_dir, tmp_dir, out_dir, *,
+                 artifact_cache=None, restore_artifacts=True):
         self.base_dir = base_dir
         self.tmp_dir = tmp_dir
         self.out_dir = out_dir
+        self.artifact_cache = artifact_cache
+        self.restore_artifacts = restore_artifacts
 
     def processSubTree(self, tree_root):
         did_process = False
@@ -174,6 +177,19 @@ class ProcessingTreeRunner(object):
                 pass
 
         try:
+            cache_key = None
+            if self._canUseArtifactCache(proc):
+                cache_key = self.artifact_cache.getKey(
+                        proc.app, get_node_name_tree(node), full_path)
+                out_paths = [self._getNodePath(o) for o in node.outputs]
+                side_paths = proc.getArtifactSideFiles(full_path)
+                if (self.restore_artifacts and
+                        self.artifact_cache.restore(cache_key, out_paths,
+                                                    side_paths)):
+                    proc.app.env.stepCounter('ProcessingCacheHits')
+                    print_node(node, "-> %s [cached]" % out_dir)
+                    return True
+
             start_time = time.perf_counter()
             with proc.app.env.timerScope(proc.__class__.__name__):
                 proc_res = proc.process(full_path, out_dir)
@@ -181,6 +197,9 @@ class ProcessingTreeRunner(object):
                 raise Exception("Processor '%s' didn't return a boolean "
                                 "result value." % proc)
             if proc_res:
+                if cache_key is not None:
+                    self._storeArtifacts(node, cache_key, full_path,
+                                         out_paths, side_paths)
                 print_node(node, "-> %s" % out_dir)
                 return True
             else:
@@ -189,6 +208,26 @@ class ProcessingTreeRunner(object):
         except Exception as e:
             raise ProcessorError(proc.PROCESSOR_NAME, full_path) from e
 
+    def _canUseArtifactCache(self, proc):
+        # Processors that don't delegate their dependency check may not
+        # even process anything.
+        return (self.artifact_cache is not None and
+                proc.is_caching_artifacts and
+                proc.is_delegating_dependency_check)
+
+    def _storeArtifacts(self, node, cache_key, full_path, out_paths,
+                        side_paths):
+        proc = node.getProcessor()
+        try:
+            deps = proc.getDependencies(full_path)
+        except Exception as e:
+            logger.debug("Not caching artifacts for '%s': %s" %
+                         (node.path, e))
+            return
+        if deps == FORCE_BUILD:
+            return
+        self.artifact_cache.store(cache_key, out_paths, deps, side_paths)
+
     def _computeNodeState(self, node):
         if node.state != STATE_UNKNOWN:
             return
@@ -2,7 +2,9 @@ import re
 import os.path
 import time
 import logging
+from piecrust import CACHE_DIR
 from piecrust.app import PieCrust, apply_variant_and_values
+from piecrust.processing.artifacts import ProcessingArtifactCache
 from piecrust.processing.base import PipelineContext
 from piecrust.processing.records import (
         FLAG_NONE, FLAG_PREPARED, FLAG_PROCESSED,
@@ -24,11 +26,13 @@ re_ansicolors = re.compile('\033\\[\d+m')
 
 class ProcessingWorkerContext(object):
     def __init__(self, appfactory, out_dir, tmp_dir, *,
-                 force=False):
+                 force=False, trace=False):
         self.appfactory = appfactory
         self.out_dir = out_dir
         self.tmp_dir = tmp_dir
         self.force = force
+        self.trace = trace
+        self.app = None
         self.is_profiling = False
         self.enabled_processors = None
         self.additional_processors = None
@@ -48,6 +52,7 @@ class ProcessingWorkerResult(object):
         self.flags = FLAG_NONE
         self.proc_tree = None
         self.rel_outputs = None
+        self.copy_modes = None
         self.errors = None
 
 
@@ -56,16 +61,39 @@ class ProcessingWorker(IWorker):
         self.ctx = ctx
         self.work_start_time = time.perf_counter()
 
+    @classmethod
+    def preload(cls, ctx):
+        # Create the app before the workers are forked, and load the
+        # processors, which is the slow part.
+        app = ctx.appfactory.create()
+        app.plugin_loader.getProcessors()
+        ctx.app = app
+
     def initialize(self):
-        # Create the app local to this worker.
-        app = self.ctx.appfactory.create()
+        # Create the app local to this worker, unless it was preloaded.
+        app = self.ctx.app
+        if app is None:
+            app = self.ctx.appfactory.create()
+        if self.ctx.trace:
+            app.env.enableTracing("PipelineWorker_%d" % self.wid, self.wid)
         app.env.registerTimer("PipelineWorker_%d_Total" % self.wid)
         app.env.registerTimer("PipelineWorkerInit")
         app.env.registerTimer("JobReceive")
         app.env.registerTimer('BuildProcessingTree')
         app.env.registerTimer('RunProcessingTree')
+        app.env.registerCounter('ProcessingCacheHits')
         self.app = app
 
+        self.artifact_cache = None
+        if (app.cache.enabled and
+                app.config.get('baker/processing_cache', True)):
+            # Artifacts don't depend on the cache key, so they go in the
+            # website's root cache directory to be shared between variants.
+            self.artifact_cache = ProcessingArtifactCache(
+                    os.path.join(app.root_dir, CACHE_DIR, 'proc_artifacts'),
+                    app.root_dir,
+                    exclude_dirs=[self.ctx.tmp_dir])
+
         processors = app.plugin_loader.getProcessors()
         if self.ctx.enabled_processors:
             logger.debug("Filtering processors to: %s" %
@@ -121,10 +149,16 @@ class ProcessingWorker(IWorker):
         if job.force:
             tree_root.setState(STATE_DIRTY, True)
 
+        trace_args = None
+        if self.app.env.is_tracing:
+            trace_args = {'path': rel_path}
         try:
-            with self.app.env.timerScope('RunProcessingTree'):
+            with self.app.env.timerScope('RunProcessingTree',
+                                         trace_args=trace_args):
                 runner = ProcessingTreeRunner(
-                        job.base_dir, self.ctx.tmp_dir, self.ctx.out_dir)
+                        job.base_dir, self.ctx.tmp_dir, self.ctx.out_dir,
+                        artifact_cache=self.artifact_cache,
+                        restore_artifacts=not self.ctx.force)
                 if runner.processSubTree(tree_root):
                     result.flags |= FLAG_PROCESSED
         except ProcessingTreeError as ex:
@@ -133,6 +167,17 @@ class ProcessingWorker(IWorker):
             # Need to strip out colored errors from external processes.
             result.errors = _get_errors(ex, strip_colors=True)
 
+        # Remember how the final outputs were copied, if they were.
+        copy_modes = {}
+        for p in processors:
+            if p.PROCESSOR_NAME == 'copy':
+                for o in result.rel_outputs:
+                    out_path = os.path.join(self.ctx.out_dir, o)
+                    mode = p.copy_modes.pop(out_path, None)
+                    if mode is not None:
+                        copy_modes[o] = mode
+        result.copy_modes = copy_modes
+
         return result
 
     def getReport(self, pool_reports):
@@ -145,7 +190,7 @@ class ProcessingWorker(IWorker):
         self.app.env.stepTimerSince("PipelineWorker_%d_Total" % self.wid,
                                     self.work_start_time)
         data = self.app.env.getStats()
-        data.timers.update(pool_reports)
+        data.mergeStats(pool_reports)
         return {
                 'type': 'stats',
                 'data': data}
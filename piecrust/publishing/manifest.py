@@ -0,0 +1,127 @@
+import os
+import os.path
+import json
+import logging
+import concurrent.futures
+from piecrust.copyutil import get_file_hash
+
+
+logger = logging.getLogger(__name__)
+
+
+MANIFEST_VERSION = 1
+
+
+class PublishManifest(object):
+    """ A list of published files, with their size and hash, used to only
+        send what changed since the last time a website was published.
+
+        Paths are relative to the root of the published website, and always
+        use forward slashes.
+    """
+    def __init__(self, files=None):
+        self.files = files if files is not None else {}
+
+    def diff(self, other):
+        """ Returns the paths that need to be sent to turn `other` into
+            this manifest, and the paths that need to be deleted.
+        """
+        to_send = [p for p, info in self.files.items()
+                   if other.files.get(p) != info]
+        to_delete = [p for p in other.files if p not in self.files]
+        to_send.sort()
+        to_delete.sort()
+        return to_send, to_delete
+
+    def getDirs(self):
+        dirs = set()
+        for p in self.files:
+            d = p.rpartition('/')[0]
+            while d and d not in dirs:
+                dirs.add(d)
+                d = d.rpartition('/')[0]
+        return dirs
+
+    def serialize(self):
+        data = {'version': MANIFEST_VERSION, 'files': self.files}
+        return json.dumps(data, sort_keys=True).encode('utf8')
+
+    @staticmethod
+    def deserialize(data):
+        """ Loads a manifest from serialized data, or returns `None` if
+            that data isn't a valid manifest.
+        """
+        try:
+            data = json.loads(data.decode('utf8'))
+        except ValueError:
+            logger.warning("Ignoring invalid publish manifest.")
+            return None
+        if data.get('version') != MANIFEST_VERSION:
+            logger.debug("Ignoring publish manifest with unknown version.")
+            return None
+        return PublishManifest({p: list(i) for p, i in data['files'].items()})
+
+
+def build_local_manifest(root_dir, *, hash_cache=None, thread_count=4,
+                         exclude=None):
+    """ Builds the manifest for all the files in `root_dir`.
+
+        The `hash_cache` dictionary, if given, remembers the hash of each
+        file along with its size and modification time, so that files that
+        didn't change don't need to be hashed again. It gets updated with
+        the new hashes.
+    """
+    if hash_cache is None:
+        hash_cache = {}
+    exclude = exclude or []
+
+    stats = {}
+    for dirpath, dirnames, filenames in os.walk(root_dir):
+        rel_dirpath = os.path.relpath(dirpath, root_dir)
+        for fn in filenames:
+            rel_path = fn
+            if rel_dirpath != '.':
+                rel_path = os.path.join(rel_dirpath, fn)
+            rel_path = rel_path.replace('\\', '/')
+            if rel_path in exclude:
+                continue
+            st = os.stat(os.path.join(dirpath, fn))
+            stats[rel_path] = (st.st_size, st.st_mtime_ns)
+
+    # Forget about files that don't exist anymore, and hash the files that
+    # changed, in parallel.
+    for p in list(hash_cache.keys()):
+        if p not in stats:
+            del hash_cache[p]
+    to_hash = [p for p, st in stats.items()
+               if hash_cache.get(p, [None, None])[:2] != list(st)]
+    if to_hash:
+        logger.debug("Hashing %d files..." % len(to_hash))
+
+        def _hash(p):
+            return get_file_hash(os.path.join(root_dir, p))
+
+        with concurrent.futures.ThreadPoolExecutor(
+                max(1, thread_count)) as executor:
+            for p, h in zip(to_hash, executor.map(_hash, to_hash)):
+                hash_cache[p] = [stats[p][0], stats[p][1], h]
+
+    files = {p: [info[0], info[2]] for p, info in hash_cache.items()}
+    return PublishManifest(files)
+
+
+def load_hash_cache(cache, name):
+    if not cache.has(name):
+        return {}
+    try:
+        data = json.loads(cache.read(name))
+    except ValueError:
+        return {}
+    if data.get('version') != MANIFEST_VERSION:
+        return {}
+    return data['files']
+
+
+def save_hash_cache(cache, name, hash_cache):
+    data = {'version': MANIFEST_VERSION, 'files': hash_cache}
+    cache.write(name, json.dumps(data))
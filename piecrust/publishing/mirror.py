@@ -0,0 +1,255 @@
+import os
+import os.path
+import shutil
+import logging
+import datetime
+import concurrent.futures
+from piecrust.copyutil import (
+        FileCopier, COPY_MODE_COPY, COPY_MODE_HARDLINK)
+from piecrust.publishing.base import Publisher, PublisherConfigurationError
+from piecrust.publishing.manifest import (
+        PublishManifest, build_local_manifest,
+        load_hash_cache, save_hash_cache)
+
+
+logger = logging.getLogger(__name__)
+
+
+MANIFEST_FILENAME = 'manifest.json'
+
+
+class DirectoryMirrorPublisher(Publisher):
+    """ Mirrors the bake output into a local (or mounted) directory.
+
+        The destination is a symlink to a "release" directory. Each publish
+        creates a new release next to it, by hard-linking the files that
+        didn't change from the current release and copying the ones that
+        did, and then atomically re-points the symlink to it. This way, the
+        live website never sees a half-synced state.
+    """
+    PUBLISHER_NAME = 'dir'
+    PUBLISHER_SCHEME = 'dir'
+
+    def setupPublishParser(self, parser, app):
+        parser.add_argument(
+                '--force',
+                action='store_true',
+                help=("Compare the bake output with the files actually in "
+                      "the destination, instead of with the manifest saved "
+                      "by the last publish."))
+
+    def run(self, ctx):
+        if self.has_url_config:
+            dest_dir = self.config.netloc + self.config.path
+            thread_count = 4
+            keep_releases = 1
+            copy_mode = COPY_MODE_COPY
+        else:
+            dest_dir = self.getConfigValue('destination')
+            if not dest_dir:
+                raise PublisherConfigurationError(
+                        "Publish target '%s' doesn't specify a "
+                        "'destination'." % self.target)
+            thread_count = self.getConfigValue('threads', 4)
+            keep_releases = self.getConfigValue('keep_releases', 1)
+            copy_mode = self.getConfigValue('copy_mode', COPY_MODE_COPY)
+
+        dest_dir = os.path.join(self.app.root_dir,
+                                os.path.expanduser(dest_dir))
+        dest_dir = os.path.normpath(dest_dir)
+
+        if ctx.preview:
+            logger.info("Would mirror '%s' to: %s" %
+                        (ctx.bake_out_dir, dest_dir))
+            return
+
+        hash_cache_name = '%s.hashes.json' % self.target
+        pub_cache = self.app.cache.getCache('pub')
+        hash_cache = load_hash_cache(pub_cache, hash_cache_name)
+        local_manifest = build_local_manifest(
+                ctx.bake_out_dir, hash_cache=hash_cache,
+                thread_count=thread_count)
+        save_hash_cache(pub_cache, hash_cache_name, hash_cache)
+
+        deleted = []
+        if ctx.was_baked:
+            deleted = [os.path.relpath(p, ctx.bake_out_dir)
+                       for p in self.getDeletedFiles(ctx)]
+
+        mirror = DirectoryMirror(
+                dest_dir, thread_count=thread_count,
+                keep_releases=keep_releases, copy_mode=copy_mode)
+        mirror.sync(ctx.bake_out_dir, local_manifest,
+                    deleted=deleted, force=ctx.args.force)
+
+
+class DirectoryMirror(object):
+    def __init__(self, dest_dir, *, thread_count=4, keep_releases=1,
+                 copy_mode=COPY_MODE_COPY):
+        if copy_mode == COPY_MODE_HARDLINK:
+            # Later bakes, and the asset pipeline, can overwrite their
+            # outputs in place, which would change the published files
+            # behind our back.
+            raise Exception("Bake outputs can't be hard-linked into the "
+                            "destination, use another copy mode.")
+        self.dest_dir = dest_dir
+        self.thread_count = max(1, thread_count)
+        self.keep_releases = max(0, keep_releases)
+        self.copy_mode = copy_mode
+
+        parent_dir, name = os.path.split(dest_dir)
+        self.releases_dir = os.path.join(parent_dir, '.%s.releases' % name)
+        self.copied = []
+        self.deleted = []
+
+    def sync(self, local_dir, local_manifest, *, deleted=None, force=False):
+        if not os.path.isdir(self.releases_dir):
+            os.makedirs(self.releases_dir, 0o755)
+
+        # Figure out what's currently in the destination.
+        cur_dir = None
+        if os.path.isdir(self.dest_dir):
+            cur_dir = os.path.realpath(self.dest_dir)
+        prev_manifest = self._loadManifest()
+        if cur_dir is None:
+            dest_manifest = PublishManifest()
+        elif prev_manifest is None or force:
+            logger.info("Hashing destination files...")
+            dest_manifest = build_local_manifest(
+                    cur_dir, thread_count=self.thread_count)
+        else:
+            dest_manifest = prev_manifest
+
+        to_copy, stale = local_manifest.diff(dest_manifest)
+
+        # Only delete files we know we published, so that any other files
+        # in the destination are left alone.
+        to_delete = set(p.replace('\\', '/') for p in deleted or [])
+        if prev_manifest is not None:
+            to_delete |= set(p for p in stale if p in prev_manifest.files)
+        to_delete -= set(local_manifest.files.keys())
+
+        if not to_copy and not to_delete and cur_dir is not None:
+            logger.info("Nothing to copy or delete in the destination.")
+            return
+
+        # Build the new release.
+        release_id = datetime.datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        release_dir = os.path.join(self.releases_dir, release_id)
+        staging_dir = release_dir + '.tmp'
+        try:
+            self._stage(local_dir, cur_dir, staging_dir, to_copy, to_delete)
+            os.rename(staging_dir, release_dir)
+        except Exception:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+
+        # Go live.
+        self._flip(release_dir)
+        self._saveManifest(local_manifest)
+        self._cleanReleases(release_dir)
+
+    def _stage(self, local_dir, cur_dir, staging_dir, to_copy, to_delete):
+        ops = []
+        for p in to_copy:
+            logger.info(p)
+            ops.append((os.path.join(local_dir, p), p, False))
+            self.copied.append(p)
+
+        # Carry over everything else from the current release.
+        if cur_dir is not None:
+            to_copy = set(to_copy)
+            for dirpath, dirnames, filenames in os.walk(cur_dir):
+                for fn in filenames:
+                    src = os.path.join(dirpath, fn)
+                    p = os.path.relpath(src, cur_dir).replace('\\', '/')
+                    if p in to_copy:
+                        continue
+                    if p in to_delete:
+                        logger.info("%s [DELETE]" % p)
+                        self.deleted.append(p)
+                        continue
+                    ops.append((src, p, True))
+
+        dirs = PublishManifest({p: None for _, p, _ in ops}).getDirs()
+        os.makedirs(staging_dir, 0o755)
+        for d in sorted(dirs):
+            os.makedirs(os.path.join(staging_dir, d), 0o755, exist_ok=True)
+
+        copier = FileCopier(self.copy_mode)
+        linker = FileCopier(COPY_MODE_HARDLINK)
+
+        def _do_op(op):
+            src, p, is_carried_over = op
+            dst = os.path.join(staging_dir, *p.split('/'))
+            if is_carried_over:
+                linker.copy(src, dst)
+            else:
+                copier.copy(src, dst)
+
+        with concurrent.futures.ThreadPoolExecutor(
+                self.thread_count) as executor:
+            for _ in executor.map(_do_op, ops):
+                pass
+
+    def _flip(self, release_dir):
+        rel_target = os.path.relpath(release_dir,
+                                     os.path.dirname(self.dest_dir))
+        if os.path.islink(self.dest_dir) or not os.path.exists(
+                self.dest_dir):
+            # Make a new symlink and rename it over the current one, which
+            # is atomic.
+            tmp_link = '%s.%d.lnk' % (self.dest_dir, os.getpid())
+            try:
+                os.symlink(rel_target, tmp_link)
+                os.replace(tmp_link, self.dest_dir)
+                return
+            except (OSError, NotImplementedError) as ex:
+                logger.debug("Can't use a symlink for '%s': %s" %
+                             (self.dest_dir, ex))
+                if os.path.lexists(tmp_link):
+                    os.remove(tmp_link)
+                if os.path.islink(self.dest_dir):
+                    raise
+
+        # The destination is a real directory, either from before we
+        # started managing it, or because symlinks aren't supported. Swap
+        # it with the new release... this isn't atomic, but it's as close
+        # as we can get.
+        old_dir = '%s.%d.old' % (self.dest_dir, os.getpid())
+        if os.path.exists(self.dest_dir):
+            os.rename(self.dest_dir, old_dir)
+        try:
+            os.symlink(rel_target, self.dest_dir)
+        except (OSError, NotImplementedError):
+            os.rename(release_dir, self.dest_dir)
+        if os.path.exists(old_dir):
+            shutil.rmtree(old_dir)
+
+    def _cleanReleases(self, cur_release_dir):
+        releases = sorted(
+                [d for d in os.listdir(self.releases_dir)
+                 if os.path.isdir(os.path.join(self.releases_dir, d)) and
+                 not d.endswith('.tmp')],
+                reverse=True)
+        cur_name = os.path.basename(cur_release_dir)
+        old_releases = [r for r in releases if r != cur_name]
+        for r in old_releases[self.keep_releases:]:
+            logger.debug("Removing old release: %s" % r)
+            shutil.rmtree(os.path.join(self.releases_dir, r),
+                          ignore_errors=True)
+
+    def _loadManifest(self):
+        path = os.path.join(self.releases_dir, MANIFEST_FILENAME)
+        try:
+            with open(path, 'rb') as fp:
+                return PublishManifest.deserialize(fp.read())
+        except OSError:
+            return None
+
+    def _saveManifest(self, manifest):
+        path = os.path.join(self.releases_dir, MANIFEST_FILENAME)
+        tmp_path = '%s.%d.tmp' % (path, os.getpid())
+        with open(tmp_path, 'wb') as fp:
+            fp.write(manifest.serialize())
+        os.replace(tmp_path, path)
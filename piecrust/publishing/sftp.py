@@ -1,16 +1,25 @@
 import os
 import os.path
+import queue
 import socket
+import posixpath
 import urllib.parse
 import getpass
 import logging
+import threading
 import paramiko
 from piecrust.publishing.base import Publisher, PublisherConfigurationError
+from piecrust.publishing.manifest import (
+        PublishManifest, build_local_manifest,
+        load_hash_cache, save_hash_cache)
 
 
 logger = logging.getLogger(__name__)
 
 
+DEFAULT_MANIFEST_NAME = '.piecrust-manifest.json'
+
+
 class SftpPublisher(Publisher):
     PUBLISHER_NAME = 'sftp'
     PUBLISHER_SCHEME = 'sftp'
@@ -20,7 +29,7 @@ class SftpPublisher(Publisher):
                 '--force',
                 action='store_true',
                 help=("Upload the entire bake directory instead of only "
-                      "the files changed by the last bake."))
+                      "the files that changed since the last upload."))
 
     def run(self, ctx):
         remote = self.config
@@ -72,11 +81,7 @@ class SftpPublisher(Publisher):
         try:
             logger.info("Connected as %s" %
                         sshc.get_transport().get_username())
-            client = sshc.open_sftp()
-            try:
-                self._upload(sshc, client, ctx, path)
-            finally:
-                client.close()
+            self._upload(sshc, ctx, path)
         finally:
             sshc.close()
 
@@ -86,74 +91,217 @@ class SftpPublisher(Publisher):
         else:
             logger.info("Would upload entire website...")
 
-    def _upload(self, session, client, ctx, dest_dir):
-        if dest_dir:
-            if dest_dir.startswith('~/'):
-                _, out_chan, _ = session.exec_command("echo $HOME")
-                home_dir = out_chan.read().decode('utf8').strip()
-                dest_dir = home_dir + dest_dir[1:]
-            logger.debug("CHDIR %s" % dest_dir)
+    def _upload(self, session, ctx, dest_dir):
+        if dest_dir and dest_dir.startswith('~/'):
+            _, out_chan, _ = session.exec_command("echo $HOME")
+            home_dir = out_chan.read().decode('utf8').strip()
+            dest_dir = home_dir + dest_dir[1:]
+
+        connection_count = 4
+        manifest_name = DEFAULT_MANIFEST_NAME
+        if not self.has_url_config:
+            connection_count = self.getConfigValue(
+                    'connections', connection_count)
+            manifest_name = self.getConfigValue('manifest', manifest_name)
+
+        # Hash the local files, re-using the hashes of files that didn't
+        # change since last time.
+        hash_cache_name = '%s.hashes.json' % self.target
+        pub_cache = self.app.cache.getCache('pub')
+        hash_cache = load_hash_cache(pub_cache, hash_cache_name)
+        local_manifest = build_local_manifest(
+                ctx.bake_out_dir, hash_cache=hash_cache,
+                exclude=[manifest_name])
+        save_hash_cache(pub_cache, hash_cache_name, hash_cache)
+
+        uploader = SftpUploader(
+                session.open_sftp, dest_dir,
+                connection_count=connection_count,
+                manifest_name=manifest_name)
+        uploader.sync(ctx.bake_out_dir, local_manifest,
+                      force=ctx.args.force)
+
+
+class SftpUploader(object):
+    """ Uploads a local directory to an SFTP server, using several SFTP
+        channels at once.
+
+        A manifest of what was uploaded (see `PublishManifest`) is kept on
+        the server, next to the website, so that only files that really
+        changed are uploaded next time, whatever happened to the local
+        files in between.
+
+        The `client_factory` returns new SFTP clients, like Paramiko's
+        `SSHClient.open_sftp`.
+    """
+    def __init__(self, client_factory, dest_dir, *, connection_count=4,
+                 manifest_name=DEFAULT_MANIFEST_NAME):
+        self.client_factory = client_factory
+        self.dest_dir = dest_dir or ''
+        self.connection_count = max(1, connection_count)
+        self.manifest_name = manifest_name
+        self.uploaded = []
+        self.deleted = []
+
+    def sync(self, local_dir, local_manifest, *, force=False):
+        client = self.client_factory()
+        try:
+            self._sync(client, local_dir, local_manifest, force)
+        finally:
+            client.close()
+
+    def _sync(self, client, local_dir, local_manifest, force):
+        if self.dest_dir:
+            self._makeDir(client, self.dest_dir)
+
+        remote_manifest = self._loadManifest(client)
+        if remote_manifest is None:
+            logger.info("No manifest found on the remote server.")
+            remote_manifest = PublishManifest()
+            force = True
+
+        to_upload, to_delete = local_manifest.diff(remote_manifest)
+        if force:
+            logger.info("Uploading entire website...")
+            to_upload = sorted(local_manifest.files.keys())
+        elif to_upload or to_delete:
+            logger.info("Uploading new/changed files...")
+        else:
+            logger.info("Nothing to upload or delete on the remote server.")
+            logger.info("If you want to force uploading the entire website, "
+                        "use the `--force` flag.")
+            return
+
+        # Create all the directories we need first, so that the upload
+        # threads don't have to worry about it.
+        known_dirs = remote_manifest.getDirs()
+        needed_dirs = PublishManifest(
+                {p: None for p in to_upload}).getDirs()
+        for d in sorted(needed_dirs - known_dirs):
+            self._makeDir(client, self._getRemotePath(d))
+
+        errors = self._uploadFiles(local_dir, to_upload)
+
+        if to_delete:
+            logger.info("Deleting removed files...")
+        for p in to_delete:
+            logger.info("%s [DELETE]" % p)
             try:
-                client.chdir(dest_dir)
+                client.remove(self._getRemotePath(p))
             except IOError:
-                client.mkdir(dest_dir)
-                client.chdir(dest_dir)
-
-        known_dirs = {}
-        if ctx.was_baked and not ctx.args.force:
-            to_upload = list(self.getBakedFiles(ctx))
-            to_delete = list(self.getDeletedFiles(ctx))
-            if to_upload or to_delete:
-                logger.info("Uploading new/changed files...")
-                for path in self.getBakedFiles(ctx):
-                    rel_path = os.path.relpath(path, ctx.bake_out_dir)
-                    logger.info(rel_path)
-                    if not ctx.preview:
-                        self._putFile(client, path, rel_path, known_dirs)
-                logger.info("Deleting removed files...")
-                for path in self.getDeletedFiles(ctx):
-                    rel_path = os.path.relpath(path, ctx.bake_out_dir)
-                    logger.info("%s [DELETE]" % rel_path)
-                    if not ctx.preview:
-                        try:
-                            client.remove(rel_path)
-                        except OSError:
-                            pass
-            else:
-                logger.info("Nothing to upload or delete on the remote server.")
-                logger.info("If you want to force uploading the entire website, "
-                            "use the `--force` flag.")
-        else:
-            logger.info("Uploading entire website...")
-            for dirpath, dirnames, filenames in os.walk(ctx.bake_out_dir):
-                for f in filenames:
-                    abs_f = os.path.join(dirpath, f)
-                    rel_f = os.path.relpath(abs_f, ctx.bake_out_dir)
-                    logger.info(rel_f)
-                    if not ctx.preview:
-                        self._putFile(client, abs_f, rel_f, known_dirs)
-
-    def _putFile(self, client, local_path, remote_path, known_dirs):
-        # Split the remote path in bits.
-        remote_path = os.path.normpath(remote_path)
-        if os.sep != '/':
-            remote_path = remote_path.sub(os.sep, '/')
-
-        # Make sure each directory in the remote path exists... to prevent
-        # testing the same directories several times, we keep a cache of
-        # `known_dirs` which we know exist.
-        remote_bits = remote_path.split('/')
-        cur = ''
-        for b in remote_bits[:-1]:
-            cur = os.path.join(cur, b)
-            if cur not in known_dirs:
+                pass
+            self.deleted.append(p)
+
+        # Update the remote manifest with what we actually did, so that
+        # a failed upload gets retried next time.
+        new_files = dict(remote_manifest.files)
+        for p in self.uploaded:
+            new_files[p] = local_manifest.files[p]
+        for p in self.deleted:
+            new_files.pop(p, None)
+        self._saveManifest(client, PublishManifest(new_files))
+
+        if errors:
+            for p, ex in errors:
+                logger.error("Error uploading '%s': %s" % (p, ex))
+            raise Exception("Failed to upload %d files." % len(errors))
+
+    def _uploadFiles(self, local_dir, rel_paths):
+        job_queue = queue.Queue()
+        for p in rel_paths:
+            job_queue.put(p)
+
+        errors = []
+        connection_errors = []
+        lock = threading.Lock()
+
+        def _run(client):
+            while True:
+                try:
+                    p = job_queue.get_nowait()
+                except queue.Empty:
+                    break
+                logger.info(p)
+                local_path = os.path.join(local_dir, *p.split('/'))
                 try:
-                    info = client.stat(cur)
-                except FileNotFoundError:
-                    logger.debug("Creating remote dir: %s" % cur)
-                    client.mkdir(cur)
-                known_dirs[cur] = True
+                    # Paramiko pipelines the writes for us. We skip the
+                    # confirmation since that's an extra round-trip per
+                    # file.
+                    client.put(local_path, self._getRemotePath(p),
+                               confirm=False)
+                    with lock:
+                        self.uploaded.append(p)
+                except Exception as ex:
+                    with lock:
+                        errors.append((p, ex))
+
+        def _run_with_client():
+            try:
+                client = self.client_factory()
+            except Exception as ex:
+                logger.debug("Error opening SFTP connection: %s" % ex)
+                with lock:
+                    connection_errors.append(ex)
+                return
+            try:
+                _run(client)
+            finally:
+                client.close()
+
+        thread_count = min(self.connection_count, len(rel_paths))
+        threads = []
+        for i in range(thread_count):
+            t = threading.Thread(name='SftpUploader_%d' % i,
+                                 target=_run_with_client)
+            t.start()
+            threads.append(t)
+        for t in threads:
+            t.join()
+
+        # If some connections couldn't be opened, the other threads took
+        # care of the files, unless no connection could be opened at all.
+        while connection_errors:
+            try:
+                p = job_queue.get_nowait()
+            except queue.Empty:
+                break
+            errors.append((p, connection_errors[0]))
+        return errors
+
+    def _loadManifest(self, client):
+        path = self._getRemotePath(self.manifest_name)
+        try:
+            with client.open(path, 'rb') as fp:
+                data = fp.read()
+        except IOError:
+            return None
+        return PublishManifest.deserialize(data)
+
+    def _saveManifest(self, client, manifest):
+        path = self._getRemotePath(self.manifest_name)
+        tmp_path = path + '.tmp'
+        with client.open(tmp_path, 'wb') as fp:
+            fp.write(manifest.serialize())
+        try:
+            client.posix_rename(tmp_path, path)
+        except IOError:
+            # The server doesn't support the OpenSSH rename extension.
+            try:
+                client.remove(path)
+            except IOError:
+                pass
+            client.rename(tmp_path, path)
 
-        # Should be all good! Upload the file.
-        client.put(local_path, remote_path)
+    def _makeDir(self, client, path):
+        try:
+            client.mkdir(path)
+            logger.debug("Created remote dir: %s" % path)
+        except IOError:
+            # Most likely it already exists... if not, uploading files in
+            # there will fail soon enough.
+            pass
 
+    def _getRemotePath(self, rel_path):
+        if self.dest_dir:
+            return posixpath.join(self.dest_dir, rel_path)
+        return rel_path
@@ -49,6 +49,34 @@ class Record(object):
             return pickle.load(fp)
 
 
+class RecordEntry(object):
+    """ Base class for record entries. Entries use slots to keep the memory
+        footprint of big records down, so they give their state as a
+        dictionary of their slot values when they're pickled.
+    """
+    __slots__ = ()
+
+    def __getstate__(self):
+        return {n: getattr(self, n) for n in _get_slot_names(self.__class__)}
+
+    def __setstate__(self, state):
+        for n, v in state.items():
+            setattr(self, n, v)
+
+
+_slot_names = {}
+
+
+def _get_slot_names(cls):
+    names = _slot_names.get(cls)
+    if names is None:
+        names = []
+        for c in reversed(cls.__mro__):
+            names += getattr(c, '__slots__', ())
+        _slot_names[cls] = names
+    return names
+
+
 class TransitionalRecord(object):
     def __init__(self, record_class, previous_path=None):
         self._record_class = record_class
@@ -1,13 +1,13 @@
 import re
+import sys
 import os.path
-import copy
 import logging
 from werkzeug.utils import cached_property
+from piecrust.configuration import freeze_value
 from piecrust.data.builder import (
         DataBuildingContext, build_page_data, build_layout_data)
 from piecrust.data.filters import (
         PaginationFilter, SettingFilterClause, page_value_accessor)
-from piecrust.fastpickle import _pickle_object, _unpickle_object
 from piecrust.sources.base import PageSource
 from piecrust.templating.base import TemplateNotFoundError, TemplatingError
 
@@ -66,7 +66,7 @@ class RenderedPage(object):
         return self.page.app
 
     def copyRenderInfo(self):
-        return copy.deepcopy(self.render_info)
+        return list(self.render_info)
 
 
 PASS_NONE = -1
@@ -78,6 +78,9 @@ RENDER_PASSES = [PASS_FORMATTING, PASS_RENDERING]
 
 
 class RenderPassInfo(object):
+    __slots__ = ['used_source_names', 'used_pagination',
+                 'pagination_has_more', 'used_assets', '_custom_info']
+
     def __init__(self):
         self.used_source_names = set()
         self.used_pagination = False
@@ -93,6 +96,110 @@ class RenderPassInfo(object):
             return self._custom_info.setdefault(key, default)
         return self._custom_info.get(key, default)
 
+    def freeze(self):
+        return FrozenRenderPassInfo(
+                self.used_source_names, self.used_pagination,
+                self.pagination_has_more, self.used_assets,
+                self._custom_info)
+
+
+_used_source_name_sets = {}
+_no_custom_info = {}
+
+
+class FrozenRenderPassInfo(object):
+    """ The immutable result of a rendering pass. It's what gets cached,
+        sent back from the bake workers, and stored in the bake record,
+        so it can be shared as is between all of those.
+    """
+    __slots__ = ['used_source_names', '_flags', '_custom_info']
+
+    FLAG_USED_PAGINATION = 2**0
+    FLAG_PAGINATION_HAS_MORE = 2**1
+    FLAG_USED_ASSETS = 2**2
+
+    def __init__(self, used_source_names=None, used_pagination=False,
+                 pagination_has_more=False, used_assets=False,
+                 custom_info=None):
+        flags = 0
+        if used_pagination:
+            flags |= self.FLAG_USED_PAGINATION
+        if pagination_has_more:
+            flags |= self.FLAG_PAGINATION_HAS_MORE
+        if used_assets:
+            flags |= self.FLAG_USED_ASSETS
+        self._setState(used_source_names or (), flags, custom_info)
+
+    @property
+    def used_pagination(self):
+        return (self._flags & self.FLAG_USED_PAGINATION) != 0
+
+    @property
+    def pagination_has_more(self):
+        return (self._flags & self.FLAG_PAGINATION_HAS_MORE) != 0
+
+    @property
+    def used_assets(self):
+        return (self._flags & self.FLAG_USED_ASSETS) != 0
+
+    def getCustomInfo(self, key, default=None):
+        return self._custom_info.get(key, default)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Render pass info is read-only.")
+
+    def __eq__(self, other):
+        return (isinstance(other, FrozenRenderPassInfo) and
+                self.__getstate__() == other.__getstate__())
+
+    def __hash__(self):
+        return hash((self.used_source_names, self._flags))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __getstate__(self):
+        return {'used_source_names': sorted(self.used_source_names),
+                'flags': self._flags,
+                'custom_info': self._custom_info}
+
+    def __setstate__(self, state):
+        self._setState(state['used_source_names'], state['flags'],
+                       state['custom_info'])
+
+    def _setState(self, used_source_names, flags, custom_info):
+        # Most pages use the same few sets of sources, so share them.
+        names = frozenset([sys.intern(n) for n in used_source_names])
+        names = _used_source_name_sets.setdefault(names, names)
+        if custom_info:
+            custom_info = freeze_value(custom_info, freeze_dicts=False)
+        else:
+            custom_info = _no_custom_info
+        object.__setattr__(self, 'used_source_names', names)
+        object.__setattr__(self, '_flags', flags)
+        object.__setattr__(self, '_custom_info', custom_info)
+
+    @staticmethod
+    def fromCache(data):
+        """ Returns the render pass info stored in a cached render result,
+            which is the frozen object itself unless it was just loaded
+            back from the file-system cache. Returns `None` if the cached
+            data isn't something we know how to read.
+        """
+        if isinstance(data, FrozenRenderPassInfo):
+            return data
+        if (not isinstance(data, dict) or
+                not isinstance(data.get('used_source_names'), list) or
+                not isinstance(data.get('flags'), int) or
+                not isinstance(data.get('custom_info'), dict)):
+            return None
+        res = FrozenRenderPassInfo.__new__(FrozenRenderPassInfo)
+        res.__setstate__(data)
+        return res
+
 
 class PageRenderingContext(object):
     def __init__(self, qualified_page, page_num=1,
@@ -167,11 +274,10 @@ def render_page(ctx):
             save_to_fs = False
         with ctx.app.env.timerScope("PageRenderSegments"):
             if repo and not ctx.force_render:
-                render_result = repo.get(
-                        ctx.uri,
+                render_result = _get_cached_render_result(
+                        ctx, repo,
                         lambda: _do_render_page_segments(ctx.page, page_data),
-                        fs_cache_time=ctx.page.path_mtime,
-                        save_to_fs=save_to_fs)
+                        save_to_fs)
             else:
                 render_result = _do_render_page_segments(ctx.page, page_data)
                 if repo:
@@ -198,11 +304,8 @@ def render_page(ctx):
         rp = RenderedPage(page, ctx.uri, ctx.page_num)
         rp.data = page_data
         rp.content = layout_result['content']
-        rp.render_info[PASS_FORMATTING] = _unpickle_object(
-                render_result['pass_info'])
-        if layout_result['pass_info'] is not None:
-            rp.render_info[PASS_RENDERING] = _unpickle_object(
-                    layout_result['pass_info'])
+        rp.render_info[PASS_FORMATTING] = render_result['pass_info']
+        rp.render_info[PASS_RENDERING] = layout_result['pass_info']
         return rp
     except Exception as ex:
         if ctx.app.debug:
@@ -225,11 +328,10 @@ def render_page_segments(ctx):
         if ctx.app.env.fs_cache_only_for_main_page and not eis.is_main_page:
             save_to_fs = False
         if repo and not ctx.force_render:
-            render_result = repo.get(
-                ctx.uri,
-                lambda: _do_render_page_segments_from_ctx(ctx),
-                fs_cache_time=ctx.page.path_mtime,
-                save_to_fs=save_to_fs)
+            render_result = _get_cached_render_result(
+                    ctx, repo,
+                    lambda: _do_render_page_segments_from_ctx(ctx),
+                    save_to_fs)
         else:
             render_result = _do_render_page_segments_from_ctx(ctx)
             if repo:
@@ -240,10 +342,30 @@ def render_page_segments(ctx):
 
     rs = RenderedSegments(
             render_result['segments'],
-            _unpickle_object(render_result['pass_info']))
+            render_result['pass_info'])
     return rs
 
 
+def _get_cached_render_result(ctx, repo, render_func, save_to_fs):
+    render_result = repo.get(
+            ctx.uri, render_func,
+            fs_cache_time=ctx.page.path_mtime,
+            save_to_fs=save_to_fs)
+    pass_info = FrozenRenderPassInfo.fromCache(render_result.get('pass_info'))
+    if pass_info is None:
+        # This was cached in a format we don't know, so render it again.
+        logger.debug("Ignoring cached render result with unknown format "
+                     "for: %s" % ctx.uri)
+        repo.invalidate(ctx.uri)
+        render_result = repo.get(
+                ctx.uri, render_func,
+                fs_cache_time=ctx.page.path_mtime,
+                save_to_fs=save_to_fs)
+    else:
+        render_result['pass_info'] = pass_info
+    return render_result
+
+
 def _build_render_data(ctx):
     with ctx.app.env.timerScope("PageDataBuild"):
         data_ctx = DataBuildingContext(ctx.page, page_num=ctx.page_num)
@@ -299,7 +421,7 @@ def _do_render_page_segments(page, page_data):
     pass_info = cpi.render_ctx.render_passes[PASS_FORMATTING]
     res = {
             'segments': formatted_segments,
-            'pass_info': _pickle_object(pass_info)}
+            'pass_info': pass_info.freeze()}
     return res
 
 
@@ -331,7 +453,7 @@ def _do_render_layout(layout_name, page, layout_data):
         raise Exception(msg) from ex
 
     pass_info = cpi.render_ctx.render_passes[PASS_RENDERING]
-    res = {'content': output, 'pass_info': _pickle_object(pass_info)}
+    res = {'content': output, 'pass_info': pass_info.freeze()}
     return res
 
 
@@ -0,0 +1,246 @@
+// Long-lived compiler host for PieCrust's asset processors.
+//
+// PieCrust starts one of these per processor type and per pipeline worker,
+// and talks to it over stdin/stdout with one JSON message per line:
+//
+//  * On startup, the host writes `{"ready": true, "compilers": [...]}` with
+//    the list of compilers for which it could load a node module.
+//  * Each request is `{"id": N, "compiler": "less", "jobs": [...]}` and each
+//    response is `{"id": N, "results": [...]}`, with one result per job.
+//    A result is either `{"ok": true, "deps": [...]}` or
+//    `{"ok": false, "error": "...", "unsupported": false}`. When
+//    `unsupported` is true, PieCrust falls back to running the compiler's
+//    command line for that file.
+'use strict';
+
+var fs = require('fs');
+var path = require('path');
+var readline = require('readline');
+
+
+function tryRequire(name) {
+    try {
+        return require(name);
+    } catch (e) {
+        return null;
+    }
+}
+
+function UnsupportedError(message) {
+    this.message = message;
+    this.unsupported = true;
+}
+
+function parseArgs(args, known) {
+    var res = {};
+    (args || []).forEach(function(arg) {
+        var eq = arg.indexOf('=');
+        var name = (eq >= 0) ? arg.substr(0, eq) : arg;
+        var value = (eq >= 0) ? arg.substr(eq + 1) : true;
+        var handler = known[name];
+        if (handler === undefined) {
+            throw new UnsupportedError("Unsupported option: " + arg);
+        }
+        handler(res, value);
+    });
+    return res;
+}
+
+
+var modules = {
+    less: tryRequire('less'),
+    sass: tryRequire('sass'),
+    uglifyjs: tryRequire('uglify-js'),
+    cleancss: tryRequire('clean-css')
+};
+
+var compilers = {
+    less: function(job, done) {
+        var opts = parseArgs(job.options, {
+            '--compress': function(o) { o.compress = true; },
+            '-x': function(o) { o.compress = true; },
+            '--include-path': function(o, v) {
+                o.paths = String(v).split(path.delimiter);
+            },
+            '--strict-math': function(o, v) { o.strictMath = (v !== 'off'); },
+            '--strict-units': function(o, v) {
+                o.strictUnits = (v !== 'off');
+            }
+        });
+        opts.filename = job.in_path;
+        if (job.map_path) {
+            opts.sourceMap = {
+                sourceMapURL: job.map_url,
+                sourceMapBasepath: path.dirname(job.in_path)
+            };
+        }
+        var input = fs.readFileSync(job.in_path, 'utf8');
+        modules.less.render(input, opts).then(function(output) {
+            fs.writeFileSync(job.out_path, output.css);
+            if (job.map_path && output.map) {
+                fs.writeFileSync(job.map_path, output.map);
+            }
+            done(null, output.imports);
+        }, function(err) {
+            done(err);
+        });
+    },
+
+    sass: function(job, done) {
+        var opts = parseArgs(job.options, {});
+        var style = job.style || 'expanded';
+        if (style !== 'expanded' && style !== 'compressed') {
+            // Dart Sass only supports those two styles, so let the
+            // command line produce the other ones.
+            throw new UnsupportedError("Unsupported style: " + style);
+        }
+        var output = modules.sass.renderSync({
+            file: job.in_path,
+            outFile: job.out_path,
+            outputStyle: style,
+            includePaths: job.load_paths || [],
+            sourceMap: !!job.map_path
+        });
+        fs.writeFileSync(job.out_path, output.css);
+        if (job.map_path && output.map) {
+            // Sources are relative to the output file, but PieCrust reads
+            // them back as dependencies, so make them absolute.
+            var map = JSON.parse(output.map.toString());
+            var out_dir = path.dirname(job.out_path);
+            map.sources = map.sources.map(function(s) {
+                return /^[a-z]+:/.test(s) ? s : path.resolve(out_dir, s);
+            });
+            fs.writeFileSync(job.map_path, JSON.stringify(map));
+        }
+        done(null, output.stats.includedFiles);
+    },
+
+    uglifyjs: function(job, done) {
+        var opts = parseArgs(job.options, {
+            '--compress': function(o) { o.compress = {}; },
+            '-c': function(o) { o.compress = {}; },
+            '--mangle': function(o) { o.mangle = true; },
+            '-m': function(o) { o.mangle = true; }
+        });
+        if (opts.compress === undefined) {
+            opts.compress = false;
+        }
+        if (opts.mangle === undefined) {
+            opts.mangle = false;
+        }
+        var input = {};
+        input[job.in_path] = fs.readFileSync(job.in_path, 'utf8');
+        var output = modules.uglifyjs.minify(input, opts);
+        if (output.error) {
+            return done(output.error);
+        }
+        fs.writeFileSync(job.out_path, output.code);
+        done(null, []);
+    },
+
+    cleancss: function(job, done) {
+        var opts = parseArgs(job.options, {
+            '--skip-rebase': function(o) { o.rebase = false; }
+        });
+        var CleanCSS = modules.cleancss;
+        var input = fs.readFileSync(job.in_path, 'utf8');
+        var output = new CleanCSS(opts).minify(input);
+        if (output.errors && output.errors.length > 0) {
+            return done(new Error(output.errors.join('\n')));
+        }
+        fs.writeFileSync(job.out_path, output.styles);
+        done(null, []);
+    }
+};
+
+
+function runJob(compiler, job, done) {
+    try {
+        compilers[compiler](job, done);
+    } catch (e) {
+        done(e);
+    }
+}
+
+function makeResult(err, deps) {
+    if (err) {
+        return {
+            ok: false,
+            error: String(err.message || err),
+            unsupported: !!err.unsupported
+        };
+    }
+    return {ok: true, deps: deps || []};
+}
+
+function handleRequest(req, callback) {
+    var jobs = req.jobs || [];
+    var results = new Array(jobs.length);
+    var remaining = jobs.length;
+
+    function reply() {
+        process.stdout.write(
+            JSON.stringify({id: req.id, results: results}) + '\n');
+        callback();
+    }
+
+    if (!modules[req.compiler]) {
+        var err = new UnsupportedError(
+            "Compiler isn't available: " + req.compiler);
+        for (var i = 0; i < jobs.length; ++i) {
+            results[i] = makeResult(err);
+        }
+        return reply();
+    }
+    if (remaining === 0) {
+        return reply();
+    }
+
+    jobs.forEach(function(job, i) {
+        runJob(req.compiler, job, function(err, deps) {
+            results[i] = makeResult(err, deps);
+            if (--remaining === 0) {
+                reply();
+            }
+        });
+    });
+}
+
+
+var available = Object.keys(modules).filter(function(n) {
+    return !!modules[n];
+});
+process.stdout.write(
+    JSON.stringify({ready: true, compilers: available}) + '\n');
+
+// Requests are handled one at a time, in order, so that responses always
+// come back in the same order as requests.
+var pending = [];
+var busy = false;
+
+function pump() {
+    if (busy || pending.length === 0) {
+        return;
+    }
+    busy = true;
+    handleRequest(pending.shift(), function() {
+        busy = false;
+        setImmediate(pump);
+    });
+}
+
+var rl = readline.createInterface({input: process.stdin, terminal: false});
+rl.on('line', function(line) {
+    if (!line) {
+        return;
+    }
+    var req;
+    try {
+        req = JSON.parse(line);
+    } catch (e) {
+        process.stderr.write("Invalid request: " + line + '\n');
+        return;
+    }
+    pending.push(req);
+    pump();
+});
@@ -4,6 +4,7 @@ import copy
 import logging
 import urllib.parse
 from werkzeug.utils import cached_property
+from piecrust.configuration import freeze_value
 
 
 logger = logging.getLogger(__name__)
@@ -31,6 +32,8 @@ def create_route_metadata(page):
 
 
 class IRouteMetadataProvider(object):
+    __slots__ = ()
+
     def getRouteMetadata(self):
         raise NotImplementedError()
 
@@ -98,6 +101,8 @@ class Route(object):
         for m in route_re.finditer(self.uri_pattern):
             self.required_route_metadata.add(m.group('name'))
 
+        self._uri_cache = {}
+
         self.template_func = None
         self.template_func_name = None
         self.template_func_args = []
@@ -182,6 +187,22 @@ class Route(object):
         return route_metadata
 
     def getUri(self, route_metadata, *, sub_num=1):
+        # Menus, tag clouds, archives and such ask for the same URLs over
+        # and over again, so we cache them.
+        try:
+            cache_key = (freeze_value(route_metadata), sub_num)
+            return self._uri_cache[cache_key]
+        except TypeError:
+            # Some metadata values can't be hashed.
+            return self._getUri(route_metadata, sub_num)
+        except KeyError:
+            pass
+
+        uri = self._getUri(route_metadata, sub_num)
+        self._uri_cache[cache_key] = uri
+        return uri
+
+    def _getUri(self, route_metadata, sub_num):
         route_metadata = dict(route_metadata)
         for k in route_metadata:
             route_metadata[k] = self._coerceRouteParameter(
@@ -0,0 +1,140 @@
+import os.path
+import sys
+import logging
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_INTERVAL = 0.005
+
+
+class StackSampler(object):
+    """ A low-overhead sampling profiler.
+
+        A background thread looks at the stacks of some threads at regular
+        intervals, and counts how many times each stack was seen. Only the
+        threads that have a tag are sampled, and their stacks are prefixed
+        with that tag (usually the type of job they're working on). Stacks
+        are stored in the "collapsed" format used by flamegraph tools.
+    """
+    def __init__(self, interval=DEFAULT_INTERVAL):
+        self.interval = interval
+        self.samples = {}
+        self._tags = {}
+        self._code_names = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+                target=self._run, name='StackSamplerThread')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+
+    def setThreadTag(self, tag, thread_id=None):
+        if thread_id is None:
+            thread_id = threading.get_ident()
+        if tag is not None:
+            self._tags[thread_id] = tag
+        else:
+            self._tags.pop(thread_id, None)
+
+    def addSamples(self, samples):
+        with self._lock:
+            for k, v in samples.items():
+                self.samples[k] = self.samples.get(k, 0) + v
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self._sample()
+
+    def _sample(self):
+        frames = sys._current_frames()
+        keys = []
+        for tid, tag in list(self._tags.items()):
+            frame = frames.get(tid)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                names.append(self._getCodeName(frame.f_code))
+                frame = frame.f_back
+            names.append(tag)
+            names.reverse()
+            keys.append(';'.join(names))
+        del frames
+
+        with self._lock:
+            for k in keys:
+                self.samples[k] = self.samples.get(k, 0) + 1
+
+    def _getCodeName(self, code):
+        name = self._code_names.get(code)
+        if name is None:
+            name = '%s (%s:%d)' % (
+                    code.co_name, os.path.basename(code.co_filename),
+                    code.co_firstlineno)
+            self._code_names[code] = name
+        return name
+
+
+_active_sampler = None
+
+
+def start_sampling(interval=DEFAULT_INTERVAL):
+    """ Starts sampling the current process. Threads need to be tagged
+        with `set_thread_tag` to be sampled.
+    """
+    global _active_sampler
+    if _active_sampler is not None:
+        raise Exception("Already sampling this process.")
+    _active_sampler = StackSampler(interval)
+    _active_sampler.start()
+    return _active_sampler
+
+
+def stop_sampling():
+    """ Stops sampling the current process, and returns the samples.
+    """
+    global _active_sampler
+    if _active_sampler is None:
+        return None
+    sampler = _active_sampler
+    _active_sampler = None
+    sampler.stop()
+    return sampler.samples
+
+
+def is_sampling():
+    return _active_sampler is not None
+
+
+def set_thread_tag(tag):
+    """ Sets the tag of the current thread, or stops sampling it if `tag`
+        is `None`. Does nothing if the process isn't being sampled.
+    """
+    if _active_sampler is not None:
+        _active_sampler.setThreadTag(tag)
+
+
+def add_samples(samples):
+    """ Merges samples from another process into the current samples.
+    """
+    if _active_sampler is not None and samples:
+        _active_sampler.addSamples(samples)
+
+
+def save_collapsed_stacks(path, samples):
+    with open(path, 'w', encoding='utf8') as fp:
+        for stack, count in sorted(samples.items()):
+            fp.write('%s %d\n' % (stack, count))
@@ -0,0 +1,124 @@
+PERCENTILES = [50, 90, 99]
+
+CACHES = [
+        ('page_repository', 'PagesRepo'),
+        ('rendered_segments_repository', 'RenderedSegmentsRepo')]
+
+
+def build_metrics_text(server_stats=None, loop_stats=None, sse_clients=0):
+    """ Returns the preview server's metrics in the Prometheus text
+        exposition format.
+    """
+    w = _MetricsWriter()
+
+    if server_stats is not None:
+        w.writeCounter(
+                'piecrust_serve_requests_total',
+                "Number of requests handled by the server.",
+                server_stats.counters['Requests'])
+        w.writeCounter(
+                'piecrust_serve_request_errors_total',
+                "Number of requests that ended in an error page.",
+                server_stats.counters['RequestErrors'])
+        _write_histogram_with_percentiles(
+                w, 'piecrust_serve_request_duration_seconds',
+                "Time spent handling requests.",
+                server_stats.histograms['RequestTime'])
+        _write_histogram_with_percentiles(
+                w, 'piecrust_serve_page_render_duration_seconds',
+                "Time spent rendering pages.",
+                server_stats.histograms['PageRenderTime'])
+
+        w.writeHeader('piecrust_serve_cache_hits_total', 'counter',
+                      "Number of cache hits while rendering pages.")
+        for cache, name in CACHES:
+            w.writeSample('piecrust_serve_cache_hits_total',
+                          server_stats.counters['%s_hit' % name],
+                          cache=cache)
+        w.writeHeader('piecrust_serve_cache_misses_total', 'counter',
+                      "Number of cache misses while rendering pages.")
+        for cache, name in CACHES:
+            w.writeSample('piecrust_serve_cache_misses_total',
+                          server_stats.counters['%s_miss' % name],
+                          cache=cache)
+        w.writeHeader('piecrust_serve_cache_hit_ratio', 'gauge',
+                      "Ratio of cache hits while rendering pages.")
+        for cache, name in CACHES:
+            hits = server_stats.counters['%s_hit' % name]
+            total = hits + server_stats.counters['%s_miss' % name]
+            w.writeSample('piecrust_serve_cache_hit_ratio',
+                          hits / total if total else 0,
+                          cache=cache)
+
+    if loop_stats is not None:
+        w.writeCounter(
+                'piecrust_pipeline_runs_total',
+                "Number of times the asset pipeline ran.",
+                loop_stats.counters['PipelineRuns'])
+        w.writeCounter(
+                'piecrust_pipeline_errors_total',
+                "Number of asset pipeline runs that failed.",
+                loop_stats.counters['PipelineErrors'])
+        _write_histogram_with_percentiles(
+                w, 'piecrust_pipeline_run_duration_seconds',
+                "Time spent running the asset pipeline.",
+                loop_stats.histograms['PipelineRunTime'])
+
+    w.writeHeader('piecrust_sse_clients', 'gauge',
+                  "Number of clients listening to pipeline status events.")
+    w.writeSample('piecrust_sse_clients', sse_clients)
+
+    return w.getText()
+
+
+def _write_histogram_with_percentiles(w, name, help_text, hist):
+    w.writeHistogram(name, help_text, hist)
+
+    # Prometheus can compute percentiles from the buckets, but it's handy
+    # to have them when looking at the metrics directly.
+    pname = name.replace('_seconds', '_percentile_seconds')
+    w.writeHeader(pname, 'gauge', "Estimated percentiles of %s" % name)
+    for p in PERCENTILES:
+        value = hist.getPercentile(p)
+        w.writeSample(pname, value if value is not None else 'NaN',
+                      percentile=str(p))
+
+
+class _MetricsWriter(object):
+    def __init__(self):
+        self._lines = []
+
+    def writeHeader(self, name, metric_type, help_text):
+        self._lines.append('# HELP %s %s' % (name, help_text))
+        self._lines.append('# TYPE %s %s' % (name, metric_type))
+
+    def writeSample(self, name, value, **labels):
+        if labels:
+            label_str = ','.join(
+                    '%s="%s"' % (k, v) for k, v in sorted(labels.items()))
+            name = '%s{%s}' % (name, label_str)
+        self._lines.append('%s %s' % (name, _format_value(value)))
+
+    def writeCounter(self, name, help_text, value):
+        self.writeHeader(name, 'counter', help_text)
+        self.writeSample(name, value)
+
+    def writeHistogram(self, name, help_text, hist):
+        self.writeHeader(name, 'histogram', help_text)
+        cumulative = 0
+        for bound, count in zip(hist.buckets, hist.counts):
+            cumulative += count
+            self.writeSample(name + '_bucket', cumulative,
+                             le=_format_value(bound))
+        self.writeSample(name + '_bucket', hist.count, le='+Inf')
+        self.writeSample(name + '_sum', hist.sum)
+        self.writeSample(name + '_count', hist.count)
+
+    def getText(self):
+        return '\n'.join(self._lines) + '\n'
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
@@ -7,6 +7,7 @@ from piecrust.data.builder import (
         DataBuildingContext, build_page_data)
 from piecrust.data.debug import build_var_debug_info
 from piecrust.routing import RouteNotFoundError
+from piecrust.serving.metrics import build_metrics_text
 from piecrust.serving.util import (
         make_wrapped_file_response, get_requested_page, get_app_for_server)
 from piecrust.sources.pageref import PageNotFoundError
@@ -41,15 +42,18 @@ class PieCrustDebugMiddleware(object):
     """ WSGI middleware that handles debugging of PieCrust stuff.
     """
     def __init__(self, app, appfactory,
-                 run_sse_check=None):
+                 run_sse_check=None, server=None):
         self.app = app
         self.appfactory = appfactory
         self.run_sse_check = run_sse_check
+        self.server = server
         self._proc_loop = None
         self._out_dir = os.path.join(
-                appfactory.root_dir, CACHE_DIR, appfactory.cache_key, 'server')
+                appfactory.root_dir, CACHE_DIR,
+                (appfactory.cache_key or 'default'), 'server')
         self._handlers = {
                 'debug_info': self._getDebugInfo,
+                'metrics': self._getMetrics,
                 'werkzeug_shutdown': self._shutdownWerkzeug,
                 'pipeline_status': self._startSSEProvider}
 
@@ -101,6 +105,21 @@ class PieCrustDebugMiddleware(object):
         response = Response(output, mimetype='text/html')
         return response(request.environ, start_response)
 
+    def _getMetrics(self, request, start_response):
+        server_stats = None
+        if self.server is not None:
+            server_stats = self.server.getStats()
+        loop_stats = None
+        sse_clients = 0
+        if self._proc_loop is not None:
+            loop_stats = self._proc_loop.getStats()
+            sse_clients = self._proc_loop.observer_count
+
+        output = build_metrics_text(server_stats, loop_stats, sse_clients)
+        response = Response(output, mimetype='text/plain')
+        response.headers['Cache-Control'] = 'no-cache'
+        return response(request.environ, start_response)
+
     def _shutdownWerkzeug(self, request, start_response):
         shutdown_func = request.environ.get('werkzeug.server.shutdown')
         if shutdown_func is None:
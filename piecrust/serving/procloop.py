@@ -6,8 +6,9 @@ import queue
 import logging
 import itertools
 import threading
-from piecrust import CONFIG_PATH, THEME_CONFIG_PATH
+from piecrust import CONFIG_PATH, THEME_CONFIG_PATH, sampling
 from piecrust.app import PieCrust
+from piecrust.environment import ExecutionStats
 from piecrust.processing.pipeline import ProcessorPipeline
 
 
@@ -91,6 +92,11 @@ class ProcessingLoop(threading.Thread):
         self._last_config_mtime = 0
         self._obs = []
         self._obs_lock = threading.Lock()
+        self._stats = ExecutionStats()
+        self._stats_lock = threading.Lock()
+        self._stats.registerHistogram('PipelineRunTime')
+        self._stats.registerCounter('PipelineRuns')
+        self._stats.registerCounter('PipelineErrors')
         config_name = (
                 THEME_CONFIG_PATH if appfactory.theme_site else CONFIG_PATH)
         self._config_path = os.path.join(appfactory.root_dir, config_name)
@@ -103,12 +109,27 @@ class ProcessingLoop(threading.Thread):
         with self._obs_lock:
             self._obs.remove(obs)
 
+    @property
+    def observer_count(self):
+        with self._obs_lock:
+            return len(self._obs)
+
+    def getStats(self):
+        stats = ExecutionStats()
+        with self._stats_lock:
+            stats.mergeStats(self._stats)
+        return stats
+
     def run(self):
         self._initPipeline()
 
         self._last_bake = time.time()
         self._last_config_mtime = os.path.getmtime(self._config_path)
-        self._record = self.pipeline.run()
+        sampling.set_thread_tag('ProcessingLoop')
+        try:
+            self._record = self._timedRun()
+        finally:
+            sampling.set_thread_tag(None)
 
         while True:
             cur_config_time = os.path.getmtime(self._config_path)
@@ -177,8 +198,9 @@ class ProcessingLoop(threading.Thread):
 
     def _runPipeline(self, root):
         self._last_bake = time.time()
+        sampling.set_thread_tag('ProcessingLoop')
         try:
-            self._record = self.pipeline.run(
+            self._record = self._timedRun(
                     root,
                     previous_record=self._record,
                     save_record=False)
@@ -214,6 +236,22 @@ class ProcessingLoop(threading.Thread):
                 self._notifyObservers(item)
         except Exception as ex:
             logger.exception(ex)
+        finally:
+            sampling.set_thread_tag(None)
+
+    def _timedRun(self, *args, **kwargs):
+        start_time = time.perf_counter()
+        record = None
+        try:
+            record = self.pipeline.run(*args, **kwargs)
+            return record
+        finally:
+            with self._stats_lock:
+                self._stats.observeHistogram(
+                        'PipelineRunTime', time.perf_counter() - start_time)
+                self._stats.stepCounter('PipelineRuns')
+                if record is None or not record.success:
+                    self._stats.stepCounter('PipelineErrors')
 
     def _notifyObservers(self, item):
         with self._obs_lock:
@@ -5,11 +5,13 @@ import time
 import os.path
 import hashlib
 import logging
+import threading
 from werkzeug.exceptions import (
         NotFound, MethodNotAllowed, InternalServerError, HTTPException)
 from werkzeug.wrappers import Request, Response
 from jinja2 import FileSystemLoader, Environment
-from piecrust import CACHE_DIR, RESOURCES_DIR
+from piecrust import CACHE_DIR, RESOURCES_DIR, sampling
+from piecrust.environment import ExecutionStats
 from piecrust.rendering import PageRenderingContext, render_page
 from piecrust.routing import RouteNotFoundError
 from piecrust.serving.util import (
@@ -79,20 +81,49 @@ class Server(object):
         self.root_url = root_url
         self.static_preview = static_preview
         self._page_record = ServeRecord()
-        self._out_dir = os.path.join(
+        self._cache_dir = os.path.join(
                 appfactory.root_dir,
                 CACHE_DIR,
-                (appfactory.cache_key or 'default'),
-                'server')
+                (appfactory.cache_key or 'default'))
+        self._out_dir = os.path.join(self._cache_dir, 'server')
+
+        # Requests run on several threads, so updating the stats needs
+        # to be done under a lock. Use `getStats` to read them.
+        self._stats = ExecutionStats()
+        self._stats_lock = threading.Lock()
+        self._stats.registerHistogram('RequestTime')
+        self._stats.registerHistogram('PageRenderTime')
+        for name in ['Requests', 'RequestErrors',
+                     'PagesRepo_hit', 'PagesRepo_miss',
+                     'RenderedSegmentsRepo_hit', 'RenderedSegmentsRepo_miss']:
+            self._stats.registerCounter(name)
+
+    def getStats(self):
+        stats = ExecutionStats()
+        with self._stats_lock:
+            stats.mergeStats(self._stats)
+        return stats
 
     def _run_request(self, environ, start_response):
+        sampling.set_thread_tag('ServeRequest')
+        start_time = time.perf_counter()
+        is_error = False
         try:
             response = self._try_run_request(environ)
             return response(environ, start_response)
         except Exception as ex:
+            is_error = True
             if self.appfactory.debug:
                 raise
             return self._handle_error(ex, environ, start_response)
+        finally:
+            with self._stats_lock:
+                self._stats.observeHistogram(
+                        'RequestTime', time.perf_counter() - start_time)
+                self._stats.stepCounter('Requests')
+                if is_error:
+                    self._stats.stepCounter('RequestErrors')
+            sampling.set_thread_tag(None)
 
     def _try_run_request(self, environ):
         request = Request(environ)
@@ -146,8 +177,11 @@ class Server(object):
         rel_req_path = request.path[offset:].replace('/', os.sep)
         if request.path.startswith('/_cache/'):
             # Some stuff needs to be served directly from the cache directory,
-            # like LESS CSS map files.
-            full_path = os.path.join(self.root_dir, rel_req_path)
+            # like LESS CSS map files. Their URLs are relative to the cache
+            # directory of the app we're serving.
+            full_path = os.path.join(
+                    self._cache_dir,
+                    request.path[len('/_cache/'):].replace('/', os.sep))
         else:
             full_path = os.path.join(self._out_dir, rel_req_path)
 
@@ -199,7 +233,9 @@ class Server(object):
             app.env.rendered_segments_repository.invalidate(cache_key)
 
         # Render the page.
+        render_start_time = time.perf_counter()
         rendered_page = render_page(render_ctx)
+        self._recordRenderStats(app, time.perf_counter() - render_start_time)
 
         # Remember stuff for next time.
         if entry is None:
@@ -267,6 +303,16 @@ class Server(object):
 
         return response
 
+    def _recordRenderStats(self, app, render_time):
+        repos = [
+                ('PagesRepo', app.env.page_repository),
+                ('RenderedSegmentsRepo', app.env.rendered_segments_repository)]
+        with self._stats_lock:
+            self._stats.observeHistogram('PageRenderTime', render_time)
+            for name, repo in repos:
+                self._stats.stepCounter('%s_hit' % name, repo._hits)
+                self._stats.stepCounter('%s_miss' % name, repo._misses)
+
     def _handle_error(self, exception, environ, start_response):
         code = 500
         if isinstance(exception, HTTPException):
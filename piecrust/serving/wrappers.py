@@ -101,9 +101,10 @@ def _get_piecrust_server(appfactory, run_sse_check=None):
     from piecrust.serving.middlewares import (
             StaticResourcesMiddleware, PieCrustDebugMiddleware)
     from piecrust.serving.server import WsgiServer
-    app = WsgiServer(appfactory)
-    app = StaticResourcesMiddleware(app)
+    server = WsgiServer(appfactory)
+    app = StaticResourcesMiddleware(server)
     app = PieCrustDebugMiddleware(
-            app, appfactory, run_sse_check=run_sse_check)
+            app, appfactory, run_sse_check=run_sse_check,
+            server=server.server)
     return app
 
@@ -3,10 +3,12 @@ import os
 import os.path
 import logging
 from piecrust.configuration import ConfigurationError
+from piecrust.data.iterators import sorted_top
 from piecrust.sources.base import (
         PageSource, PageFactory, InvalidFileSystemEndpointError)
 from piecrust.sources.default import (
         filter_page_dirname, filter_page_filename)
+from piecrust.sources.dirindex import DirectoryIndexMixin
 from piecrust.sources.interfaces import IListableSource
 from piecrust.sources.mixins import SimplePaginationSourceMixin
 
@@ -192,7 +194,7 @@ class AutoConfigSource(AutoConfigSourceBase):
         return os.path.basename(slug)
 
 
-class OrderedPageSource(AutoConfigSourceBase):
+class OrderedPageSource(AutoConfigSourceBase, DirectoryIndexMixin):
     """ A page source that assigns an "order" to its pages based on a
         numerical prefix in their filename. Page iterators will automatically
         sort pages using that order.
@@ -200,6 +202,7 @@ class OrderedPageSource(AutoConfigSourceBase):
     SOURCE_NAME = 'ordered'
 
     re_pattern = re.compile(r'(^|[/\\])(?P<num>\d+)_')
+    dir_index_name_pattern = re_pattern
 
     def __init__(self, app, name, config):
         config['capture_mode'] = 'path'
@@ -214,41 +217,25 @@ class OrderedPageSource(AutoConfigSourceBase):
         if uri_path == '':
             uri_path = '_index'
 
-        path = self.fs_endpoint_path
+        # Each part of the path can either be the name itself, or the name
+        # with a number prefix. The last part is the filename, which can
+        # also be missing its extension.
+        rel_dir = ''
         uri_parts = uri_path.split('/')
         for i, p in enumerate(uri_parts):
+            listing = self._getDirListing(rel_dir)
+            if listing is None:
+                return None
+
             if i == len(uri_parts) - 1:
-                # Last part, this is the filename. We need to check for either
-                # the name, or the name with the prefix, but also handle a
-                # possible extension.
-                p_pat = r'(\d+_)?' + re.escape(p)
-
-                _, ext = os.path.splitext(uri_path)
-                if ext == '':
-                    p_pat += r'\.[\w\d]+'
-
-                found = False
-                for name in os.listdir(path):
-                    if re.match(p_pat, name):
-                        path = os.path.join(path, name)
-                        found = True
-                        break
-                if not found:
-                    return None
+                name = listing.file_aliases.get(p)
             else:
-                # Find each sub-directory. It can either be a directory with
-                # the name itself, or the name with a number prefix.
-                p_pat = r'(\d+_)?' + re.escape(p)
-                found = False
-                for name in os.listdir(path):
-                    if re.match(p_pat, name):
-                        path = os.path.join(path, name)
-                        found = True
-                        break
-                if not found:
-                    return None
-
-        fac_path = os.path.relpath(path, self.fs_endpoint_path)
+                name = listing.dir_aliases.get(p)
+            if name is None:
+                return None
+            rel_dir = os.path.join(rel_dir, name)
+
+        fac_path = rel_dir.replace('\\', '/')
         config = self._extractConfigFragment(fac_path)
         metadata = {'slug': uri_path, 'config': config}
 
@@ -261,24 +248,26 @@ class OrderedPageSource(AutoConfigSourceBase):
 
     def listPath(self, rel_path):
         rel_path = rel_path.lstrip('/')
-        path = self.fs_endpoint_path
+        real_rel_dir = ''
+        listing = self._getDirListing(real_rel_dir)
         if rel_path != '':
             parts = rel_path.split('/')
             for p in parts:
-                p_pat = r'(\d+_)?' + re.escape(p) + '$'
-                for name in os.listdir(path):
-                    if re.match(p_pat, name):
-                        path = os.path.join(path, name)
-                        break
-                else:
+                name = None
+                if listing is not None:
+                    name = listing.dir_aliases.get(p)
+                if name is None:
                     raise Exception("No such path: %s" % rel_path)
+                real_rel_dir = os.path.join(real_rel_dir, name)
+                listing = self._getDirListing(real_rel_dir)
+        if listing is None:
+            raise Exception("No such path: %s" % rel_path)
 
         items = []
-        names = sorted(os.listdir(path))
-        for name in names:
+        for name in listing.names:
             clean_name = self.re_pattern.sub('', name)
             clean_name, _ = os.path.splitext(clean_name)
-            if os.path.isdir(os.path.join(path, name)):
+            if name in listing.dirs:
                 if filter_page_dirname(name):
                     rel_subdir = os.path.join(rel_path, name)
                     items.append((True, clean_name, rel_subdir))
@@ -332,6 +321,9 @@ class OrderTrailSortIterator(object):
     def __iter__(self):
         return iter(sorted(self.it, key=self._key_getter))
 
+    def getSortedTop(self, count):
+        return sorted_top(self.it, count, key=self._key_getter)
+
     def _key_getter(self, item):
         values = self.value_accessor(item, self.trail_name)
         key = ''.join(map(lambda v: str(v), values))
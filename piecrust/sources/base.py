@@ -1,6 +1,5 @@
 import copy
 import logging
-from werkzeug.utils import cached_property
 from piecrust.configuration import ConfigurationError
 from piecrust.page import Page
 
@@ -38,19 +37,23 @@ class InvalidFileSystemEndpointError(Exception):
 class PageFactory(object):
     """ A class responsible for creating a page.
     """
+    __slots__ = ['source', 'rel_path', 'metadata', '_path']
+
     def __init__(self, source, rel_path, metadata):
         self.source = source
         self.rel_path = rel_path
         self.metadata = metadata
+        self._path = None
 
-    @cached_property
+    @property
     def ref_spec(self):
         return '%s:%s' % (self.source.name, self.rel_path)
 
-    @cached_property
+    @property
     def path(self):
-        path, _ = self.source.resolveRef(self.rel_path)
-        return path
+        if self._path is None:
+            self._path, _ = self.source.resolveRef(self.rel_path)
+        return self._path
 
     def buildPage(self):
         repo = self.source.app.env.page_repository
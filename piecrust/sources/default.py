@@ -4,6 +4,7 @@ from piecrust import osutil
 from piecrust.sources.base import (
         PageFactory, PageSource, InvalidFileSystemEndpointError,
         MODE_CREATING)
+from piecrust.sources.dirindex import DirectoryIndexMixin
 from piecrust.sources.interfaces import (
         IListableSource, IPreparingSource, IInteractiveSource,
         InteractiveField)
@@ -25,7 +26,7 @@ def filter_page_filename(f):
 
 class DefaultPageSource(PageSource,
                         IListableSource, IPreparingSource, IInteractiveSource,
-                        SimplePaginationSourceMixin):
+                        SimplePaginationSourceMixin, DirectoryIndexMixin):
     SOURCE_NAME = 'default'
 
     def __init__(self, app, name, config):
@@ -92,15 +93,21 @@ class DefaultPageSource(PageSource,
             self._populateMetadata(rel_path, metadata, mode)
             return PageFactory(self, rel_path, metadata)
 
+        rel_dir, name = os.path.split(
+                os.path.relpath(path, self.fs_endpoint_path))
+        listing = self._getDirListing(rel_dir)
+        if listing is None:
+            return None
+
         if ext == '':
-            paths_to_check = [
-                    '%s.%s' % (path, e)
+            names_to_check = [
+                    '%s.%s' % (name, e)
                     for e in self.supported_extensions]
         else:
-            paths_to_check = [path]
-        for path in paths_to_check:
-            if os.path.isfile(path):
-                rel_path = os.path.relpath(path, self.fs_endpoint_path)
+            names_to_check = [name]
+        for name in names_to_check:
+            if name in listing.files:
+                rel_path = os.path.join(rel_dir, name)
                 rel_path = rel_path.replace('\\', '/')
                 self._populateMetadata(rel_path, metadata, mode)
                 return PageFactory(self, rel_path, metadata)
@@ -109,11 +116,12 @@ class DefaultPageSource(PageSource,
 
     def listPath(self, rel_path):
         rel_path = rel_path.lstrip('\\/')
-        path = os.path.join(self.fs_endpoint_path, rel_path)
-        names = sorted(osutil.listdir(path))
+        listing = self._getDirListing(rel_path)
+        if listing is None:
+            raise Exception("No such path: %s" % rel_path)
         items = []
-        for name in names:
-            if os.path.isdir(os.path.join(path, name)):
+        for name in listing.names:
+            if name in listing.dirs:
                 if filter_page_dirname(name):
                     rel_subdir = os.path.join(rel_path, name)
                     items.append((True, name, rel_subdir))
@@ -0,0 +1,122 @@
+import os
+import os.path
+import logging
+import threading
+from piecrust import osutil
+
+
+logger = logging.getLogger(__name__)
+
+
+class DirectoryListing(object):
+    """ The contents of a directory, along with lookup tables from the
+        "clean" names of its items (without any prefix matched by the given
+        pattern, and optionally without extension) to their real names.
+    """
+    def __init__(self, path, mtime, name_pattern=None):
+        self.mtime = mtime
+        self.names = sorted(osutil.listdir(path))
+        self.dirs = set()
+        self.files = set()
+        self.dir_aliases = {}
+        self.file_aliases = {}
+
+        for name in self.names:
+            if os.path.isdir(os.path.join(path, name)):
+                self.dirs.add(name)
+                self.dir_aliases[name] = name
+            else:
+                self.files.add(name)
+                self.file_aliases[name] = name
+
+        if name_pattern is None:
+            return
+
+        for name in self.names:
+            clean_name = name_pattern.sub('', name)
+            if name in self.dirs:
+                self.dir_aliases.setdefault(clean_name, name)
+            else:
+                stem, _ = os.path.splitext(name)
+                clean_stem, _ = os.path.splitext(clean_name)
+                self.file_aliases.setdefault(clean_name, name)
+                self.file_aliases.setdefault(stem, name)
+                self.file_aliases.setdefault(clean_stem, name)
+
+
+class DirectoryIndex(object):
+    """ A cache of directory listings under a source's file-system
+        endpoint. Listings are re-read when the modification time of their
+        directory changes.
+    """
+    def __init__(self, root_dir, name_pattern=None):
+        self.root_dir = root_dir
+        self.name_pattern = name_pattern
+        self._listings = {}
+        self._lock = threading.Lock()
+
+    def getListing(self, rel_dir, check_mtime=True):
+        """ Returns the listing of the given directory, or `None` if it
+            doesn't exist. If `check_mtime` is `False`, a cached listing is
+            returned without touching the file-system.
+        """
+        rel_dir = os.path.normpath(rel_dir)
+        listing = self._listings.get(rel_dir)
+        if listing is not None and not check_mtime:
+            return listing
+
+        path = os.path.join(self.root_dir, rel_dir)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            with self._lock:
+                self._listings.pop(rel_dir, None)
+            return None
+
+        if listing is None or listing.mtime != mtime:
+            logger.debug("Indexing directory: %s" % path)
+            if not os.path.isdir(path):
+                return None
+            listing = DirectoryListing(path, mtime, self.name_pattern)
+            with self._lock:
+                self._listings[rel_dir] = listing
+        return listing
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_directory_index(root_dir, name_pattern=None):
+    """ Returns the directory index for the given directory. Indexes are
+        shared by all the applications of the current process, so that the
+        preview server doesn't have to list directories on each request.
+    """
+    key = (root_dir, name_pattern)
+    with _indexes_lock:
+        idx = _indexes.get(key)
+        if idx is None:
+            idx = DirectoryIndex(root_dir, name_pattern)
+            _indexes[key] = idx
+        return idx
+
+
+class DirectoryIndexMixin(object):
+    """ Gives a source access to the index of its file-system endpoint.
+        The modification time of a directory is only checked the first time
+        the source looks at it, since a source is only used for one bake
+        or one request.
+    """
+    dir_index_name_pattern = None
+
+    def _getDirListing(self, rel_dir):
+        checked = getattr(self, '_dir_index_checked', None)
+        if checked is None:
+            checked = set()
+            self._dir_index_checked = checked
+            self._dir_index = get_directory_index(
+                    self.fs_endpoint_path, self.dir_index_name_pattern)
+
+        check_mtime = rel_dir not in checked
+        checked.add(rel_dir)
+        return self._dir_index.getListing(rel_dir, check_mtime=check_mtime)
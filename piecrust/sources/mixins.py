@@ -2,6 +2,7 @@ import os
 import os.path
 import logging
 from piecrust.data.filters import PaginationFilter, page_value_accessor
+from piecrust.data.iterators import sorted_top
 from piecrust.data.paginationdata import PaginationData
 from piecrust.sources.base import PageFactory
 from piecrust.sources.interfaces import IPaginationSource, IListableSource
@@ -57,7 +58,15 @@ class DateSortIterator(object):
 
     def __iter__(self):
         return iter(sorted(self.it,
-                           key=lambda x: x.datetime, reverse=self.reverse))
+                           key=_get_page_datetime, reverse=self.reverse))
+
+    def getSortedTop(self, count):
+        return sorted_top(self.it, count, key=_get_page_datetime,
+                          reverse=self.reverse)
+
+
+def _get_page_datetime(page):
+    return page.datetime
 
 
 class PaginationDataBuilderIterator(object):
@@ -1,7 +1,11 @@
+import os.path
 import logging
 import collections.abc
+import repoze.lru
 import pystache
 import pystache.common
+import pystache.parser
+import pystache.renderengine
 from piecrust.templating.base import (
         TemplateEngine, TemplateNotFoundError, TemplatingError)
 
@@ -38,6 +42,7 @@ class PystacheTemplateEngine(TemplateEngine):
             name = p[:-9]  # strip `.mustache`
             try:
                 tpl = self.renderer.load_template(name)
+                break
             except Exception as ex:
                 logger.debug("Mustache error: %s" % ex)
                 pass
@@ -62,20 +67,81 @@ _knowns = ['PieCrustData', 'LazyPageConfigData', 'Paginator', 'Assetor',
            'PageLinkerData']
 
 
+class _CachingRenderEngine(pystache.renderengine.RenderEngine):
+    """ A render engine that doesn't re-parse templates it has already seen.
+        This is used for page contents, layouts, partials, and sections
+        alike, since Pystache renders all of them from strings.
+    """
+    parse_cache = None
+
+    def render(self, template, context_stack, delimiters=None):
+        key = (template, delimiters)
+        parsed = self.parse_cache.get(key)
+        if parsed is None:
+            parsed = pystache.parser.parse(template, delimiters)
+            self.parse_cache.put(key, parsed)
+        return parsed.render(self, context_stack)
+
+
 class _WorkaroundRenderer(pystache.Renderer):
+    def __init__(self, *args, parse_cache_size=1024, **kwargs):
+        super(_WorkaroundRenderer, self).__init__(*args, **kwargs)
+        self.parse_cache = repoze.lru.LRUCache(parse_cache_size)
+        self._sources = {}
+        self._wrap_types = {}
+
+    def load_template(self, template_name):
+        # Only re-read template files when they've changed.
+        for d in self.search_dirs:
+            path = os.path.join(d, template_name + '.' + self.file_extension)
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                continue
+
+            entry = self._sources.get(path)
+            if entry is None or entry[0] != mtime:
+                source = self._make_loader().read(path)
+                entry = (mtime, source)
+                self._sources[path] = entry
+            return entry[1]
+
+        raise pystache.common.TemplateNotFoundError(
+                "File '%s' not found in dirs: %s" %
+                (template_name, self.search_dirs))
+
+    def _make_load_partial(self):
+        if self.partials is None:
+            return self.load_template
+        return super(_WorkaroundRenderer, self)._make_load_partial()
+
+    def _make_render_engine(self):
+        # Swap the class instead of creating the engine ourselves, since its
+        # constructor isn't the same in all versions of Pystache.
+        engine = super(_WorkaroundRenderer, self)._make_render_engine()
+        engine.__class__ = _CachingRenderEngine
+        engine.parse_cache = self.parse_cache
+        return engine
+
     def _make_resolve_context(self):
         mrc = super(_WorkaroundRenderer, self)._make_resolve_context()
+        wrap_types = self._wrap_types
 
         def _workaround(stack, name):
             # Pystache will treat anything that's not a string or a dict as
             # a list. This is just plain wrong, but it will take a while before
             # the project can get patches on Pypi.
             res = mrc(stack, name)
-            if res is not None and (
-                    res.__class__.__name__ in _knowns or
-                    isinstance(res, collections.abc.Mapping)):
+            if res is None:
+                return res
+            cls = res.__class__
+            wrap = wrap_types.get(cls)
+            if wrap is None:
+                wrap = (cls.__name__ in _knowns or
+                        issubclass(cls, collections.abc.Mapping))
+                wrap_types[cls] = wrap
+            if wrap:
                 res = [res]
             return res
 
         return _workaround
-
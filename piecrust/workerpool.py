@@ -8,7 +8,8 @@ import logging
 import itertools
 import threading
 import multiprocessing
-from piecrust import fastpickle
+from piecrust import fastpickle, sampling
+from piecrust.environment import ExecutionStats
 
 
 logger = logging.getLogger(__name__)
@@ -17,12 +18,29 @@ use_fastqueue = True
 
 
 class IWorker(object):
+    @classmethod
+    def preload(cls, *initargs):
+        """ Called once, before the workers are forked, when using the
+            'template' start method. Anything loaded here is shared by
+            all the workers.
+        """
+        pass
+
     def initialize(self):
         raise NotImplementedError()
 
     def process(self, job):
         raise NotImplementedError()
 
+    def updateContext(self, version, data):
+        """ Called when the pool broadcasts some shared state to all the
+            workers, before any job queued after that.
+        """
+        pass
+
+    def getJobTag(self, job):
+        return type(self).__name__
+
     def getReport(self, pool_reports):
         return None
 
@@ -33,33 +51,113 @@ class IWorker(object):
 TASK_JOB = 0
 TASK_BATCH = 1
 TASK_END = 2
+TASK_CONTEXT = 3
+
+# Largest batch of jobs sent at once when jobs are streamed to the pool.
+MAX_STREAM_CHUNK_SIZE = 64
+
+# How long, in seconds, a worker waits for the others to get a new context.
+CONTEXT_BARRIER_TIMEOUT = 60
+
+
+# Worker start methods, on top of the ones from `multiprocessing`.
+START_METHOD_DEFAULT = 'default'
+START_METHOD_TEMPLATE = 'template'
 
 
 def worker_func(params):
     if params.is_profiling:
-        try:
-            import cProfile as profile
-        except ImportError:
-            import profile
-
-        params.is_profiling = False
-        name = params.worker_class.__name__
-        profile.runctx('_real_worker_func(params)',
-                       globals(), locals(),
-                       filename='%s-%d.prof' % (name, params.wid))
-    else:
+        # Don't use any sampler inherited from the parent process.
+        sampling._active_sampler = None
+        sampling.start_sampling()
+    try:
         _real_worker_func(params)
+    finally:
+        sampling.stop_sampling()
 
 
-def _real_worker_func(params):
+def template_func(params_list):
+    """ Runs a "template" process that loads and warms up everything the
+        workers need, and then forks them. The workers start faster, and
+        share the memory pages of everything that was loaded here, until
+        they write to them.
+    """
+    _ensure_logging_setup()
+
+    first_params = params_list[0]
+    try:
+        first_params.worker_class.preload(*first_params.initargs)
+    except Exception as ex:
+        logger.error("Failed to preload workers:")
+        logger.exception(ex)
+
+    pids = []
+    for params in params_list:
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                worker_func(params)
+            except BaseException as ex:
+                logger.exception(ex)
+                exit_code = 1
+            finally:
+                logging.shutdown()
+                os._exit(exit_code)
+        pids.append(pid)
+
+    for pid in pids:
+        os.waitpid(pid, 0)
+
+
+_is_logging_setup = False
+
+
+def _ensure_logging_setup():
     # In a context where `multiprocessing` is using the `spawn` forking model,
     # the new process doesn't inherit anything, so we lost all our logging
-    # configuration here. Let's set it up again.
+    # configuration here. Let's set it up again... but only once, since
+    # workers forked from a template process inherit it.
+    global _is_logging_setup
+    if _is_logging_setup:
+        return
+    _is_logging_setup = True
     if (hasattr(multiprocessing, 'get_start_method') and
             multiprocessing.get_start_method() == 'spawn'):
         from piecrust.main import _pre_parse_chef_args
         _pre_parse_chef_args(sys.argv[1:])
 
+
+def _get_memory_usage():
+    """ Returns the peak resident set size of the current process, and
+        how much of its memory isn't shared with other processes, in
+        kilobytes, when we can figure those out.
+    """
+    res = {}
+    try:
+        import resource
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform == 'darwin':
+            max_rss //= 1024
+        res['PeakRSS_KB'] = max_rss
+    except ImportError:
+        pass
+
+    try:
+        with open('/proc/self/smaps_rollup', 'r') as fp:
+            private = 0
+            for line in fp:
+                if line.startswith('Private_'):
+                    private += int(line.split()[1])
+            res['PrivateMemory_KB'] = private
+    except (OSError, ValueError, IndexError):
+        pass
+    return res
+
+
+def _real_worker_func(params):
+    _ensure_logging_setup()
+
     wid = params.wid
     logger.debug("Worker %d initializing..." % wid)
 
@@ -70,13 +168,18 @@ def _real_worker_func(params):
     # Initialize the underlying worker class.
     w = params.worker_class(*params.initargs)
     w.wid = wid
+    sampling.set_thread_tag('%s.initialize' % type(w).__name__)
     try:
         w.initialize()
     except Exception as ex:
         logger.error("Working failed to initialize:")
         logger.exception(ex)
         params.outqueue.put(None)
+        # Don't let the other workers wait for us when getting a context.
+        params.context_barrier.abort()
         return
+    finally:
+        sampling.set_thread_tag(None)
 
     use_threads = False
     if use_threads:
@@ -104,21 +207,65 @@ def _real_worker_func(params):
 
     # Start pumping!
     completed = 0
+    context_error = None
     time_in_get = 0
     time_in_put = 0
+    time_to_first_job = None
     while True:
         get_start_time = time.perf_counter()
         task = get()
         time_in_get += (time.perf_counter() - get_start_time)
 
         task_type, task_data = task
+        if (time_to_first_job is None and
+                (task_type == TASK_JOB or task_type == TASK_BATCH)):
+            time_to_first_job = time.time() - params.pool_start_time
+
+        if task_type == TASK_CONTEXT:
+            # Every worker gets its own copy of the context task. Wait for
+            # the others to get theirs, so we don't steal one of them.
+            version, data = task_data
+            logger.debug("Worker %d got context version %d." %
+                         (wid, version))
+            try:
+                w.updateContext(version, data)
+                context_error = None
+            except Exception as ex:
+                logger.error("Worker %d failed to update its context: %s" %
+                             (wid, ex))
+                # Fail all the jobs until we get a good context, since we
+                # would be running them with a stale one.
+                context_error = ("Worker %d failed to update its context "
+                                 "to version %d: %s" % (wid, version, ex))
+            try:
+                params.context_barrier.wait(CONTEXT_BARRIER_TIMEOUT)
+            except threading.BrokenBarrierError:
+                logger.error("Worker %d can't wait for the other workers "
+                             "to get their context." % wid)
+                # We may have taken another worker's copy of the context,
+                # or another worker may have taken ours, so we can't know
+                # if we're running jobs with the latest one.
+                if context_error is None:
+                    context_error = (
+                            "Worker %d couldn't synchronize context "
+                            "version %d with the other workers." %
+                            (wid, version))
+            continue
+
         if task_type == TASK_END:
             logger.debug("Worker %d got end task, exiting." % wid)
-            wprep = {
-                    'WorkerTaskGet': time_in_get,
-                    'WorkerResultPut': time_in_put}
+            wprep = ExecutionStats()
+            wprep.timers['WorkerTaskGet'] = time_in_get
+            wprep.timers['WorkerResultPut'] = time_in_put
+            name = '%s_%d' % (type(w).__name__, wid)
+            if time_to_first_job is not None:
+                wprep.timers['%s_TimeToFirstJob' % name] = time_to_first_job
+            for k, v in _get_memory_usage().items():
+                wprep.counters['%s_%s' % (name, k)] = v
             try:
-                rep = (task_type, True, wid, (wid, w.getReport(wprep)))
+                rep = w.getReport(wprep)
+                samples = sampling.stop_sampling()
+                rep = (task_type, True, wid, (wid, rep, samples))
             except Exception as e:
                 logger.debug("Error getting report: %s" % e)
                 if params.wrap_exception:
@@ -132,13 +279,20 @@ def _real_worker_func(params):
             task_data = (task_data,)
 
         for t in task_data:
-            try:
-                res = (TASK_JOB, True, wid, w.process(t))
-            except Exception as e:
-                if params.wrap_exception:
-                    e = multiprocessing.ExceptionWithTraceback(
-                            e, e.__traceback__)
-                res = (TASK_JOB, False, wid, e)
+            if params.is_profiling:
+                sampling.set_thread_tag(w.getJobTag(t))
+            if context_error is not None:
+                res = (TASK_JOB, False, wid, context_error)
+            else:
+                try:
+                    res = (TASK_JOB, True, wid, w.process(t))
+                except Exception as e:
+                    if params.wrap_exception:
+                        e = multiprocessing.ExceptionWithTraceback(
+                                e, e.__traceback__)
+                    res = (TASK_JOB, False, wid, e)
+            if params.is_profiling:
+                sampling.set_thread_tag(None)
 
             put_start_time = time.perf_counter()
             put(res)
@@ -188,7 +342,8 @@ def _job_results_writer(in_queue, putter):
 
 class _WorkerParams(object):
     def __init__(self, wid, inqueue, outqueue, worker_class, initargs=(),
-                 wrap_exception=False, is_profiling=False):
+                 wrap_exception=False, is_profiling=False,
+                 pool_start_time=0, context_barrier=None):
         self.wid = wid
         self.inqueue = inqueue
         self.outqueue = outqueue
@@ -196,13 +351,24 @@ class _WorkerParams(object):
         self.initargs = initargs
         self.wrap_exception = wrap_exception
         self.is_profiling = is_profiling
+        self.pool_start_time = pool_start_time
+        self.context_barrier = context_barrier
 
 
 class WorkerPool(object):
     def __init__(self, worker_class, initargs=(),
                  worker_count=None, batch_size=None,
-                 wrap_exception=False):
+                 wrap_exception=False, start_method=None):
         worker_count = worker_count or os.cpu_count() or 1
+        pool_start_time = time.time()
+
+        start_method = start_method or START_METHOD_DEFAULT
+        if start_method not in [START_METHOD_DEFAULT, START_METHOD_TEMPLATE]:
+            raise Exception("Unknown worker start method: %s" % start_method)
+        if start_method == START_METHOD_TEMPLATE and not hasattr(os, 'fork'):
+            logger.warning("Can't start workers from a template process on "
+                           "this platform, starting them normally.")
+            start_method = START_METHOD_DEFAULT
 
         if use_fastqueue:
             self._task_queue = FastQueue()
@@ -216,27 +382,46 @@ class WorkerPool(object):
             self._quick_get = self._result_queue._reader.recv
 
         self._batch_size = batch_size
+        self._context_version = 0
         self._callback = None
         self._error_callback = None
         self._listener = None
 
-        main_module = sys.modules['__main__']
-        is_profiling = os.path.basename(main_module.__file__) in [
-                'profile.py', 'cProfile.py']
+        # Profile the workers if we're profiling this process.
+        is_profiling = sampling.is_sampling()
 
-        self._pool = []
-        for i in range(worker_count):
-            worker_params = _WorkerParams(
+        context_barrier = multiprocessing.Barrier(worker_count)
+        self._context_barrier = context_barrier
+
+        params_list = [
+                _WorkerParams(
                     i, self._task_queue, self._result_queue,
                     worker_class, initargs,
                     wrap_exception=wrap_exception,
-                    is_profiling=is_profiling)
-            w = multiprocessing.Process(target=worker_func,
-                                        args=(worker_params,))
-            w.name = w.name.replace('Process', 'PoolWorker')
+                    is_profiling=is_profiling,
+                    pool_start_time=pool_start_time,
+                    context_barrier=context_barrier)
+                for i in range(worker_count)]
+
+        self._worker_count = worker_count
+        self._pool = []
+        if start_method == START_METHOD_TEMPLATE:
+            # Only one process for us to watch, which will fork all the
+            # workers.
+            w = multiprocessing.Process(target=template_func,
+                                        args=(params_list,))
+            w.name = w.name.replace('Process', 'PoolTemplate')
             w.daemon = True
             w.start()
             self._pool.append(w)
+        else:
+            for worker_params in params_list:
+                w = multiprocessing.Process(target=worker_func,
+                                            args=(worker_params,))
+                w.name = w.name.replace('Process', 'PoolWorker')
+                w.daemon = True
+                w.start()
+                self._pool.append(w)
 
         self._result_handler = threading.Thread(
                 target=WorkerPool._handleResults,
@@ -250,6 +435,32 @@ class WorkerPool(object):
         self._callback = callback
         self._error_callback = error_callback
 
+    def broadcastContext(self, data):
+        """ Sends some shared state to all the workers, so that jobs don't
+            need to carry it. Workers get it before any job queued after
+            this call. Returns the new context version.
+        """
+        if self._closed:
+            raise Exception("This worker pool has been closed.")
+        if self._listener is not None:
+            raise Exception("Can't broadcast a context while jobs are "
+                            "running.")
+
+        if any([not p.is_alive() for p in self._pool]):
+            raise Exception("Some workers have prematurely exited.")
+
+        if self._context_barrier.broken:
+            # Without the barrier, a worker could get two copies of the new
+            # context while another one gets none.
+            raise Exception("Workers failed to synchronize a previous "
+                            "context, can't broadcast a new one.")
+
+        self._context_version += 1
+        task = (TASK_CONTEXT, (self._context_version, data))
+        for i in range(self._worker_count):
+            self._quick_put(task)
+        return self._context_version
+
     def queueJobs(self, jobs, handler=None, chunk_size=None):
         if self._closed:
             raise Exception("This worker pool has been closed.")
@@ -263,7 +474,7 @@ class WorkerPool(object):
             self.setHandler(handler)
 
         if not hasattr(jobs, '__len__'):
-            jobs = list(jobs)
+            return self._queueJobStream(jobs, chunk_size)
         job_count = len(jobs)
 
         res = AsyncResult(self, job_count)
@@ -292,14 +503,43 @@ class WorkerPool(object):
 
         return res
 
+    def _queueJobStream(self, jobs, chunk_size):
+        # We don't know how many jobs we'll get, so hold an extra count on
+        # the result until we've gone through all of them. Jobs are sent as
+        # soon as we get them, in growing batches, so that workers can start
+        # early without paying for sending a lot of tiny batches.
+        res = AsyncResult(self, 1)
+        self._listener = res
+
+        fixed_chunk_size = chunk_size or self._batch_size
+        cur_chunk_size = fixed_chunk_size or 1
+        it = iter(jobs)
+        try:
+            while True:
+                batch = tuple(itertools.islice(it, cur_chunk_size))
+                if not batch:
+                    break
+                res._addTasks(len(batch))
+                if len(batch) == 1:
+                    self._quick_put((TASK_JOB, batch[0]))
+                else:
+                    self._quick_put((TASK_BATCH, batch))
+                if fixed_chunk_size is None:
+                    cur_chunk_size = min(cur_chunk_size * 2,
+                                         MAX_STREAM_CHUNK_SIZE)
+        finally:
+            res._onTaskDone()
+
+        return res
+
     def close(self):
         if self._listener is not None:
             raise Exception("A previous job queue has not finished yet.")
 
         logger.debug("Closing worker pool...")
-        handler = _ReportHandler(len(self._pool))
+        handler = _ReportHandler(self._worker_count)
         self._callback = handler._handle
-        for w in self._pool:
+        for i in range(self._worker_count):
             self._quick_put((TASK_END, None))
         for w in self._pool:
             w.join()
@@ -320,6 +560,7 @@ class WorkerPool(object):
 
     @staticmethod
     def _handleResults(pool):
+        sampling.set_thread_tag('ResultHandler')
         while True:
             try:
                 res = pool._quick_get()
@@ -330,6 +571,7 @@ class WorkerPool(object):
 
             if res is None:
                 logger.debug("Result handler exiting.")
+                sampling.set_thread_tag(None)
                 break
 
             task_type, success, wid, data = res
@@ -353,6 +595,7 @@ class AsyncResult(object):
     def __init__(self, pool, count):
         self._pool = pool
         self._count = count
+        self._lock = threading.Lock()
         self._event = threading.Event()
 
     def ready(self):
@@ -361,9 +604,15 @@ class AsyncResult(object):
     def wait(self, timeout=None):
         return self._event.wait(timeout)
 
+    def _addTasks(self, count):
+        with self._lock:
+            self._count += count
+
     def _onTaskDone(self):
-        self._count -= 1
-        if self._count == 0:
+        with self._lock:
+            self._count -= 1
+            is_done = (self._count == 0)
+        if is_done:
             self._pool.setHandler(None)
             self._pool._listener = None
             self._event.set()
@@ -380,13 +629,14 @@ class _ReportHandler(object):
         return self._event.wait(timeout)
 
     def _handle(self, res):
-        wid, data = res
+        wid, data, samples = res
         if wid < 0 or wid > self._count:
             logger.error("Ignoring report from unknown worker %d." % wid)
             return
 
         self._received += 1
         self.reports[wid] = data
+        sampling.add_samples(samples)
 
         if self._received == self._count:
             self._event.set()
@@ -1,4 +1,6 @@
+import os
 import yaml
+from piecrust.app import PieCrustFactory, PieCrustSnapshot
 from piecrust.appconfig import PieCrustConfiguration
 from .mockutil import mock_fs, mock_fs_scope
 
@@ -82,3 +84,32 @@ def test_config_site_add_source_in_both_site_and_theme():
         assert list(app.config.get('site/sources').keys()) == [
             'theme_pages', 'theme_notes', 'pages', 'posts', 'notes']
 
+
+def test_app_snapshot():
+    fs = (mock_fs()
+          .withConfig({'site': {'title': "Snapshot"}})
+          .withDir('kitchen/templates'))
+    with mock_fs_scope(fs):
+        app = fs.getApp()
+        app.config.set('baker/workers', 2)
+        snapshot = PieCrustSnapshot(app)
+
+        # The workers don't need to re-load the configuration.
+        os.remove(fs.path('kitchen/config.yml'))
+
+        appfactory = PieCrustFactory(fs.path('kitchen'), snapshot=snapshot)
+        app1 = appfactory.create()
+        assert app1.config.get('site/title') == "Snapshot"
+        assert app1.config.get('baker/workers') == 2
+        assert app1.theme_dir == app.theme_dir
+        assert app1.templates_dirs == app.templates_dirs
+        assert [r.uri_pattern for r in app1.routes] == \
+            [r.uri_pattern for r in app.routes]
+        assert [s.name for s in app1.sources] == \
+            [s.name for s in app.sources]
+
+        # Each app gets its own copy of the configuration.
+        app1.config.set('site/title', "Changed")
+        app2 = appfactory.create()
+        assert app2.config.get('site/title') == "Snapshot"
+        assert app.config.get('site/title') == "Snapshot"
@@ -79,6 +79,25 @@ def test_removed():
                 'index.html': 'something'}
 
 
+def test_output_write_errors():
+    fs = (mock_fs()
+            .withConfig()
+            .withPage('pages/foo.md', {'layout': 'none', 'format': 'none'},
+                      'a foo page'))
+    with mock_fs_scope(fs):
+        out_dir = fs.path('kitchen/_counter')
+        # Put a directory where the page should go, so it can't be written.
+        os.makedirs(os.path.join(out_dir, 'foo.html'))
+        app = fs.getApp()
+        app.config.set('baker/workers', 1)
+        baker = Baker(app, out_dir)
+        record = baker.bake()
+        assert not record.success
+        entry = [e for e in record.entries if e.path.endswith('foo.md')][0]
+        assert entry.has_any_error
+        assert entry.subs[0].errors[0].startswith("Error writing output: ")
+
+
 def test_record_version_change():
     fs = (mock_fs()
             .withConfig()
@@ -105,3 +124,169 @@ def test_record_version_change():
         finally:
             BakeRecord.RECORD_VERSION -= 1
 
+
+def test_record_entries_are_compact():
+    fs = (mock_fs()
+            .withConfig()
+            .withPage('pages/foo.md', {'layout': 'none', 'format': 'none'},
+                      'a foo page')
+            .withPage('pages/bar.md', {'layout': 'none', 'format': 'none'},
+                      'a bar page'))
+    with mock_fs_scope(fs):
+        out_dir = fs.path('kitchen/_counter')
+        app = fs.getApp()
+        baker = Baker(app, out_dir)
+        record = baker.bake()
+        for e in record.entries:
+            assert not hasattr(e, '__dict__')
+            assert not hasattr(e.subs[0], '__dict__')
+        entries = {os.path.basename(e.path): e for e in record.entries}
+        foo, bar = entries['foo.md'], entries['bar.md']
+        assert foo.config['layout'] is bar.config['layout']
+
+        rec_path = fs.path('kitchen/_counter/record')
+        record.save(rec_path)
+        loaded = BakeRecord.load(rec_path)
+        loaded_foo = [e for e in loaded.entries if e.path == foo.path][0]
+        assert loaded_foo.config == foo.config
+        assert loaded_foo.subs[0].out_uri == foo.subs[0].out_uri
+        assert loaded_foo.subs[0].render_info == foo.subs[0].render_info
+
+
+def test_skip_identical_outputs():
+    fs = (mock_fs()
+            .withConfig({'baker': {'skip_identical_outputs': True}})
+            .withPage('pages/foo.md', {'layout': 'none', 'format': 'none'}, 'a foo page')
+            .withPage('pages/_index.md', {'layout': 'none', 'format': 'none'}, "something"))
+    with mock_fs_scope(fs):
+        out_dir = fs.path('kitchen/_counter')
+        app = fs.getApp()
+        app.config.set('baker/workers', 1)
+        baker = Baker(app, out_dir)
+        record = baker.bake()
+        counters = record.stats['_Total'].counters
+        assert counters['OutputsWritten'] == 2
+        assert counters['OutputsSkipped'] == 0
+
+        app = fs.getApp()
+        app.config.set('baker/workers', 1)
+        baker = Baker(app, out_dir, force=True)
+        record = baker.bake()
+        counters = record.stats['_Total'].counters
+        assert counters['OutputsWritten'] == 0
+        assert counters['OutputsSkipped'] == 2
+        structure = fs.getStructure('kitchen/_counter')
+        assert structure == {
+                'foo.html': 'a foo page',
+                'index.html': 'something'}
+
+
+def test_bake_trace():
+    fs = (mock_fs()
+            .withConfig()
+            .withPage('pages/foo.md', {'layout': 'none', 'format': 'none'}, 'a foo page')
+            .withPage('pages/_index.md', {'layout': 'none', 'format': 'none'}, "something"))
+    with mock_fs_scope(fs):
+        out_dir = fs.path('kitchen/_counter')
+        app = fs.getApp()
+        app.config.set('baker/workers', 1)
+        baker = Baker(app, out_dir, trace=True)
+        record = baker.bake()
+
+        spans = [e for e in baker.trace_events if e['ph'] == 'X']
+        page_spans = [e for e in spans if e['name'] == 'PageRender']
+        assert sorted([e['args']['uri'] for e in page_spans]) == [
+                '/', '/foo.html']
+        job_spans = [e for e in spans if e['name'] == 'BakeJobHandler']
+        assert len(job_spans) == 2
+        assert all(e['tid'] == 0 for e in spans)
+        page_span = page_spans[0]
+        job_span = [e for e in job_spans
+                    if e['ts'] <= page_span['ts'] and
+                    e['ts'] + e['dur'] >= page_span['ts'] + page_span['dur']]
+        assert len(job_span) == 1
+
+        # The trace is not saved in the bake record, but the slowest pages
+        # are.
+        assert record.stats['_Total'].trace_events is None
+        slowest = [os.path.relpath(p, fs.path('kitchen'))
+                   for p, _, _ in record.slowest_pages]
+        assert 'pages/foo.md' in slowest
+        assert 'pages/_index.md' in slowest
+        durations = [d for _, _, d in record.slowest_pages]
+        assert durations == sorted(durations, reverse=True)
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="Needs `os.fork`.")
+def test_bake_with_template_worker_start():
+    fs = (mock_fs()
+            .withConfig({'baker': {'worker_start_method': 'template'}})
+            .withPage('pages/foo.md', {'layout': 'none', 'format': 'none'}, 'a foo page')
+            .withPage('pages/_index.md', {'layout': 'none', 'format': 'none'}, "something"))
+    with mock_fs_scope(fs):
+        out_dir = fs.path('kitchen/_counter')
+        app = fs.getApp()
+        app.config.set('baker/workers', 2)
+        baker = Baker(app, out_dir)
+        record = baker.bake()
+        assert record.success
+        structure = fs.getStructure('kitchen/_counter')
+        assert structure == {
+                'foo.html': 'a foo page',
+                'index.html': 'something'}
+
+        stats = record.stats['_Total']
+        assert 'BakeWorker_0_TimeToFirstJob' in stats.timers
+        assert stats.counters.get('BakeWorker_0_PeakRSS_KB', 0) > 0
+
+
+def test_bake_page_assets_incrementally():
+    fs = (mock_fs()
+            .withConfig({'site': {'pretty_urls': True},
+                         'baker': {'skip_identical_outputs': True}})
+            .withPage('pages/foo.md', {'layout': 'none', 'format': 'none'},
+                      "Foo: {{assets.one}}")
+            .withPageAsset('pages/foo.md', 'one.txt', 'one'))
+    with mock_fs_scope(fs):
+        out_dir = fs.path('kitchen/_counter')
+
+        def _bake():
+            app = fs.getApp()
+            app.config.set('baker/workers', 1)
+            baker = Baker(app, out_dir)
+            record = baker.bake()
+            entry = [e for e in record.entries
+                     if e.path.endswith('foo.md')][0]
+            return entry.subs[0]
+
+        sub = _bake()
+        assert sub.was_baked
+        assert list(sub.assets.values()) == ['copy']
+        assert fs.getStructure('kitchen/_counter/foo') == {
+                'index.html': 'Foo: /foo/one.txt',
+                'one.txt': 'one'}
+
+        # Touch the page so it gets re-baked, but the asset didn't change
+        # so it shouldn't be copied again.
+        time.sleep(0.01)
+        page_path = fs.path('kitchen/pages/foo.md')
+        os.utime(page_path, None)
+        sub = _bake()
+        assert sub.was_baked
+        assert list(sub.assets.values()) == ['skipped']
+        assert fs.getStructure('kitchen/_counter/foo') == {
+                'index.html': 'Foo: /foo/one.txt',
+                'one.txt': 'one'}
+
+        # Replace the asset with an older file of the same size, it should
+        # still be copied.
+        asset_path = fs.path('kitchen/pages/foo-assets/one.txt')
+        with open(asset_path, 'w') as fp:
+            fp.write('ONE')
+        os.utime(asset_path, (1000000, 1000000))
+        os.utime(page_path, None)
+        sub = _bake()
+        assert list(sub.assets.values()) == ['copy']
+        assert fs.getStructure('kitchen/_counter/foo') == {
+                'index.html': 'Foo: /foo/one.txt',
+                'one.txt': 'ONE'}
@@ -0,0 +1,77 @@
+import time
+import pytest
+from piecrust.data.base import MergedMapping, LayeredMapping
+from piecrust.data.builder import DataBuildingContext, build_page_data
+from piecrust.data.providersdata import DataProvidersData
+from piecrust.rendering import QualifiedPage
+from .mockutil import mock_fs, mock_fs_scope, get_simple_page
+
+
+class _Thing(dict):
+    @property
+    def baz(self):
+        return 'thing baz'
+
+
+def test_layered_mapping():
+    m = LayeredMapping([
+            {'foo': 'top foo', 'sub': {'a': 1}},
+            _Thing(),
+            {'bar': 'bottom bar', 'sub': {'b': 3}}])
+    assert m['foo'] == 'top foo'
+    assert m.bar == 'bottom bar'
+    assert m.baz == 'thing baz'
+    assert m.sub.a == 1
+    assert m.sub.b == 3
+    assert m['sub'] is m['sub']
+    assert sorted(m.keys()) == ['bar', 'foo', 'sub']
+    with pytest.raises(KeyError):
+        m['missing']
+    with pytest.raises(AttributeError):
+        m.missing
+
+    m._prependMapping({'content': 'blah'})
+    assert m.content == 'blah'
+    assert 'content' in m.keys()
+
+    bad = LayeredMapping([{'foo': 'one'}, {'foo': {'two': 2}}])
+    with pytest.raises(Exception):
+        bad['foo']
+
+
+def _get_page_data_layers(page_data):
+    # Make an equivalent `MergedMapping` so we can compare both.
+    return MergedMapping(list(page_data._layers))
+
+
+def test_template_data_access_benchmark():
+    fs = (mock_fs()
+            .withConfig({'site': {'title': "Benchmark"}, 'foo': {'bar': 42}})
+            .withPage('pages/foo.md', {'title': "Foo"}, "Foo"))
+    with mock_fs_scope(fs):
+        app = fs.getApp()
+        page = get_simple_page(app, 'foo.md')
+        route = app.getSourceRoute('pages', None)
+        qp = QualifiedPage(page, route, {'slug': 'foo'})
+        data = build_page_data(DataBuildingContext(qp))
+        assert isinstance(data['site'], LayeredMapping)
+        assert isinstance(data['site']._layers[0], DataProvidersData)
+
+        def _access(d):
+            return (d['site']['title'], d['foo']['bar'],
+                    d['page']['title'], d['site']['pages'])
+
+        old_data = _get_page_data_layers(data)
+        assert _access(old_data)[:3] == _access(data)[:3] == (
+                "Benchmark", 42, "Foo")
+
+        timings = []
+        for d in [old_data, data]:
+            start = time.perf_counter()
+            for i in range(2000):
+                _access(d)
+            timings.append(time.perf_counter() - start)
+
+    # The layered mapping is usually an order of magnitude faster, so this
+    # leaves a lot of room for noise.
+    assert timings[1] < timings[0] / 2
@@ -1,6 +1,8 @@
 import mock
-from piecrust.data.iterators import PageIterator
+import pytest
+from piecrust.data.iterators import PageIterator, SettingSortIterator
 from piecrust.page import Page, PageConfiguration
+from .mockutil import mock_fs, mock_fs_scope
 
 
 def test_skip():
@@ -87,3 +89,43 @@ def test_magic_filter():
     assert len(it) == 3
     assert list(it) == [TestItem(3), TestItem(3), TestItem(3)]
 
+
+@pytest.mark.parametrize('reverse', [False, True])
+def test_setting_sort_and_limit(reverse):
+    values = [4, 3, 7, 1, 3, 9, 2, 0, 3, 5]
+    items = [TestItem(v) for v in values]
+    for i, item in enumerate(items):
+        item.name = str(i)
+    it = PageIterator(items)
+    it.sort('foo', reverse=reverse)
+    it.slice(1, 4)
+    assert isinstance(it._pages.it, SettingSortIterator)
+    expected = sorted(items, key=lambda i: i.foo, reverse=reverse)[1:5]
+    assert list(it) == expected
+    assert it.total_count == 10
+    assert it._has_more is True
+
+
+def test_sort_and_limit_is_memoized(mocker):
+    fs = (mock_fs()
+            .withConfig()
+            .withPages(8, 'posts/2016-01-0{idx1}_post{idx1}.md',
+                       lambda i: {'title': "Post %d" % (i + 1)}))
+    with mock_fs_scope(fs):
+        app = fs.getApp()
+        source = app.getSource('posts')
+        spy = mocker.spy(SettingSortIterator, 'getSortedTop')
+
+        def _get_titles():
+            it = PageIterator(source)
+            it.sort('title', reverse=True).limit(3)
+            return [p['title'] for p in it], it.total_count
+
+        assert _get_titles() == (['Post 8', 'Post 7', 'Post 6'], 8)
+        assert _get_titles() == (['Post 8', 'Post 7', 'Post 6'], 8)
+        assert spy.call_count == 1
+
+        it = PageIterator(source)
+        it.sort('title').limit(2)
+        assert [p['title'] for p in it] == ['Post 1', 'Post 2']
+        assert spy.call_count == 2
@@ -99,3 +99,25 @@ def test_recursive_linker_iteration(fs_fac, page_path, expected):
             assert a.url == e[0]
             assert a.is_self == e[1]
 
+
+def test_linkers_share_hierarchy_index(mocker):
+    fs = (mock_fs()
+            .withConfig()
+            .withPage('pages/foo')
+            .withPage('pages/something/else')
+            .withPage('pages/something/good'))
+    with mock_fs_scope(fs):
+        app = fs.getApp()
+        app.config.set('site/pretty_urls', True)
+        src = app.getSource('pages')
+        list_path = mocker.spy(src, 'listPath')
+
+        for page_path in ['foo.md', 'something/else.md', 'something/good.md']:
+            linker = Linker(src, os.path.dirname(page_path),
+                            root_page_path=page_path)
+            urls = [p.url for p in linker.root.allpages]
+            assert urls == ['/foo', '/something/else', '/something/good']
+            linker.parent
+
+        assert sorted(c[0][0] for c in list_path.call_args_list) == [
+                '', '/', 'something']
@@ -62,3 +62,28 @@ def test_reentrance():
     c = unpickle_obj(data)
     assert a == c
 
+
+def test_render_pass_info():
+    import copy
+    import json
+    import pickle as stdpickle
+    from piecrust.rendering import RenderPassInfo, FrozenRenderPassInfo
+
+    rpi = RenderPassInfo()
+    rpi.used_source_names.update(['posts', 'pages'])
+    rpi.used_assets = True
+    rpi.getCustomInfo('used_taxonomy_terms', [], True).append(('foo',))
+    fi = rpi.freeze()
+    assert fi.used_source_names == frozenset(['pages', 'posts'])
+    assert fi.used_assets is True
+    assert fi.used_pagination is False
+    assert fi.getCustomInfo('used_taxonomy_terms') == (('foo',),)
+    with pytest.raises(AttributeError):
+        fi.used_assets = False
+    assert copy.deepcopy(fi) is fi
+
+    assert unpickle(pickle(fi)) == fi
+    assert stdpickle.loads(stdpickle.dumps(fi)) == fi
+    state = json.loads(json.dumps(fi.__getstate__()))
+    assert FrozenRenderPassInfo.fromCache(state) == fi
+    assert FrozenRenderPassInfo.fromCache(fi) is fi
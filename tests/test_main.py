@@ -0,0 +1,63 @@
+import os
+import sys
+import json
+import subprocess
+import pytest
+from piecrust.commands.base import LazyChefCommand
+from piecrust.plugins.builtin import BuiltInPlugin
+from .mockutil import mock_fs, mock_fs_scope
+
+
+def test_builtin_commands_metadata():
+    for cmd in BuiltInPlugin().getCommands():
+        if not isinstance(cmd, LazyChefCommand):
+            continue
+        real_cmd = cmd.command
+        assert cmd.name == real_cmd.name
+        assert cmd.description == real_cmd.description
+        assert cmd.requires_website == real_cmd.requires_website
+        assert cmd.cache_name == real_cmd.cache_name
+
+
+_startup_script = """
+import sys
+from piecrust.main import _pre_parse_chef_args, _run_chef
+argv = sys.argv[1:]
+exit_code = _run_chef(_pre_parse_chef_args(argv), argv)
+import json
+print(json.dumps({'exit_code': exit_code,
+                  'modules': list(sys.modules.keys())}))
+"""
+
+# Modules that are slow to import, and not needed to parse the command line
+# or run simple commands.
+_heavy_modules = [
+        'jinja2', 'pygments', 'markdown', 'paramiko',
+        'piecrust.baking.baker', 'piecrust.processing.pipeline',
+        'piecrust.serving.server', 'piecrust.templating.jinjaengine',
+        'piecrust.commands.builtin.baking']
+
+
+@pytest.mark.parametrize('args', [
+        ['help'],
+        ['showconfig', 'site/title'],
+        ['root']])
+def test_startup_imports(args):
+    fs = (mock_fs()
+            .withConfig({'site': {'title': "Startup"}})
+            .withPage('pages/foo.md', {'layout': 'none'}, "Foo"))
+    with mock_fs_scope(fs):
+        env = dict(os.environ)
+        pkg_dir = os.path.dirname(os.path.dirname(__file__))
+        env['PYTHONPATH'] = os.pathsep.join(
+                [pkg_dir, env.get('PYTHONPATH', '')])
+        argv = ['--root', fs.path('/kitchen')] + args
+        out = subprocess.check_output(
+                [sys.executable, '-W', 'ignore', '-c', _startup_script] +
+                argv,
+                env=env, universal_newlines=True)
+        res = json.loads(out.splitlines()[-1])
+
+    assert res['exit_code'] == 0
+    loaded = set(res['modules'])
+    assert [m for m in _heavy_modules if m in loaded] == []
@@ -3,8 +3,10 @@ import os.path
 import shutil
 import pytest
 from piecrust.processing.base import SimpleFileProcessor
-from piecrust.processing.pipeline import ProcessorPipeline
+from piecrust.processing.pipeline import ProcessorPipeline, make_re
 from piecrust.processing.records import ProcessorPipelineRecord
+from piecrust.processing.scanner import DirectoryScanner
+from piecrust.processing.tree import FORCE_BUILD
 from piecrust.processing.worker import get_filtered_processors
 from .mockutil import mock_fs, mock_fs_scope
 
@@ -174,6 +176,27 @@ def test_record_version_change():
             ProcessorPipelineRecord.RECORD_VERSION -= 1
 
 
+def test_copy_mode_hardlink():
+    fs = (mock_fs()
+            .withConfig({'baker': {'copy_mode': 'hardlink'}})
+            .withFile('kitchen/assets/blah.foo', 'A test file.'))
+    with mock_fs_scope(fs):
+        pp = _get_pipeline(fs)
+        pp.enabled_processors = ['copy']
+        record = pp.run()
+        expected = {'blah.foo': 'A test file.'}
+        assert expected == fs.getStructure('counter')
+        assert os.path.samefile(fs.path('/kitchen/assets/blah.foo'),
+                                fs.path('/counter/blah.foo'))
+        assert record.entries[0].copy_modes == {'blah.foo': 'hardlink'}
+
+        pp = _get_pipeline(fs)
+        pp.enabled_processors = ['copy']
+        pp.force = True
+        record = pp.run()
+        assert record.entries[0].copy_modes == {'blah.foo': 'skipped'}
+
+
 @pytest.mark.parametrize('patterns, expected', [
         (['_'],
             {'something.html': 'A test file.'}),
@@ -199,6 +222,38 @@ def test_ignore_pattern(patterns, expected):
         assert expected == fs.getStructure('counter')
 
 
+def test_scanner_dir_listings():
+    fs = (mock_fs()
+            .withFile('kitchen/assets/something.html', 'A test file.')
+            .withFile('kitchen/assets/_hidden.html', 'Shhh')
+            .withFile('kitchen/assets/foo/_important.html', 'Important!'))
+    with mock_fs_scope(fs):
+        assets_dir = fs.path('kitchen/assets')
+        listings = {}
+        scanner = DirectoryScanner(make_re(['/^_/']), listings)
+        actual = [os.path.relpath(p, assets_dir)
+                  for p in scanner.scan(assets_dir)]
+        expected = ['something.html',
+                    os.path.join('foo', '_important.html')]
+        assert expected == actual
+        assert scanner.cached_count == 0
+        assert sorted(listings.keys()) == [
+                assets_dir, os.path.join(assets_dir, 'foo')]
+
+        scanner = DirectoryScanner(make_re(['/^_/']), listings)
+        assert expected == [os.path.relpath(p, assets_dir)
+                            for p in scanner.scan(assets_dir)]
+        assert scanner.cached_count == 2
+
+        time.sleep(0.01)
+        fs.withFile('kitchen/assets/foo/bar.html', 'Bar!')
+        scanner = DirectoryScanner(make_re(['/^_/']), listings)
+        actual = [os.path.relpath(p, assets_dir)
+                  for p in scanner.scan(assets_dir)]
+        assert expected + [os.path.join('foo', 'bar.html')] == actual
+        assert scanner.cached_count == 1
+
+
 @pytest.mark.parametrize('names, expected', [
         ('all', ['cleancss', 'compass', 'copy', 'concat', 'less', 'requirejs',
                  'sass', 'sitemap', 'uglifyjs', 'pygments_style']),
@@ -219,3 +274,250 @@ def test_filter_processor(names, expected):
         actual = [p.PROCESSOR_NAME for p in procs]
         assert sorted(actual) == sorted(expected)
 
+
+def test_compiler_host_fallback():
+    from piecrust.processing.compilerhost import (
+            CompilerHost, CompilerHostMixin)
+
+    class HostedProcessor(CompilerHostMixin, SimpleFileProcessor):
+        PROCESSOR_NAME = 'hosted'
+
+        def __init__(self, conf):
+            super(HostedProcessor, self).__init__({'foo': 'bar'})
+            self._conf = conf
+
+    fs = mock_fs()
+    with mock_fs_scope(fs):
+        app = fs.getApp()
+        proc = HostedProcessor({'daemon': False})
+        proc.initialize(app)
+        assert proc._compileWithHost({'in_path': 'blah.foo'}) is None
+        assert proc._compiler_host is None
+
+        proc = HostedProcessor({'daemon': True,
+                                'node_bin': 'piecrust-no-such-node'})
+        proc.initialize(app)
+        assert proc._compileWithHost({'in_path': 'blah.foo'}) is None
+        assert proc._compiler_host is not None
+        assert not proc._compiler_host.is_running
+        proc.onPipelineEnd(None)
+        assert proc._compiler_host is None
+
+    host = CompilerHost('piecrust-no-such-compiler')
+    assert host.start() is False
+    assert not host.is_running
+
+
+def test_less_dependencies_from_compiler_host(mocker):
+    from piecrust.processing.base import PipelineContext
+    from piecrust.processing.less import LessProcessor
+
+    fs = (mock_fs()
+            .withConfig({'less': {'daemon': True}})
+            .withFile('kitchen/assets/foo.less', 'a { }'))
+    with mock_fs_scope(fs):
+        app = fs.getApp()
+        mocker.patch('piecrust.processing.compilerhost.CompilerHost.start',
+                     return_value=True)
+        mocker.patch('piecrust.processing.compilerhost.CompilerHost.compile',
+                     return_value=[{'ok': True, 'deps': ['bar.less']}])
+
+        proc = LessProcessor()
+        proc.initialize(app)
+        proc.onPipelineStart(PipelineContext(
+                0, app, fs.path('counter'), fs.path('tmp')))
+        in_path = fs.path('kitchen/assets/foo.less')
+        assert proc.getDependencies(in_path) == FORCE_BUILD
+        assert proc.process(in_path, fs.path('counter'))
+
+        # There's no map file, the dependencies come from the host.
+        assert proc.getDependencies(in_path) == [
+                proc._getMapPath(in_path),
+                fs.path('kitchen/assets/bar.less')]
+
+
+def test_artifact_cache_shared_between_output_dirs():
+    fs = (mock_fs()
+            .withConfig()
+            .withFile('kitchen/assets/blah.foo', 'A test file.'))
+    with mock_fs_scope(fs):
+        app = fs.getApp()
+        pp = ProcessorPipeline(app, fs.path('counter'))
+        pp.enabled_processors = ['copy']
+        pp.additional_processors_factories = [
+                lambda: FooProcessor(('foo', 'bar'))]
+        pp.run()
+        expected = {'blah.bar': 'FOO: A test file.'}
+        assert expected == fs.getStructure('counter')
+
+        # Tamper with the cached artifact to check that it gets restored
+        # instead of being processed again.
+        cache_dir = fs.path('kitchen/_cache/proc_artifacts')
+        artifacts = []
+        for dirpath, _, filenames in os.walk(cache_dir):
+            artifacts += [os.path.join(dirpath, fn) for fn in filenames
+                          if fn == 'blah.bar']
+        assert len(artifacts) == 1
+        with open(artifacts[0], 'w') as fp:
+            fp.write('FOO: Cached!')
+
+        # Start from a clean slate, as if we were using another cache key.
+        shutil.rmtree(app.cache_dir)
+        app = fs.getApp()
+
+        pp = ProcessorPipeline(app, fs.path('counter2'))
+        pp.enabled_processors = ['copy']
+        pp.additional_processors_factories = [
+                lambda: FooProcessor(('foo', 'bar'))]
+        pp.run()
+        expected = {'blah.bar': 'FOO: Cached!'}
+        assert expected == fs.getStructure('counter2')
+
+        pp = ProcessorPipeline(app, fs.path('counter3'), force=True)
+        pp.enabled_processors = ['copy']
+        pp.additional_processors_factories = [
+                lambda: FooProcessor(('foo', 'bar'))]
+        pp.run()
+        expected = {'blah.bar': 'FOO: A test file.'}
+        assert expected == fs.getStructure('counter3')
+
+
+class MappedProcessor(FooProcessor):
+    def __init__(self):
+        super(MappedProcessor, self).__init__(('foo', 'bar'))
+        self.map_dir = None
+
+    def onPipelineStart(self, ctx):
+        self.map_dir = os.path.join(ctx.tmp_dir, 'foo')
+        os.makedirs(self.map_dir, exist_ok=True)
+
+    def getDependencies(self, path):
+        map_path = self.getArtifactSideFiles(path)[0]
+        if not os.path.isfile(map_path):
+            return FORCE_BUILD
+        return [map_path]
+
+    def getArtifactSideFiles(self, path):
+        return [os.path.join(self.map_dir, os.path.basename(path) + '.map')]
+
+    def _doProcess(self, in_path, out_path):
+        super(MappedProcessor, self)._doProcess(in_path, out_path)
+        with open(self.getArtifactSideFiles(in_path)[0], 'w') as fp:
+            fp.write('MAP')
+        return True
+
+
+def test_artifact_cache_restores_side_files():
+    fs = (mock_fs()
+            .withConfig()
+            .withFile('kitchen/assets/blah.foo', 'A test file.'))
+    with mock_fs_scope(fs):
+        app = fs.getApp()
+        pp = ProcessorPipeline(app, fs.path('counter'))
+        pp.enabled_processors = ['copy']
+        pp.additional_processors_factories = [MappedProcessor]
+        pp.run()
+        assert {'blah.bar': 'FOO: A test file.'} == \
+            fs.getStructure('counter')
+
+        # Start from a clean slate, as if we were using another cache key,
+        # and tamper with the cached map to check that it gets restored.
+        for dirpath, _, filenames in os.walk(
+                fs.path('kitchen/_cache/proc_artifacts')):
+            for fn in filenames:
+                if fn.startswith('__side_'):
+                    with open(os.path.join(dirpath, fn), 'w') as fp:
+                        fp.write('CACHED MAP')
+        shutil.rmtree(app.cache_dir)
+        app = fs.getApp()
+
+        pp = ProcessorPipeline(app, fs.path('counter2'))
+        pp.enabled_processors = ['copy']
+        pp.additional_processors_factories = [MappedProcessor]
+        pp.run()
+        assert {'blah.bar': 'FOO: A test file.'} == \
+            fs.getStructure('counter2')
+        map_path = os.path.join(app.cache_dir, 'proc', 'foo', 'blah.foo.map')
+        with open(map_path, 'r') as fp:
+            assert fp.read() == 'CACHED MAP'
+
+
+def test_artifact_cache_skips_non_caching_processors():
+    def _make_processor():
+        proc = FooProcessor(('foo', 'bar'))
+        proc.is_caching_artifacts = False
+        return proc
+
+    fs = (mock_fs()
+            .withConfig()
+            .withFile('kitchen/assets/blah.foo', 'A test file.'))
+    with mock_fs_scope(fs):
+        app = fs.getApp()
+        pp = ProcessorPipeline(app, fs.path('counter'))
+        pp.enabled_processors = ['copy']
+        pp.additional_processors_factories = [_make_processor]
+        pp.run()
+        expected = {'blah.bar': 'FOO: A test file.'}
+        assert expected == fs.getStructure('counter')
+
+        cache_dir = fs.path('kitchen/_cache/proc_artifacts')
+        artifacts = []
+        for dirpath, _, filenames in os.walk(cache_dir):
+            artifacts += [fn for fn in filenames if fn == 'blah.bar']
+        assert artifacts == []
+
+
+def test_sitemap_from_bake_record():
+    from piecrust.baking.baker import Baker
+    from piecrust.processing.sitemap import strftime_iso8601
+    fs = (mock_fs()
+            .withConfig()
+            .withPage('pages/foo.md', {'layout': 'none', 'format': 'none'},
+                      'a foo page')
+            .withPage('pages/bar.md', {'layout': 'none', 'format': 'none',
+                                       'sitemap': {'priority': 0.5}},
+                      'a bar page')
+            .withAsset('assets/sitemap.sitemap', 'autogen: [pages]'))
+    with mock_fs_scope(fs):
+        out_dir = fs.path('kitchen/_counter')
+        app = fs.getApp()
+        baker = Baker(app, out_dir)
+        baker.bake()
+        os.utime(os.path.join(out_dir, 'foo.html'), (1000000, 1000000))
+
+        pp = ProcessorPipeline(app, out_dir)
+        pp.enabled_processors = ['copy', 'sitemap']
+        pp.run()
+        with open(os.path.join(out_dir, 'sitemap.xml'), 'r') as fp:
+            sitemap = fp.read()
+        assert ('<loc>/foo.html</loc>\n    <lastmod>%s</lastmod>' %
+                strftime_iso8601(1000000)) in sitemap
+        assert '<loc>/bar.html</loc>' in sitemap
+        assert '<priority>0.5</priority>' in sitemap
+
+
+def test_sitemap_removes_stale_shards():
+    fs = (mock_fs()
+            .withConfig()
+            .withAsset('assets/sitemap.sitemap',
+                       'max_urls: 1\nlocations: [{url: /a}, {url: /b}, '
+                       '{url: /c}]'))
+    with mock_fs_scope(fs):
+        app = fs.getApp()
+        pp = ProcessorPipeline(app, fs.path('counter'))
+        pp.enabled_processors = ['copy', 'sitemap']
+        pp.run()
+        assert (['sitemap-1.xml', 'sitemap-2.xml', 'sitemap-3.xml',
+                 'sitemap.xml'] ==
+                sorted(fs.getStructure('counter').keys()))
+
+        time.sleep(1)
+        fs.withAsset('assets/sitemap.sitemap',
+                     'max_urls: 2\nlocations: [{url: /a}, {url: /b}, '
+                     '{url: /c}]')
+        app = fs.getApp()
+        pp = ProcessorPipeline(app, fs.path('counter'))
+        pp.enabled_processors = ['copy', 'sitemap']
+        pp.run()
+        assert (['sitemap-1.xml', 'sitemap-2.xml', 'sitemap.xml'] ==
+                sorted(fs.getStructure('counter').keys()))
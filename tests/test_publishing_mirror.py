@@ -0,0 +1,73 @@
+import os
+import os.path
+import shutil
+import pytest
+from piecrust.publishing.manifest import build_local_manifest
+from piecrust.publishing.mirror import DirectoryMirror
+from .mockutil import mock_fs, mock_fs_scope
+
+
+def _sync(fs, deleted=None, force=False):
+    local_dir = fs.path('/local')
+    mirror = DirectoryMirror(fs.path('/www/site'), thread_count=2)
+    mirror.sync(local_dir, build_local_manifest(local_dir),
+                deleted=deleted, force=force)
+    return mirror
+
+
+def test_mirror_directory():
+    fs = (mock_fs()
+            .withFile('local/index.html', 'Index')
+            .withFile('local/foo/bar.html', 'Bar')
+            .withFile('local/foo/baz.html', 'Baz')
+            .withFile('www/site/old.html', 'Not ours')
+            .withFile('www/site/index.html', 'Old index'))
+    with mock_fs_scope(fs):
+        site_dir = fs.path('/www/site')
+        m = _sync(fs)
+        assert m.copied == ['foo/bar.html', 'foo/baz.html', 'index.html']
+        assert m.deleted == []
+        assert os.path.islink(site_dir)
+        assert {'index.html': 'Index',
+                'old.html': 'Not ours',
+                'foo': {'bar.html': 'Bar', 'baz.html': 'Baz'}} == \
+            fs.getStructure('www/site')
+        first_release = os.path.realpath(site_dir)
+
+        # Nothing changed.
+        m = _sync(fs)
+        assert m.copied == []
+        assert first_release == os.path.realpath(site_dir)
+
+        # Rewrite the bake output, with one change and one deletion.
+        shutil.rmtree(fs.path('/local'))
+        fs.withFile('local/index.html', 'Index')
+        fs.withFile('local/foo/bar.html', 'Bar!')
+        m = _sync(fs, deleted=['foo/baz.html'])
+        assert m.copied == ['foo/bar.html']
+        assert m.deleted == ['foo/baz.html']
+        assert {'index.html': 'Index',
+                'old.html': 'Not ours',
+                'foo': {'bar.html': 'Bar!'}} == fs.getStructure('www/site')
+
+        # The previous release is kept, untouched.
+        second_release = os.path.realpath(site_dir)
+        assert first_release != second_release
+        with open(os.path.join(first_release, 'foo', 'bar.html')) as fp:
+            assert fp.read() == 'Bar'
+        assert os.path.samefile(
+                os.path.join(first_release, 'index.html'),
+                os.path.join(second_release, 'index.html'))
+
+        # Only the last previous release is kept.
+        fs.withFile('local/index.html', 'New index')
+        _sync(fs)
+        assert not os.path.isdir(first_release)
+        assert os.path.isdir(second_release)
+
+
+def test_mirror_refuses_hardlinked_outputs():
+    fs = mock_fs().withFile('local/index.html', 'Index')
+    with mock_fs_scope(fs):
+        with pytest.raises(Exception):
+            DirectoryMirror(fs.path('/www/site'), copy_mode='hardlink')
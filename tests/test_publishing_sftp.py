@@ -0,0 +1,121 @@
+import os
+import os.path
+import shutil
+import pytest
+from piecrust.publishing.manifest import build_local_manifest
+from piecrust.publishing.sftp import SftpUploader, DEFAULT_MANIFEST_NAME
+from .mockutil import mock_fs, mock_fs_scope
+
+
+class LocalSftpClient(object):
+    """ A stand-in for Paramiko's `SFTPClient` that works on a local
+        directory.
+    """
+    def __init__(self, root_dir, log):
+        self.root_dir = root_dir
+        self.log = log
+
+    def _path(self, p):
+        return os.path.join(self.root_dir, *p.split('/'))
+
+    def put(self, localpath, remotepath, confirm=True):
+        self.log.append(('put', remotepath))
+        shutil.copyfile(localpath, self._path(remotepath))
+
+    def remove(self, path):
+        self.log.append(('remove', path))
+        os.remove(self._path(path))
+
+    def mkdir(self, path):
+        self.log.append(('mkdir', path))
+        os.mkdir(self._path(path))
+
+    def open(self, path, mode):
+        return open(self._path(path), mode)
+
+    def posix_rename(self, old, new):
+        os.replace(self._path(old), self._path(new))
+
+    def close(self):
+        pass
+
+
+def _sync(fs, log, force=False):
+    local_dir = fs.path('/local')
+    remote_dir = fs.path('/remote')
+    manifest = build_local_manifest(local_dir)
+    uploader = SftpUploader(
+            lambda: LocalSftpClient(remote_dir, log), 'site',
+            connection_count=2)
+    uploader.sync(local_dir, manifest, force=force)
+    return uploader
+
+
+def test_sftp_upload_only_changes():
+    fs = (mock_fs()
+            .withFile('local/index.html', 'Index')
+            .withFile('local/foo/bar.html', 'Bar')
+            .withFile('local/foo/baz.html', 'Baz')
+            .withDir('remote'))
+    with mock_fs_scope(fs):
+        log = []
+        up = _sync(fs, log)
+        assert sorted(up.uploaded) == [
+                'foo/bar.html', 'foo/baz.html', 'index.html']
+        assert ('mkdir', 'site/foo') in log
+        expected = {
+                'index.html': 'Index',
+                'foo': {'bar.html': 'Bar', 'baz.html': 'Baz'}}
+        actual = fs.getStructure('remote/site')
+        assert DEFAULT_MANIFEST_NAME in actual
+        del actual[DEFAULT_MANIFEST_NAME]
+        assert expected == actual
+
+        # Rewriting files with the same contents doesn't upload anything.
+        shutil.rmtree(fs.path('/local'))
+        fs.withFile('local/index.html', 'Index')
+        fs.withFile('local/foo/bar.html', 'Bar!')
+        log = []
+        up = _sync(fs, log)
+        assert up.uploaded == ['foo/bar.html']
+        assert up.deleted == ['foo/baz.html']
+        assert log == [
+                ('mkdir', 'site'),
+                ('put', 'site/foo/bar.html'),
+                ('remove', 'site/foo/baz.html')]
+        actual = fs.getStructure('remote/site')
+        del actual[DEFAULT_MANIFEST_NAME]
+        assert {'index.html': 'Index', 'foo': {'bar.html': 'Bar!'}} == actual
+
+        log = []
+        up = _sync(fs, log)
+        assert up.uploaded == []
+        assert log == [('mkdir', 'site')]
+
+        log = []
+        up = _sync(fs, log, force=True)
+        assert sorted(up.uploaded) == ['foo/bar.html', 'index.html']
+
+
+def test_sftp_upload_connection_errors():
+    fs = (mock_fs()
+            .withFile('local/index.html', 'Index')
+            .withFile('local/foo/bar.html', 'Bar')
+            .withDir('remote'))
+    with mock_fs_scope(fs):
+        log = []
+        connections = []
+
+        def _client_factory():
+            # Only the main connection can be opened.
+            if connections:
+                raise Exception("Connection refused.")
+            connections.append(True)
+            return LocalSftpClient(fs.path('/remote'), log)
+
+        local_dir = fs.path('/local')
+        uploader = SftpUploader(_client_factory, 'site', connection_count=2)
+        with pytest.raises(Exception) as exc_info:
+            uploader.sync(local_dir, build_local_manifest(local_dir))
+        assert str(exc_info.value) == "Failed to upload 2 files."
+        assert uploader.uploaded == []
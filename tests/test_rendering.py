@@ -0,0 +1,50 @@
+import os
+import os.path
+import json
+from piecrust.rendering import (
+        QualifiedPage, PageRenderingContext, FrozenRenderPassInfo,
+        render_page)
+from .mockutil import mock_fs, mock_fs_scope
+
+
+def _render_foo(app):
+    page = app.getSource('pages').getPage({'slug': 'foo'})
+    route = app.getSourceRoute('pages', None)
+    qp = QualifiedPage(page, route, {'slug': 'foo'})
+    return render_page(PageRenderingContext(qp))
+
+
+def test_render_cache_with_old_format():
+    fs = (mock_fs()
+          .withConfig()
+          .withPage('pages/foo.md', {'format': 'none', 'layout': 'none'},
+                    "Foo"))
+    with mock_fs_scope(fs):
+        app = fs.getApp()
+        rp = _render_foo(app)
+        assert rp.content == "Foo"
+
+        # Replace the cached render info with the format used by older
+        # versions.
+        cache_dir = app.cache.getCacheDir('renders')
+        cache_paths = []
+        for dirpath, _, filenames in os.walk(cache_dir):
+            cache_paths += [os.path.join(dirpath, fn) for fn in filenames]
+        assert len(cache_paths) == 1
+        with open(cache_paths[0], 'r') as fp:
+            data = json.load(fp)
+        data['pass_info'] = {
+                'used_source_names': ['__type__:set', 'pages'],
+                'used_pagination': False,
+                'pagination_has_more': False,
+                'used_assets': False,
+                '_custom_info': {},
+                '__class__': 'RenderPassInfo',
+                '__module__': 'piecrust.rendering'}
+        with open(cache_paths[0], 'w') as fp:
+            json.dump(data, fp)
+
+        app = fs.getApp()
+        rp = _render_foo(app)
+        assert rp.content == "Foo"
+        assert isinstance(rp.render_info[0], FrozenRenderPassInfo)
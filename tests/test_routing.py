@@ -187,3 +187,34 @@ def test_get_uri(slug, page_num, pretty, expected):
         uri = route.getUri({'slug': slug}, sub_num=page_num)
         assert uri == (urllib.parse.quote(root) + expected)
 
+
+def test_get_uri_cache():
+    app = get_mock_app()
+    app.config.set('site/root', '/')
+    app.config.set('site/pretty_urls', False)
+    app.config.set('site/trailing_slash', False)
+    app.config.set('__cache/pagination_suffix_format', '/%(num)d')
+
+    config = {'url': '/%year%/%slug%', 'source': 'blah'}
+    route = Route(app, config)
+    assert route.getUri({'year': 2016, 'slug': 'foo'}) == '/2016/foo.html'
+    assert route.getUri({'slug': 'foo', 'year': 2016}) == '/2016/foo.html'
+    assert route.getUri({'year': 2016, 'slug': 'foo'}, sub_num=2) == \
+        '/2016/foo/2.html'
+    assert len(route._uri_cache) == 2
+
+    # Dictionaries and lists are frozen to make the cache key.
+    assert route.getUri({'year': {}, 'slug': 'foo'}) == '/%7B%7D/foo.html'
+    assert len(route._uri_cache) == 3
+
+    # Unhashable metadata values are fine, they're just not cached.
+    assert route.getUri({'year': _Unhashable(), 'slug': 'foo'}) == \
+        '/blah/foo.html'
+    assert len(route._uri_cache) == 3
+
+
+class _Unhashable(object):
+    __hash__ = None
+
+    def __str__(self):
+        return 'blah'
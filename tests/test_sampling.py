@@ -0,0 +1,52 @@
+import threading
+from piecrust.sampling import StackSampler, save_collapsed_stacks
+from .mockutil import mock_fs, mock_fs_scope
+
+
+def _wait_for_it(started, done):
+    started.set()
+    done.wait()
+
+
+def test_sample_tagged_threads():
+    started = threading.Event()
+    done = threading.Event()
+    t = threading.Thread(target=_wait_for_it, args=(started, done))
+    t.start()
+    started.wait()
+    try:
+        sampler = StackSampler()
+        sampler._sample()
+        assert sampler.samples == {}
+
+        sampler.setThreadTag('FooJob', t.ident)
+        sampler._sample()
+        sampler._sample()
+    finally:
+        done.set()
+        t.join()
+
+    assert len(sampler.samples) == 1
+    stack, count = list(sampler.samples.items())[0]
+    assert count == 2
+    frames = stack.split(';')
+    assert frames[0] == 'FooJob'
+    assert any(f.startswith('_wait_for_it (test_sampling.py:')
+               for f in frames[1:])
+
+    sampler.setThreadTag(None, t.ident)
+    sampler.addSamples({stack: 3, 'BarJob;bar (bar.py:1)': 1})
+    assert sampler.samples == {stack: 5, 'BarJob;bar (bar.py:1)': 1}
+
+
+def test_save_collapsed_stacks():
+    fs = mock_fs().withDir('kitchen')
+    with mock_fs_scope(fs):
+        path = fs.path('/kitchen/profile.txt')
+        save_collapsed_stacks(path, {
+                'Foo;foo (foo.py:1);bar (bar.py:4)': 3,
+                'Foo;foo (foo.py:1)': 12})
+        with open(path, 'r') as fp:
+            assert fp.read() == (
+                    'Foo;foo (foo.py:1) 12\n'
+                    'Foo;foo (foo.py:1);bar (bar.py:4) 3\n')
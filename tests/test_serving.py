@@ -143,3 +143,61 @@ def test_serve_category_page(category, expected_indices):
                 expected += "Post %d\n" % i
         assert expected == rp.content
 
+
+def test_histogram_percentiles():
+    from piecrust.environment import Histogram
+    h = Histogram([1, 2, 4])
+    assert h.getPercentile(50) is None
+    for v in [0.5, 1.5, 1.5, 3, 10]:
+        h.observe(v)
+    assert h.counts == [1, 2, 1, 1]
+    assert h.count == 5
+    assert h.getPercentile(20) == 1
+    assert h.getPercentile(50) == 1.75
+    assert h.getPercentile(70) == 3
+    assert h.getPercentile(99) == 4
+
+    other = Histogram([1, 2, 4])
+    other.observe(0.1)
+    h.mergeHistogram(other)
+    assert h.counts == [2, 2, 1, 1]
+    assert h.sum == pytest.approx(16.6)
+
+
+def test_serve_metrics():
+    from werkzeug.test import Client
+    from werkzeug.wrappers import BaseResponse
+    from piecrust.app import PieCrustFactory
+    from piecrust.serving.middlewares import PieCrustDebugMiddleware
+    from piecrust.serving.server import WsgiServer
+
+    fs = (mock_fs()
+            .withConfig()
+            .withPage('pages/_index.md', {'layout': 'none', 'format': 'none'},
+                      "Index"))
+    with mock_fs_scope(fs):
+        appfactory = PieCrustFactory(fs.path('/kitchen'))
+        server = WsgiServer(appfactory)
+        app = PieCrustDebugMiddleware(server, appfactory,
+                                      run_sse_check=lambda: False,
+                                      server=server.server)
+        client = Client(app, BaseResponse)
+        assert client.get('/').status_code == 200
+        assert client.get('/').status_code == 200
+        assert client.get('/missing.html').status_code == 404
+
+        resp = client.get('/__piecrust_debug/metrics')
+        assert resp.status_code == 200
+        lines = resp.data.decode('utf8').splitlines()
+        assert 'piecrust_serve_requests_total 3' in lines
+        assert 'piecrust_serve_request_errors_total 1' in lines
+        assert 'piecrust_serve_request_duration_seconds_count 3' in lines
+        assert ('piecrust_serve_request_duration_seconds_bucket{le="+Inf"} 3'
+                in lines)
+        assert 'piecrust_serve_page_render_duration_seconds_count 2' in lines
+        assert any(
+                l.startswith('piecrust_serve_request_duration_percentile_'
+                             'seconds{percentile="99"} ')
+                for l in lines)
+        assert ('# TYPE piecrust_serve_cache_hit_ratio gauge' in lines)
+        assert 'piecrust_sse_clients 0' in lines
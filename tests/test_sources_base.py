@@ -1,6 +1,8 @@
 import os
 import pytest
+from piecrust import osutil
 from piecrust.app import PieCrust
+from piecrust.sources.base import MODE_PARSING
 from piecrust.sources.pageref import PageRef, PageNotFoundError
 from .mockutil import mock_fs, mock_fs_scope
 from .pathutil import slashfix
@@ -151,3 +153,29 @@ def test_page_ref_with_missing_file():
             r.path
         assert not r.exists
 
+
+def test_default_source_find_uses_directory_index(mocker):
+    fs = (mock_fs()
+            .withConfig()
+            .withPage('pages/foo.md')
+            .withPage('pages/bar/baz.md'))
+    with mock_fs_scope(fs):
+        app = fs.getApp()
+        src = app.getSource('pages')
+        listdir = mocker.spy(osutil, 'listdir')
+        for i in range(3):
+            assert src.findPageFactory(
+                    {'slug': 'foo'}, MODE_PARSING).rel_path == 'foo.md'
+            assert src.findPageFactory(
+                    {'slug': 'bar/baz'}, MODE_PARSING).rel_path == \
+                'bar/baz.md'
+            assert src.findPageFactory({'slug': 'other'}, MODE_PARSING) is None
+        assert listdir.call_count == 2
+
+        # A new app (like for a new request in the preview server) picks up
+        # new files.
+        fs.withPage('pages/other.md')
+        app = fs.getApp()
+        src = app.getSource('pages')
+        assert src.findPageFactory(
+                {'slug': 'other'}, MODE_PARSING).rel_path == 'other.md'
@@ -1,4 +1,6 @@
 import pytest
+import pystache.common
+from piecrust.templating.pystacheengine import _WorkaroundRenderer
 from .mockutil import (
         mock_fs, mock_fs_scope, get_simple_page, render_simple_page)
 
@@ -72,3 +74,20 @@ def test_partial():
         output = output.replace('\r', '')
         assert output == expected
 
+
+def test_template_caching():
+    fs = (mock_fs()
+            .withDir('kitchen/templates')
+            .withAsset('templates/blah.mustache', "Hello {{name}}!"))
+    with mock_fs_scope(fs, open_patches=open_patches):
+        renderer = _WorkaroundRenderer(
+                search_dirs=[fs.path('kitchen/templates')])
+        tpl = renderer.load_template('blah')
+        assert renderer.load_template('blah') is tpl
+        assert renderer.render(tpl, {'name': 'foo'}) == "Hello foo!"
+        assert renderer.render(tpl, {'name': 'bar'}) == "Hello bar!"
+        assert renderer.parse_cache.misses == 1
+        assert renderer.parse_cache.hits == 1
+
+        with pytest.raises(pystache.common.TemplateNotFoundError):
+            renderer.load_template('missing')
@@ -0,0 +1,98 @@
+import time
+import pytest
+from piecrust.workerpool import (
+        IWorker, WorkerPool, START_METHOD_DEFAULT, START_METHOD_TEMPLATE)
+
+
+class ContextWorker(IWorker):
+    def __init__(self):
+        self.context_version = 0
+        self.context = {}
+
+    def initialize(self):
+        pass
+
+    def updateContext(self, version, data):
+        self.context_version = version
+        self.context.update(data)
+
+    def process(self, job):
+        return (job, self.context_version, self.context.get('suffix'))
+
+
+@pytest.mark.parametrize('start_method', [
+        START_METHOD_DEFAULT, START_METHOD_TEMPLATE])
+def test_broadcast_context(start_method):
+    results = []
+    pool = WorkerPool(ContextWorker, worker_count=3, batch_size=1,
+                      start_method=start_method)
+    try:
+        for i, suffix in enumerate(['a', 'b']):
+            assert pool.broadcastContext({'suffix': suffix}) == i + 1
+            ar = pool.queueJobs(list(range(20)), handler=results.append)
+            ar.wait()
+    finally:
+        pool.close()
+
+    assert len(results) == 40
+    assert sorted(r[0] for r in results[:20]) == list(range(20))
+    assert set((r[1], r[2]) for r in results[:20]) == set([(1, 'a')])
+    assert set((r[1], r[2]) for r in results[20:]) == set([(2, 'b')])
+
+
+class BadContextWorker(ContextWorker):
+    def updateContext(self, version, data):
+        if data.get('bad'):
+            raise Exception("Bad context!")
+        super(BadContextWorker, self).updateContext(version, data)
+
+
+def test_broadcast_bad_context():
+    results = []
+    errors = []
+    pool = WorkerPool(BadContextWorker, worker_count=2, batch_size=1)
+    try:
+        pool.broadcastContext({'bad': True})
+        pool.setHandler(results.append, errors.append)
+        ar = pool.queueJobs(list(range(4)))
+        ar.wait()
+        assert results == []
+        assert len(errors) == 4
+        assert 'failed to update its context to version 1' in errors[0]
+
+        # A good context makes the workers usable again.
+        pool.broadcastContext({'bad': False, 'suffix': 'a'})
+        pool.setHandler(results.append, errors.append)
+        ar = pool.queueJobs(list(range(4)))
+        ar.wait()
+        assert len(errors) == 4
+        assert set((r[1], r[2]) for r in results) == set([(2, 'a')])
+    finally:
+        pool.close()
+
+
+class SlowContextWorker(ContextWorker):
+    def updateContext(self, version, data):
+        if self.wid == 0:
+            time.sleep(1)
+        super(SlowContextWorker, self).updateContext(version, data)
+
+
+def test_broadcast_context_timeout(mocker):
+    mocker.patch('piecrust.workerpool.CONTEXT_BARRIER_TIMEOUT', 0.1)
+    results = []
+    errors = []
+    pool = WorkerPool(SlowContextWorker, worker_count=2, batch_size=1)
+    try:
+        pool.broadcastContext({'suffix': 'a'})
+        pool.setHandler(results.append, errors.append)
+        ar = pool.queueJobs(list(range(4)))
+        ar.wait()
+        assert results == []
+        assert len(errors) == 4
+        assert "couldn't synchronize context version 1" in errors[0]
+
+        with pytest.raises(Exception):
+            pool.broadcastContext({'suffix': 'b'})
+    finally:
+        pool.close()